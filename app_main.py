@@ -5,9 +5,21 @@ from simulator_screen import SimulatorScreen
 from exit_screen import ExitScreen
 from background_handler import BackgroundHandler
 from cursor_handler import CursorHandler
+from random_streams import RandomStreams
+from signal_controllers import SIGNAL_CONTROLLERS, create_signal_controller
 
 class App:
-    def __init__(self):
+    def __init__(self, seed=None, record_path=None, replay_path=None, signal_controller=None):
+        # Flujos aleatorios por subsistema (con semilla = modo benchmark reproducible)
+        self.random_streams = RandomStreams(seed)
+        
+        # Registro de trayectorias a grabar o a reproducir en el simulador
+        self.record_path = record_path
+        self.replay_path = replay_path
+        
+        # Estrategia de semaforo del simulador (None: regla de congestion del contador)
+        self.signal_controller = signal_controller
+        
         self.root = tk.Tk()
         self.root.title("Aplicacion de Simulacion")
         
@@ -48,7 +60,8 @@ class App:
         self.background_handler = BackgroundHandler(
             self.main_canvas, 
             self.screen_width, 
-            self.screen_height
+            self.screen_height,
+            random_streams=self.random_streams
         )
         
         # Habilitar debug para ver que esta pasando
@@ -161,5 +174,17 @@ class App:
             self.quit_application()
 
 if __name__ == "__main__":
-    app = App()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Aplicacion de Simulacion")
+    parser.add_argument("--seed", type=int, default=None, help="semilla para corridas reproducibles")
+    parser.add_argument("--record", default=None, metavar="ARCHIVO", help="grabar las trayectorias de la simulacion")
+    parser.add_argument("--replay", default=None, metavar="ARCHIVO", help="reproducir un registro de trayectorias")
+    parser.add_argument("--controller", choices=sorted(SIGNAL_CONTROLLERS), default=None,
+                        help="estrategia de semaforo (por defecto, la regla de congestion del contador)")
+    args = parser.parse_args()
+    
+    signal_controller = create_signal_controller(args.controller) if args.controller else None
+    app = App(seed=args.seed, record_path=args.record, replay_path=args.replay,
+              signal_controller=signal_controller)
     app.run()
@@ -2,7 +2,19 @@ import math
 import random
 
 class BackgroundElement:
-    """Clase base para todos los elementos del fondo"""
+    """Clase base para todos los elementos del fondo.
+    
+    Los elementos usan __slots__ (sin __dict__ por instancia): cada subclase
+    declara sus atributos propios y los inicializa en __init__, asi que se
+    leen directamente sin probar con hasattr.
+    """
+    
+    __slots__ = (
+        'x', 'y', 'width', 'height', 'original_x', 'original_y', 'offset_x', 'offset_y',
+        'visible', 'active', 'opacity', 'color', 'depth',
+        'velocity_x', 'velocity_y', 'acceleration_x', 'acceleration_y',
+        'rotation', 'scale_x', 'scale_y', 'lifetime', 'age', 'tags', 'element_type'
+    )
     
     def __init__(self, x, y, width=0, height=0):
         # Posición y dimensiones
@@ -24,7 +24,7 @@ except ImportError as e:
     TIMER_SYSTEM_AVAILABLE = False
 
 class BackgroundHandler:
-    def __init__(self, canvas, screen_width, screen_height):
+    def __init__(self, canvas, screen_width, screen_height, random_streams=None):
         self.canvas = canvas
         self.screen_width = screen_width
         self.screen_height = screen_height
@@ -47,20 +47,28 @@ class BackgroundHandler:
         
         self.debug_enabled = False
         
+        # Generadores independientes para poder reproducir el fondo con una semilla
+        if random_streams is not None:
+            self.rng = random_streams.background
+            timer_rng = random_streams.timer
+        else:
+            self.rng = random
+            timer_rng = None
+        
         if NIGHT_BG_AVAILABLE:
-            self.night_bg_manager = NightBackgroundManager(screen_width, screen_height)
+            self.night_bg_manager = NightBackgroundManager(screen_width, screen_height, rng=self.rng)
         else:
             self.night_bg_manager = None
         
         if DAY_BG_AVAILABLE:
-            self.day_bg_manager = DayBackgroundManager(screen_width, screen_height)
+            self.day_bg_manager = DayBackgroundManager(screen_width, screen_height, rng=self.rng)
         else:
             self.day_bg_manager = None
         
         self.cached_day_background = None
         
         if TIMER_SYSTEM_AVAILABLE:
-            self.timer_system = BackgroundTimerSystem()
+            self.timer_system = BackgroundTimerSystem(rng=timer_rng)
             self.setup_star_twinkling_system()
         else:
             self.timer_system = None
@@ -91,7 +99,7 @@ class BackgroundHandler:
     def trigger_random_star_twinkle(self):
         stars = self.get_elements_by_type("star")
         if stars:
-            random_star = random.choice(stars)
+            random_star = self.rng.choice(stars)
             if hasattr(random_star, 'start_twinkling'):
                 random_star.start_twinkling()
     
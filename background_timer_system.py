@@ -4,7 +4,9 @@ import random
 class BackgroundTimer:
     """Clase para manejar un temporizador individual de fondo"""
     
-    def __init__(self, duration, callback, repeat=False, name="timer"):
+    def __init__(self, duration, callback, repeat=False, name="timer", rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.duration = duration  # Duracion en segundos
         self.callback = callback  # Funcion a ejecutar
         self.repeat = repeat      # Si se repite automaticamente
@@ -34,7 +36,7 @@ class BackgroundTimer:
     def randomize_next_duration(self):
         """Generar siguiente duracion aleatoria"""
         if self.randomize_duration:
-            self.duration = random.uniform(self.min_duration, self.max_duration)
+            self.duration = self.rng.uniform(self.min_duration, self.max_duration)
     
     def update(self, delta_time):
         """Actualizar el temporizador"""
@@ -139,7 +141,9 @@ class ScheduledEvent:
 class BackgroundTimerSystem:
     """Sistema de gestion de temporizadores y eventos para el fondo"""
     
-    def __init__(self):
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.timers = {}
         self.scheduled_events = []
         self.start_time = time.time()
@@ -166,7 +170,7 @@ class BackgroundTimerSystem:
                 print(f"WARNING: Limite de temporizadores de fondo alcanzado ({self.max_timers})")
                 return None
         
-        timer = BackgroundTimer(duration, callback, repeat, name)
+        timer = BackgroundTimer(duration, callback, repeat, name, rng=self.rng)
         self.timers[name] = timer
         self.total_timers_created += 1
         return timer
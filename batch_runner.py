@@ -0,0 +1,167 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from simulation_engine import SimulationEngine
+from mesoscopic_engine import MesoscopicEngine
+from signal_controllers import SIGNAL_CONTROLLERS, create_signal_controller
+
+DEFAULT_PARAMETERS = {
+    'duration': 3600.0,
+    'traffic_light_duration': 10.0,
+    'min_duration': 10.0,
+    'max_duration': 20.0,
+    'congestion_count_threshold': 8,
+    'congestion_length_threshold': 400,
+    'spawn_interval': 2.0,
+    'model': 'micro',
+    'controller': None
+}
+
+ENGINE_MODELS = {
+    'micro': SimulationEngine,
+    'meso': MesoscopicEngine
+}
+
+def build_engine(seed, parameters):
+    engine = ENGINE_MODELS[parameters['model']](seed=seed)
+
+    engine.set_traffic_light_duration(parameters['traffic_light_duration'])
+    engine.set_spawn_interval(parameters['spawn_interval'])
+    engine.set_duration_range(parameters['min_duration'], parameters['max_duration'])
+    engine.set_congestion_thresholds(
+        parameters['congestion_count_threshold'],
+        parameters['congestion_length_threshold']
+    )
+
+    # Los controladores comparten el rango de verde de la regla de congestion
+    if parameters['controller']:
+        engine.set_signal_controller(create_signal_controller(
+            parameters['controller'], parameters['min_duration'], parameters['max_duration']
+        ))
+
+    return engine
+
+def run_replication(replication):
+    """Ejecutar una replica sin interfaz grafica. Se ejecuta en un proceso
+    del pool, por eso recibe y devuelve solo datos serializables."""
+    parameters = dict(DEFAULT_PARAMETERS)
+    parameters.update(replication.get('parameters', {}))
+
+    engine = build_engine(replication['seed'], parameters)
+
+    wall_start = time.perf_counter()
+    engine.run(parameters['duration'])
+    wall_time = time.perf_counter() - wall_start
+
+    return {
+        'index': replication['index'],
+        'seed': replication['seed'],
+        'parameters': parameters,
+        'statistics': engine.get_statistics(),
+        'wall_time': wall_time
+    }
+
+def build_replications(count, base_seed=0, parameters=None):
+    parameters = parameters or {}
+    return [
+        {'index': index, 'seed': base_seed + index, 'parameters': dict(parameters)}
+        for index in range(count)
+    ]
+
+def run_batch(replications, max_workers=None):
+    """Generador que entrega los resultados a medida que terminan las replicas"""
+    if max_workers == 1:
+        for replication in replications:
+            yield run_replication(replication)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_replication, replication) for replication in replications]
+        for future in as_completed(futures):
+            yield future.result()
+
+def aggregate_results(results):
+    """Media, desviacion estandar, minimo y maximo de cada estadistica"""
+    values = {}
+    for result in results:
+        for key, value in result['statistics'].items():
+            values.setdefault(key, []).append(value)
+
+    summary = {}
+    for key, samples in values.items():
+        count = len(samples)
+        mean = sum(samples) / count
+        variance = sum((sample - mean) ** 2 for sample in samples) / (count - 1) if count > 1 else 0.0
+        summary[key] = {
+            'mean': mean,
+            'std': math.sqrt(variance),
+            'min': min(samples),
+            'max': max(samples),
+            'count': count
+        }
+
+    return summary
+
+def main(argv=None):
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Replicas Monte Carlo de la interseccion en paralelo")
+    parser.add_argument("--replications", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0, help="semilla de la primera replica")
+    parser.add_argument("--workers", type=int, default=None, help="procesos del pool (por defecto, uno por CPU)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_PARAMETERS['duration'])
+    parser.add_argument("--traffic-light-duration", type=float, default=DEFAULT_PARAMETERS['traffic_light_duration'])
+    parser.add_argument("--min-duration", type=float, default=DEFAULT_PARAMETERS['min_duration'])
+    parser.add_argument("--max-duration", type=float, default=DEFAULT_PARAMETERS['max_duration'])
+    parser.add_argument("--count-threshold", type=int, default=DEFAULT_PARAMETERS['congestion_count_threshold'])
+    parser.add_argument("--length-threshold", type=float, default=DEFAULT_PARAMETERS['congestion_length_threshold'])
+    parser.add_argument("--spawn-interval", type=float, default=DEFAULT_PARAMETERS['spawn_interval'])
+    parser.add_argument("--model", choices=sorted(ENGINE_MODELS), default=DEFAULT_PARAMETERS['model'],
+                        help="micro: pasos fijos por vehiculo; meso: colas por eventos discretos")
+    parser.add_argument("--controller", choices=sorted(SIGNAL_CONTROLLERS), default=DEFAULT_PARAMETERS['controller'],
+                        help="estrategia de semaforo (por defecto, la regla de congestion del contador)")
+    parser.add_argument("--json", action="store_true", help="imprimir cada resultado como una linea JSON")
+    args = parser.parse_args(argv)
+
+    parameters = {
+        'duration': args.duration,
+        'traffic_light_duration': args.traffic_light_duration,
+        'min_duration': args.min_duration,
+        'max_duration': args.max_duration,
+        'congestion_count_threshold': args.count_threshold,
+        'congestion_length_threshold': args.length_threshold,
+        'spawn_interval': args.spawn_interval,
+        'model': args.model,
+        'controller': args.controller
+    }
+
+    replications = build_replications(args.replications, args.seed, parameters)
+
+    results = []
+    wall_start = time.perf_counter()
+    for result in run_batch(replications, args.workers):
+        results.append(result)
+        if args.json:
+            print(json.dumps(result))
+        else:
+            stats = result['statistics']
+            print(f"Replica {result['index']} (semilla {result['seed']}): "
+                  f"{stats['throughput_per_hour']:.0f} veh/h, "
+                  f"cola media {stats['mean_queued_vehicles']:.2f}, "
+                  f"{result['wall_time']:.2f}s")
+    wall_elapsed = time.perf_counter() - wall_start
+
+    summary = aggregate_results(results)
+    if args.json:
+        print(json.dumps({'summary': summary}))
+    else:
+        print(f"\n=== RESUMEN ({len(results)} replicas, {wall_elapsed:.2f}s) ===")
+        for key, stats in summary.items():
+            print(f"{key}: media {stats['mean']:.3f}, desv {stats['std']:.3f}, "
+                  f"min {stats['min']:.3f}, max {stats['max']:.3f}")
+
+    return summary
+
+if __name__ == "__main__":
+    main()
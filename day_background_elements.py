@@ -3,6 +3,8 @@ import math
 from background_element import BackgroundElement
 from vehicle_elements import VehicleSpawnManager
 class DaySkyElement(BackgroundElement):
+    __slots__ = ('gradient_colors',)
+    
     def __init__(self, screen_width, screen_height):
         super().__init__(0, 0, screen_width, screen_height)
         self.element_type = "day_sky"
@@ -52,6 +54,8 @@ class DaySkyElement(BackgroundElement):
         return f"#{r:02x}{g:02x}{b:02x}"
 
 class DaySunElement(BackgroundElement):
+    __slots__ = ('screen_width', 'screen_height', 'sun_color', 'glow_color', 'glow_radius')
+    
     def __init__(self, screen_width, screen_height):
         sun_size = 120
         x = screen_width // 2 - sun_size // 2
@@ -105,30 +109,38 @@ class DaySunElement(BackgroundElement):
         )
 
 class CloudElement(BackgroundElement):
-    def __init__(self, screen_width, screen_height, start_x=None, y_position=None, depth_layer=None):
+    __slots__ = (
+        'rng', 'screen_width', 'screen_height', 'cloud_style', 'cloud_colors', 'base_color', 'speed',
+        'is_entering', 'entry_progress', 'entry_duration', 'opacity_variation', 'puff_positions',
+        'cloud_tag', 'canvas_items'
+    )
+    
+    def __init__(self, screen_width, screen_height, start_x=None, y_position=None, depth_layer=None, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.screen_width = screen_width
         self.screen_height = screen_height
         
-        self.cloud_style = random.choice(["fluffy", "stretched", "small", "medium", "large"])
+        self.cloud_style = self.rng.choice(["fluffy", "stretched", "small", "medium", "large"])
         
         if self.cloud_style == "small":
-            cloud_width = random.randint(80, 120)
-            cloud_height = random.randint(40, 60)
+            cloud_width = self.rng.randint(80, 120)
+            cloud_height = self.rng.randint(40, 60)
         elif self.cloud_style == "medium":
-            cloud_width = random.randint(120, 180)
-            cloud_height = random.randint(60, 90)
+            cloud_width = self.rng.randint(120, 180)
+            cloud_height = self.rng.randint(60, 90)
         elif self.cloud_style == "large":
-            cloud_width = random.randint(180, 250)
-            cloud_height = random.randint(90, 120)
+            cloud_width = self.rng.randint(180, 250)
+            cloud_height = self.rng.randint(90, 120)
         elif self.cloud_style == "stretched":
-            cloud_width = random.randint(200, 300)
-            cloud_height = random.randint(50, 70)
+            cloud_width = self.rng.randint(200, 300)
+            cloud_height = self.rng.randint(50, 70)
         else:
-            cloud_width = random.randint(140, 200)
-            cloud_height = random.randint(70, 100)
+            cloud_width = self.rng.randint(140, 200)
+            cloud_height = self.rng.randint(70, 100)
         
         start_x_pos = start_x if start_x is not None else -cloud_width
-        y_pos = y_position if y_position is not None else random.randint(int(screen_height * 0.05), int(screen_height * 0.35))
+        y_pos = y_position if y_position is not None else self.rng.randint(int(screen_height * 0.05), int(screen_height * 0.35))
         
         super().__init__(start_x_pos, y_pos, cloud_width, cloud_height)
         self.element_type = "cloud"
@@ -136,22 +148,22 @@ class CloudElement(BackgroundElement):
         if depth_layer is not None:
             self.set_depth(depth_layer)
         else:
-            cloud_depth = random.choice([-98, -96, -94, -93, -91])
+            cloud_depth = self.rng.choice([-98, -96, -94, -93, -91])
             self.set_depth(cloud_depth)
         
         self.add_tag("group_day")
         self.add_tag("cloud")
         
         self.cloud_colors = ["#ffffff", "#f5f5f5", "#fafafa", "#f0f0f0"]
-        self.base_color = random.choice(self.cloud_colors)
+        self.base_color = self.rng.choice(self.cloud_colors)
         self.set_color(self.base_color)
         
-        self.speed = random.uniform(25, 45)
+        self.speed = self.rng.uniform(25, 45)
         self.set_velocity(self.speed, 0)
         
         self.is_entering = True
         self.entry_progress = 0.0
-        self.entry_duration = random.uniform(2.0, 4.0)
+        self.entry_duration = self.rng.uniform(2.0, 4.0)
         
         depth_opacity_map = {
             -98: (0.4, 0.6),
@@ -161,7 +173,7 @@ class CloudElement(BackgroundElement):
             -91: (0.75, 0.9)
         }
         opacity_range = depth_opacity_map.get(self.depth, (0.6, 0.85))
-        self.opacity_variation = random.uniform(opacity_range[0], opacity_range[1])
+        self.opacity_variation = self.rng.uniform(opacity_range[0], opacity_range[1])
         self.set_opacity(0.0)
         
         self.puff_positions = self.generate_puff_positions()
@@ -173,22 +185,22 @@ class CloudElement(BackgroundElement):
         puffs = []
         base_radius = min(self.width, self.height) // 2.5
         
-        num_puffs = random.randint(4, 7)
+        num_puffs = self.rng.randint(4, 7)
         
         for i in range(num_puffs):
             if i == 0:
                 offset_x = self.width * 0.25
                 offset_y = self.height * 0.5
-                radius = base_radius * random.uniform(0.9, 1.1)
+                radius = base_radius * self.rng.uniform(0.9, 1.1)
             elif i == num_puffs - 1:
                 offset_x = self.width * 0.75
                 offset_y = self.height * 0.5
-                radius = base_radius * random.uniform(0.9, 1.1)
+                radius = base_radius * self.rng.uniform(0.9, 1.1)
             else:
                 progress = i / (num_puffs - 1)
                 offset_x = self.width * (0.15 + progress * 0.7)
-                offset_y = self.height * random.uniform(0.35, 0.65)
-                radius = base_radius * random.uniform(0.85, 1.15)
+                offset_y = self.height * self.rng.uniform(0.35, 0.65)
+                radius = base_radius * self.rng.uniform(0.85, 1.15)
             
             puffs.append({
                 'x': offset_x,
@@ -214,7 +226,7 @@ class CloudElement(BackgroundElement):
     
     def draw(self, canvas):
         if not self.visible or self.opacity <= 0.01:
-            if hasattr(self, 'canvas_items') and self.canvas_items:
+            if self.canvas_items:
                 for item_id in self.canvas_items:
                     try:
                         canvas.itemconfig(item_id, state='hidden')
@@ -225,7 +237,7 @@ class CloudElement(BackgroundElement):
         final_x = self.x + self.offset_x
         final_y = self.y + self.offset_y
         
-        if not hasattr(self, 'canvas_items') or not self.canvas_items:
+        if not self.canvas_items:
             self.canvas_items = []
             fill_color = self.base_color
             
@@ -267,20 +279,24 @@ class CloudElement(BackgroundElement):
     
     def deactivate(self):
         super().deactivate()
-        if hasattr(self, 'cloud_tag'):
+        if self.cloud_tag:
             try:
                 import tkinter as tk
             except:
                 pass
 
 class DayBuildingElement(BackgroundElement):
-    def __init__(self, x, y, width, height, layer="front", color=None):
+    __slots__ = ('rng', 'layer', 'building_style', 'base_color')
+    
+    def __init__(self, x, y, width, height, layer="front", color=None, rng=None):
+        self.rng = rng if rng is not None else random
+        
         super().__init__(x, y, width, height)
         self.element_type = "day_building"
         self.layer = layer
         self.add_tag("group_day")
         
-        self.building_style = random.choice(["standard", "stepped", "antenna", "dome"])
+        self.building_style = self.rng.choice(["standard", "stepped", "antenna", "dome"])
         
         if layer == "front":
             self.set_depth(-90)
@@ -293,7 +309,7 @@ class DayBuildingElement(BackgroundElement):
             self.base_color = color
         else:
             day_colors = ["#8a8a9a", "#9a8a8a", "#8a9a8a", "#9a8a9a", "#8a9a9a"]
-            self.base_color = random.choice(day_colors)
+            self.base_color = self.rng.choice(day_colors)
         
         self.set_color(self.base_color)
     
@@ -346,6 +362,8 @@ class DayBuildingElement(BackgroundElement):
             )
 
 class DayRoadElement(BackgroundElement):
+    __slots__ = ('road_color', 'line_color')
+    
     def __init__(self, screen_width, screen_height):
         road_height = 120
         super().__init__(0, screen_height - road_height, screen_width, road_height)
@@ -382,7 +400,9 @@ class DayRoadElement(BackgroundElement):
             )
 
 class DayBackgroundManager:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.elements = []
@@ -398,7 +418,7 @@ class DayBackgroundManager:
         
         try:
             from vehicle_elements import VehicleSpawnManager
-            self.vehicle_manager = VehicleSpawnManager(screen_width, screen_height)
+            self.vehicle_manager = VehicleSpawnManager(screen_width, screen_height, rng=self.rng)
         except ImportError as e:
             print(f"Warning: No se pudo importar vehicle_elements: {e}")
             self.vehicle_manager = None
@@ -424,7 +444,7 @@ class DayBackgroundManager:
         max_delay = 10.0
         
         time_since_last = current_time - self.last_cloud_spawn_time
-        spawn_delay = random.uniform(min_delay, max_delay)
+        spawn_delay = self.rng.uniform(min_delay, max_delay)
         
         if time_since_last < spawn_delay:
             return False
@@ -440,7 +460,7 @@ class DayBackgroundManager:
         max_y = int(self.screen_height * 0.35)
         
         for attempt in range(max_attempts):
-            y_position = random.randint(min_y, max_y)
+            y_position = self.rng.randint(min_y, max_y)
             position_valid = True
             
             for cloud in self.active_clouds:
@@ -467,14 +487,15 @@ class DayBackgroundManager:
             return None
         
         depth_options = [-98, -96, -94, -93, -91]
-        chosen_depth = random.choice(depth_options)
+        chosen_depth = self.rng.choice(depth_options)
         
         cloud = CloudElement(
             self.screen_width, 
             self.screen_height, 
             start_x=-250, 
             y_position=y_position,
-            depth_layer=chosen_depth
+            depth_layer=chosen_depth,
+            rng=self.rng
         )
         cloud.activate()
         cloud.show()
@@ -525,14 +546,14 @@ class DayBackgroundManager:
             max_width = 100
         
         while current_x < self.screen_width + 50:
-            if random.random() < 0.3:
-                width = random.randint(min_width, min_width + 20)
-            elif random.random() < 0.6:
-                width = random.randint(min_width + 20, min_width + 50)
+            if self.rng.random() < 0.3:
+                width = self.rng.randint(min_width, min_width + 20)
+            elif self.rng.random() < 0.6:
+                width = self.rng.randint(min_width + 20, min_width + 50)
             else:
-                width = random.randint(min_width + 50, max_width)
+                width = self.rng.randint(min_width + 50, max_width)
                 
-            height = random.randint(min_height, max_height)
+            height = self.rng.randint(min_height, max_height)
             y = road_top - height
             
             positions.append({
@@ -542,7 +563,7 @@ class DayBackgroundManager:
                 'height': height
             })
             
-            gap = random.randint(min_gap, max_gap)
+            gap = self.rng.randint(min_gap, max_gap)
             current_x += width + gap
         
         return positions
@@ -585,7 +606,8 @@ class DayBackgroundManager:
                 building = DayBuildingElement(
                     pos['x'], pos['y'], pos['width'], pos['height'],
                     layer=layer,
-                    color=final_state['color']
+                    color=final_state['color'],
+                    rng=self.rng
                 )
             
                 if 'building_style' in data:
@@ -647,7 +669,7 @@ class DayBackgroundManager:
         
         for layer in ['far', 'distant', 'front']:
             for pos in self.building_positions_cache[layer]:
-                building = DayBuildingElement(pos['x'], pos['y'], pos['width'], pos['height'], layer)
+                building = DayBuildingElement(pos['x'], pos['y'], pos['width'], pos['height'], layer, rng=self.rng)
                 building.activate()
                 building.show()
                 self.elements.append(building)
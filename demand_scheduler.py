@@ -0,0 +1,226 @@
+import heapq
+import math
+import random
+
+class HeadwayProfile:
+    """Llegadas a intervalo fijo (el comportamiento original del simulador)"""
+
+    def __init__(self, headway=2.0, start_time=0.0):
+        self.headway = headway
+        self.start_time = start_time
+
+    def next_arrival(self, last_arrival, rng):
+        if last_arrival is None:
+            return self.start_time
+        if self.headway <= 0:
+            return math.inf
+        return last_arrival + self.headway
+
+
+class PoissonProfile:
+    """Llegadas de Poisson con tasa constante en vehiculos por hora"""
+
+    def __init__(self, rate_per_hour=1800.0):
+        self.rate_per_hour = rate_per_hour
+
+    def next_arrival(self, last_arrival, rng):
+        if self.rate_per_hour <= 0:
+            return math.inf
+        start = last_arrival if last_arrival is not None else 0.0
+        return start + rng.expovariate(self.rate_per_hour / 3600.0)
+
+
+class TimeOfDayProfile:
+    """Llegadas de Poisson no homogeneas con una curva de tasa por hora del dia.
+
+    points es una lista de (segundo, vehiculos por hora) con interpolacion
+    lineal entre puntos; la curva se repite cada period segundos. Las
+    llegadas se generan por adelgazamiento (thinning) contra la tasa maxima.
+    """
+
+    def __init__(self, points, period=86400.0, time_scale=1.0):
+        self.points = sorted(points)
+        self.period = period
+        self.time_scale = time_scale
+        self.max_rate = max(rate for _, rate in self.points)
+
+    def get_rate(self, time):
+        clock_time = (time * self.time_scale) % self.period
+        points = self.points
+
+        if clock_time <= points[0][0]:
+            previous = (points[-1][0] - self.period, points[-1][1])
+            following = points[0]
+        elif clock_time >= points[-1][0]:
+            previous = points[-1]
+            following = (points[0][0] + self.period, points[0][1])
+        else:
+            for index in range(1, len(points)):
+                if clock_time < points[index][0]:
+                    previous = points[index - 1]
+                    following = points[index]
+                    break
+
+        span = following[0] - previous[0]
+        if span <= 0:
+            return previous[1]
+        ratio = (clock_time - previous[0]) / span
+        return previous[1] + (following[1] - previous[1]) * ratio
+
+    def next_arrival(self, last_arrival, rng):
+        if self.max_rate <= 0:
+            return math.inf
+
+        time = last_arrival if last_arrival is not None else 0.0
+        max_rate = self.max_rate / 3600.0
+        while True:
+            time += rng.expovariate(max_rate)
+            if rng.random() * self.max_rate <= self.get_rate(time):
+                return time
+
+
+class PlatoonProfile:
+    """Pelotones: grupos de vehiculos con separacion corta entre si,
+    y llegadas de Poisson entre pelotones (por ejemplo, la salida de un
+    semaforo aguas arriba)"""
+
+    def __init__(self, platoons_per_hour=120.0, min_size=3, max_size=8, headway=1.2):
+        self.platoons_per_hour = platoons_per_hour
+        self.min_size = min_size
+        self.max_size = max_size
+        self.headway = headway
+
+        self.remaining_in_platoon = 0
+
+    def next_arrival(self, last_arrival, rng):
+        if last_arrival is None:
+            # El generador se reinicio: empezar con un peloton nuevo
+            self.remaining_in_platoon = 0
+        start = last_arrival if last_arrival is not None else 0.0
+
+        if self.remaining_in_platoon > 0:
+            self.remaining_in_platoon -= 1
+            return start + self.headway
+
+        if self.platoons_per_hour <= 0:
+            return math.inf
+
+        self.remaining_in_platoon = rng.randint(self.min_size, self.max_size) - 1
+        return start + rng.expovariate(self.platoons_per_hour / 3600.0)
+
+
+class DemandScheduler:
+    """Generador de demanda basado en un monticulo de llegadas.
+
+    Las llegadas de cada carril se calculan por adelantado hasta horizon
+    segundos y se guardan en un heap de (tiempo, secuencia, carril). El
+    manejador de vehiculos solo trabaja cuando hay una llegada vencida.
+
+    Si la entrada del carril esta bloqueada, la llegada queda en espera
+    (backlog) y se agenda un unico reintento para ese carril, en lugar de
+    reintentar en cada paso. max_backlog limita cuantas llegadas pueden
+    esperar por carril; las que exceden el limite se descartan y se
+    cuentan en dropped_arrivals. Con None la espera no tiene limite.
+    """
+
+    def __init__(self, profiles, rng=None, horizon=60.0, max_backlog=None, time=0.0):
+        self.profiles = dict(profiles)
+        self.rng = rng if rng is not None else random
+        self.horizon = horizon
+        self.max_backlog = max_backlog
+
+        self.reset(time)
+
+    def reset(self, time=0.0):
+        self.heap = []
+        self.sequence = 0
+
+        self.last_arrival = {lane: None for lane in self.profiles}
+        self.backlog = {lane: 0 for lane in self.profiles}
+        self.retry_pending = {lane: False for lane in self.profiles}
+
+        self.arrivals = 0
+        self.dropped_arrivals = 0
+
+        self.refill(time)
+
+    def set_profile(self, lane, profile, time=0.0):
+        self.profiles[lane] = profile
+        self.last_arrival[lane] = None
+        self.backlog.setdefault(lane, 0)
+        self.retry_pending.setdefault(lane, False)
+
+        # Descartar las llegadas ya calculadas con el perfil anterior
+        self.heap = [entry for entry in self.heap if entry[2] != lane or entry[3]]
+        heapq.heapify(self.heap)
+
+        self.refill_lane(lane, time)
+
+    def push(self, time, lane, retry=False):
+        heapq.heappush(self.heap, (time, self.sequence, lane, retry))
+        self.sequence += 1
+
+    def refill(self, time):
+        for lane in self.profiles:
+            self.refill_lane(lane, time)
+
+    def refill_lane(self, lane, time):
+        profile = self.profiles[lane]
+        limit = time + self.horizon
+        last_arrival = self.last_arrival[lane]
+
+        while last_arrival is None or last_arrival <= limit:
+            arrival = profile.next_arrival(last_arrival, self.rng)
+            if arrival == math.inf:
+                break
+            arrival = max(arrival, time) if last_arrival is None else arrival
+            self.push(arrival, lane)
+            last_arrival = arrival
+
+        self.last_arrival[lane] = last_arrival
+
+    def get_next_time(self):
+        return self.heap[0][0] if self.heap else math.inf
+
+    def pop_due(self, time):
+        """Carriles con trabajo pendiente hasta time: llegadas nuevas se suman
+        al backlog; cada carril aparece a lo sumo una vez por llamada"""
+        due = []
+
+        while self.heap and self.heap[0][0] <= time:
+            _, _, lane, retry = heapq.heappop(self.heap)
+
+            if retry:
+                self.retry_pending[lane] = False
+            else:
+                self.arrivals += 1
+                if self.max_backlog is not None and self.backlog[lane] >= self.max_backlog:
+                    self.dropped_arrivals += 1
+                    continue
+                self.backlog[lane] += 1
+                if self.retry_pending[lane]:
+                    continue
+
+            if lane not in due:
+                due.append(lane)
+
+        for lane in self.profiles:
+            last_arrival = self.last_arrival[lane]
+            if last_arrival is not None and last_arrival <= time + self.horizon / 2:
+                self.refill_lane(lane, time)
+
+        return due
+
+    def has_backlog(self, lane):
+        return self.backlog[lane] > 0
+
+    def consume(self, lane):
+        self.backlog[lane] -= 1
+
+    def retry(self, lane, time):
+        if not self.retry_pending[lane]:
+            self.retry_pending[lane] = True
+            self.push(time, lane, retry=True)
+
+    def get_backlog_total(self):
+        return sum(self.backlog.values())
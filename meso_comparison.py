@@ -0,0 +1,53 @@
+import argparse
+import sys
+import time
+from simulation_engine import SimulationEngine
+from mesoscopic_engine import MesoscopicEngine
+
+# Diferencia relativa aceptada por indicador con la geometria y demanda por
+# defecto
+TOLERANCES = {
+    'throughput_per_hour': 0.05,
+    'stopped_time_per_vehicle': 0.15,
+    'mean_queued_vehicles': 0.05,
+    'phase_changes': 0.05
+}
+
+def run_engine(engine, duration):
+    start = time.perf_counter()
+    engine.run(duration)
+    return engine.get_statistics(), time.perf_counter() - start
+
+def compare(seed, duration):
+    """Indicadores de ambos motores con la misma semilla, como
+    {clave: (micro, meso, diferencia relativa)}, y sus tiempos reales"""
+    micro, micro_time = run_engine(SimulationEngine(seed=seed), duration)
+    meso, meso_time = run_engine(MesoscopicEngine(seed=seed), duration)
+
+    results = {}
+    for key in TOLERANCES:
+        reference = micro[key]
+        difference = abs(meso[key] - reference) / reference if reference else abs(meso[key])
+        results[key] = (reference, meso[key], difference)
+    return results, micro_time, meso_time
+
+def within_tolerance(results):
+    return all(difference <= TOLERANCES[key] for key, (_, _, difference) in results.items())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparacion del motor mesoscopico con SimulationEngine")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--duration", type=float, default=600.0, help="segundos simulados")
+    args = parser.parse_args()
+
+    passed = True
+    for seed in args.seeds:
+        results, micro_time, meso_time = compare(seed, args.duration)
+        print(f"Semilla {seed}: micro {micro_time:.2f}s, meso {meso_time:.3f}s")
+        for key, (micro, meso, difference) in results.items():
+            status = "ok" if difference <= TOLERANCES[key] else "FUERA"
+            print(f"  {key:>26}: {micro:>9.2f} {meso:>9.2f} {difference:>6.1%} "
+                  f"(tolerancia {TOLERANCES[key]:.0%}) {status}")
+        passed = passed and within_tolerance(results)
+
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,497 @@
+import heapq
+import math
+import random
+import time
+from collections import deque
+from simulation_vehicles import SimulationVehicle, SimulationVehicleManager, LANE_NAMES, LANE_INDEX, LANE_AXIS
+from simulation_counter import SimulationCounter
+from traffic_light_cycle import TrafficLightCycle
+from random_streams import RandomStreams
+from demand_scheduler import DemandScheduler, HeadwayProfile
+from signal_controllers import SIGNAL_CONTROLLERS, create_signal_controller
+from traffic_kernel import EMERGENCY_BRAKE_DISTANCE
+
+EVENT_SIGNAL = 0
+EVENT_DEPARTURE = 1
+EVENT_EXIT = 2
+
+GREEN_LANES = {
+    'left_go': ('horizontal_bottom', 'horizontal_top'),
+    'right_go': ('vertical_left', 'vertical_right'),
+    'off': LANE_NAMES
+}
+
+VEHICLE_TYPES = tuple(SimulationVehicle.BASE_DIMENSIONS)
+
+class MesoVehicle:
+    """Vehiculo del modelo mesoscopico: solo lo necesario para las colas"""
+
+    __slots__ = ('entry_time', 'stop_line_time', 'length', 'speed')
+
+    def __init__(self, entry_time, stop_line_time, length, speed):
+        self.entry_time = entry_time
+        self.stop_line_time = stop_line_time
+        self.length = length
+        self.speed = speed
+
+
+class MesoApproach:
+    """Acceso de la interseccion modelado como una cola FIFO en la linea de detencion"""
+
+    def __init__(self, lane, capacity):
+        self.lane = lane
+        self.capacity = capacity
+        self.reset()
+
+    def reset(self):
+        # Vehiculos que aun no cruzan la linea de detencion, en orden de llegada
+        self.waiting = deque()
+        self.total_length = 0
+
+        # Vehiculos dentro del area (incluye los que ya cruzaron y no han salido)
+        self.occupancy = 0
+
+        self.last_departure = -math.inf
+        self.green_start = None
+        self.departure_token = 0
+        self.blocked = False
+
+
+class MesoscopicEngine:
+    """Motor de eventos discretos para estudios de horizonte largo.
+
+    Cada acceso es una cola con flujo de saturacion: los vehiculos llegan a
+    la linea de detencion tras su tiempo de viaje libre y la cruzan en verde
+    separados por saturation_headway, con startup_lost_time de perdida al
+    inicio de cada verde. El semaforo es el mismo TrafficLightCycle con las
+    fases left_go/caution/right_go, y la duracion de cada verde la decide
+    SimulationCounter.calculate_next_duration con las colas del modelo.
+
+    La simulacion salta de evento en evento (llegadas, salidas de la linea,
+    salidas del area y cambios de fase), asi que un dia de trafico cuesta
+    un par de segundos, unas 150 veces menos que SimulationEngine.
+    get_statistics devuelve las mismas claves que SimulationEngine; 'ticks'
+    cuenta eventos procesados. El tiempo detenido se deriva de la demora en
+    la linea restando lo que el micro pierde frenando y arrancando por
+    encima de su umbral de detencion (ver get_stopped_time).
+
+    Un vehiculo entra solo si deja min_spawn_gap hasta la cola del ultimo
+    de su carril, como SimulationVehicleManager.check_spawn_collision: el
+    frente del ultimo avanza a velocidad libre hasta la cola detenida
+    delante de el, que en rojo empieza a EMERGENCY_BRAKE_DISTANCE de la
+    linea. meso_comparison.py compara ambos motores con sus tolerancias.
+    """
+
+    def __init__(self, sim_area_x=0, sim_area_y=0, sim_area_width=600, sim_area_height=600,
+                 debug=False, seed=None, random_streams=None, lanes_per_approach=1,
+                 saturation_headway=1.6, startup_lost_time=1.0, min_spawn_gap=250,
+                 max_vehicles_per_lane=5):
+        self.sim_area_x = sim_area_x
+        self.sim_area_y = sim_area_y
+        self.sim_area_width = sim_area_width
+        self.sim_area_height = sim_area_height
+
+        self.lanes_per_approach = max(1, min(SimulationVehicleManager.MAX_LANES_PER_APPROACH, lanes_per_approach))
+        self.road_width = 2 * SimulationVehicleManager.LANE_WIDTH * self.lanes_per_approach
+
+        self.saturation_headway = saturation_headway
+        self.startup_lost_time = startup_lost_time
+        self.min_spawn_gap = min_spawn_gap
+        self.jam_gap = 10
+
+        # Umbral de SimulationEngine y tasas de SimulationVehicle.custom_update
+        self.stopped_speed_threshold = 1.0
+        self.deceleration_rate = 4.0
+        self.acceleration_rate = 3.0
+        self.crossing_speed_factor = 1.3
+        self.spawn_margin = 50
+        self.exit_margin = 10
+
+        capacity = max_vehicles_per_lane * self.lanes_per_approach
+        self.approaches = [MesoApproach(lane, capacity) for lane in LANE_NAMES]
+        self.approach_by_lane = {approach.lane: approach for approach in self.approaches}
+
+        # Distancias a lo largo del sentido de avance, iguales a las del modelo micro
+        self.approach_distances = {}
+        self.exit_distances = {}
+        for lane_index, lane in enumerate(LANE_NAMES):
+            extent = sim_area_width if LANE_AXIS[lane_index] == 0 else sim_area_height
+            self.approach_distances[lane] = extent / 2 - self.road_width / 2 + self.spawn_margin
+            self.exit_distances[lane] = extent / 2 + self.road_width / 2 + self.exit_margin
+
+        if random_streams is None and seed is not None:
+            random_streams = RandomStreams(seed)
+        self.random_streams = random_streams
+
+        self.simulation_time = 0.0
+        self.event_count = 0
+        self.running = False
+
+        self.spawn_rng = random
+        self.vehicle_rng = random
+        self.demand_rng = random
+
+        self.spawn_interval = 2.0
+        self.demand_scheduler = None
+        self.set_spawn_interval(self.spawn_interval)
+        self.set_random_streams(random_streams)
+
+        self.traffic_counter = SimulationCounter(
+            sim_area_x, sim_area_y, sim_area_width, sim_area_height, road_width=self.road_width
+        )
+        self.traffic_counter.enable_debug(debug)
+
+        self.traffic_lights = TrafficLightCycle(self.traffic_counter)
+        self.traffic_lights.enable_debug(debug)
+        self.traffic_lights.add_state_listener(self.on_traffic_light_state_changed)
+
+        self.events = []
+        self.event_sequence = 0
+        self.signal_token = 0
+
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        self.queued_vehicles = 0
+        self.reset_statistics()
+
+    def set_random_streams(self, random_streams):
+        if random_streams is None:
+            self.spawn_rng = random
+            self.vehicle_rng = random
+            self.demand_rng = random
+        else:
+            self.spawn_rng = random_streams.spawn
+            self.vehicle_rng = random_streams.vehicle
+            self.demand_rng = random_streams.demand
+
+        self.demand_scheduler.rng = self.demand_rng
+        self.demand_scheduler.reset(self.simulation_time)
+
+    def set_spawn_interval(self, spawn_interval):
+        self.spawn_interval = spawn_interval
+        self.set_demand_profiles(
+            {lane: HeadwayProfile(spawn_interval) for lane in LANE_NAMES},
+            max_backlog=1
+        )
+
+    def set_demand_profiles(self, profiles, max_backlog=None):
+        """Mismos perfiles por nombre de acceso que SimulationVehicleManager"""
+        self.demand_scheduler = DemandScheduler(profiles, rng=self.demand_rng, max_backlog=max_backlog,
+                                               time=self.simulation_time)
+
+    def reset_statistics(self):
+        self.phase_changes = 0
+        self.queued_vehicle_time = 0.0
+        self.max_queued_vehicles = 0
+        self.stopped_vehicle_time = 0.0
+
+    def push_event(self, event_time, kind, approach=None, token=0):
+        heapq.heappush(self.events, (event_time, self.event_sequence, kind, approach, token))
+        self.event_sequence += 1
+
+    def on_traffic_light_state_changed(self, state):
+        if state != 'caution':
+            self.phase_changes += 1
+
+        green_lanes = GREEN_LANES.get(state, ())
+        for approach in self.approaches:
+            if approach.lane in green_lanes:
+                if approach.green_start is None:
+                    approach.green_start = self.simulation_time
+                    self.schedule_departure(approach)
+            elif approach.green_start is not None:
+                approach.green_start = None
+                approach.departure_token += 1
+
+    def start(self):
+        self.running = True
+        self.traffic_lights.reset()
+        self.schedule_signal_change()
+
+    def stop(self):
+        self.running = False
+
+    def reset(self):
+        self.running = False
+
+        # Resembrar antes de limpiar: la demanda se recalcula al limpiar
+        if self.random_streams is not None and self.random_streams.is_seeded():
+            self.random_streams.reseed()
+
+        for approach in self.approaches:
+            approach.reset()
+
+        self.events = []
+        self.event_sequence = 0
+        self.signal_token += 1
+
+        self.simulation_time = 0.0
+        self.event_count = 0
+        self.demand_scheduler.reset(self.simulation_time)
+        self.traffic_counter.clear()
+        self.traffic_lights.reset(notify=False)
+
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        self.queued_vehicles = 0
+        self.reset_statistics()
+
+    def run(self, duration):
+        if not self.running:
+            self.start()
+
+        end_time = self.simulation_time + duration
+        processed = 0
+
+        while True:
+            next_event = self.events[0][0] if self.events else math.inf
+            next_arrival = self.demand_scheduler.get_next_time()
+
+            if min(next_event, next_arrival) > end_time:
+                break
+
+            if next_arrival <= next_event:
+                self.advance_to(next_arrival)
+                self.process_demand()
+            else:
+                event_time, _, kind, approach, token = heapq.heappop(self.events)
+                self.advance_to(event_time)
+                if kind == EVENT_SIGNAL:
+                    self.process_signal_change(token)
+                elif kind == EVENT_DEPARTURE:
+                    self.process_departure(approach, token)
+                else:
+                    self.process_exit(approach)
+
+            processed += 1
+
+        self.advance_to(end_time)
+        self.event_count += processed
+        return processed
+
+    def advance_to(self, event_time):
+        elapsed = event_time - self.simulation_time
+        if elapsed > 0:
+            self.queued_vehicle_time += self.queued_vehicles * elapsed
+            self.simulation_time = event_time
+
+    def schedule_signal_change(self):
+        self.signal_token += 1
+        self.push_event(
+            self.simulation_time + self.traffic_lights.get_time_to_next_change(),
+            EVENT_SIGNAL, token=self.signal_token
+        )
+
+    def process_signal_change(self, token):
+        if token != self.signal_token:
+            return
+
+        # El contador ve las colas del modelo, como veria los vehiculos en el micro
+        for approach in self.approaches:
+            self.traffic_counter.set_lane_stats(
+                approach.lane, len(approach.waiting), approach.total_length, approach.waiting
+            )
+
+        self.traffic_lights.update(self.traffic_lights.get_time_to_next_change())
+        self.schedule_signal_change()
+
+    def process_demand(self):
+        scheduler = self.demand_scheduler
+
+        for lane in scheduler.pop_due(self.simulation_time):
+            approach = self.approach_by_lane[lane]
+            while scheduler.has_backlog(lane) and self.try_enter(approach):
+                scheduler.consume(lane)
+
+    def try_enter(self, approach):
+        """Entrada al acceso; si no hay espacio, el reintento queda agendado"""
+        now = self.simulation_time
+
+        if approach.occupancy >= approach.capacity:
+            # Se reintenta cuando salga un vehiculo del area
+            approach.blocked = True
+            return False
+
+        lanes = self.lanes_per_approach
+        if len(approach.waiting) >= lanes:
+            # Ultimo vehiculo del carril por el que entraria el nuevo: su frente
+            # avanza a velocidad libre hasta la cola detenida delante de el
+            tail = approach.waiting[-lanes]
+            jam_front = (self.approach_distances[approach.lane] - self.get_stop_offset(approach)
+                         - self.get_queue_extent(approach, len(approach.waiting) - lanes) / lanes)
+
+            if jam_front - tail.length < self.min_spawn_gap:
+                # La cola detenida llega a la entrada: se reintenta en la proxima salida
+                approach.blocked = True
+                return False
+
+            ready_time = tail.entry_time + (self.min_spawn_gap + tail.length) / tail.speed
+            if now < ready_time:
+                self.demand_scheduler.retry(approach.lane, ready_time)
+                return False
+
+        vehicle_type = self.spawn_rng.choice(VEHICLE_TYPES)
+        length = SimulationVehicle.BASE_DIMENSIONS[vehicle_type][0]
+        speed = self.vehicle_rng.choice(SimulationVehicle.SPEEDS)
+
+        stop_line_time = now + self.approach_distances[approach.lane] / speed
+        if approach.waiting:
+            # Sin adelantamientos dentro del acceso
+            stop_line_time = max(stop_line_time, approach.waiting[-1].stop_line_time + self.get_headway())
+
+        vehicle = MesoVehicle(now, stop_line_time, length, speed)
+        approach.waiting.append(vehicle)
+        approach.total_length += length
+        approach.occupancy += 1
+        self.traffic_counter.record_arrival(LANE_INDEX[approach.lane])
+
+        self.vehicles_spawned += 1
+        self.queued_vehicles += 1
+        if self.queued_vehicles > self.max_queued_vehicles:
+            self.max_queued_vehicles = self.queued_vehicles
+
+        if len(approach.waiting) == 1:
+            self.schedule_departure(approach)
+
+        return True
+
+    def get_stop_offset(self, approach):
+        """En rojo el lider del micro frena a fondo desde EMERGENCY_BRAKE_DISTANCE
+        y queda detenido a esa distancia de la linea, no sobre ella"""
+        return 0 if approach.green_start is not None else EMERGENCY_BRAKE_DISTANCE
+
+    def get_queue_extent(self, approach, count):
+        """Largo que ocupan detenidos los primeros count vehiculos de la cola"""
+        extent = 0
+        for index in range(count):
+            extent += approach.waiting[index].length + self.jam_gap
+        return extent
+
+    def get_headway(self):
+        """Los carriles de un acceso descargan en paralelo"""
+        return self.saturation_headway / self.lanes_per_approach
+
+    def schedule_departure(self, approach):
+        if approach.green_start is None or not approach.waiting:
+            return
+
+        departure_time = max(
+            self.simulation_time,
+            approach.waiting[0].stop_line_time,
+            approach.last_departure + self.get_headway(),
+            approach.green_start + self.startup_lost_time
+        )
+
+        approach.departure_token += 1
+        self.push_event(departure_time, EVENT_DEPARTURE, approach, approach.departure_token)
+
+    def process_departure(self, approach, token):
+        if token != approach.departure_token or approach.green_start is None:
+            return
+
+        vehicle = approach.waiting.popleft()
+        approach.total_length -= vehicle.length
+        approach.last_departure = self.simulation_time
+        self.queued_vehicles -= 1
+
+        delay = self.simulation_time - vehicle.stop_line_time
+        self.stopped_vehicle_time += self.get_stopped_time(delay, vehicle.speed)
+
+        exit_speed = vehicle.speed * self.crossing_speed_factor
+        exit_distance = self.exit_distances[approach.lane] + vehicle.length
+        self.push_event(self.simulation_time + exit_distance / exit_speed, EVENT_EXIT, approach)
+
+        self.release_entry(approach)
+        self.schedule_departure(approach)
+
+    def get_stopped_time(self, delay, speed):
+        """Parte de la demora en la linea que el micro cuenta como detenido.
+
+        En el micro la velocidad se acerca a la objetivo a una tasa
+        proporcional a la diferencia. Frenando desde speed a la tasa kd tarda
+        ln(speed / s) / kd en bajar del umbral s y recorre (speed - s) / kd,
+        asi que pierde ln(speed / s) / kd - (1 - s / speed) / kd segundos sin
+        contar como detenido. Al arrancar a la tasa ka pierde 1 / ka.
+        """
+        threshold = self.stopped_speed_threshold
+        braking_loss = (math.log(speed / threshold) - (1 - threshold / speed)) / self.deceleration_rate
+        return max(0.0, delay - braking_loss - 1 / self.acceleration_rate)
+
+    def process_exit(self, approach):
+        approach.occupancy -= 1
+        self.vehicles_exited += 1
+
+        self.release_entry(approach)
+
+    def release_entry(self, approach):
+        if approach.blocked:
+            approach.blocked = False
+            self.demand_scheduler.retry(approach.lane, self.simulation_time)
+
+    def get_statistics(self):
+        elapsed = self.simulation_time
+        exited = self.vehicles_exited
+
+        return {
+            'simulation_time': elapsed,
+            'ticks': self.event_count,
+            'vehicles_spawned': self.vehicles_spawned,
+            'vehicles_exited': exited,
+            'throughput_per_hour': exited * 3600.0 / elapsed if elapsed > 0 else 0.0,
+            'phase_changes': self.phase_changes,
+            'mean_queued_vehicles': self.queued_vehicle_time / elapsed if elapsed > 0 else 0.0,
+            'max_queued_vehicles': self.max_queued_vehicles,
+            'stopped_time_per_vehicle': self.stopped_vehicle_time / exited if exited > 0 else 0.0,
+            'vehicles_in_network': sum(approach.occupancy for approach in self.approaches),
+            'lane_changes': 0
+        }
+
+    def set_traffic_light_duration(self, duration):
+        self.traffic_lights.initial_duration = duration
+        if not self.running:
+            self.traffic_lights.duration = duration
+
+    def set_duration_range(self, min_duration, max_duration):
+        self.traffic_counter.set_duration_range(min_duration, max_duration)
+
+    def set_congestion_thresholds(self, count_threshold, length_threshold):
+        self.traffic_counter.set_congestion_thresholds(count_threshold, length_threshold)
+
+    def set_signal_controller(self, controller):
+        self.traffic_lights.set_controller(controller)
+
+    def get_traffic_light_state(self, row=0, col=0):
+        return self.traffic_lights.get_state()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulacion mesoscopica de eventos discretos")
+    parser.add_argument("--duration", type=float, default=86400.0, help="segundos simulados")
+    parser.add_argument("--seed", type=int, default=None, help="semilla para el modo benchmark reproducible")
+    parser.add_argument("--lanes", type=int, default=1, help="carriles por acceso (1 a 4)")
+    parser.add_argument("--saturation-headway", type=float, default=1.6)
+    parser.add_argument("--controller", choices=sorted(SIGNAL_CONTROLLERS), default=None,
+                        help="estrategia de semaforo (por defecto, la regla de congestion del contador)")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    engine = MesoscopicEngine(
+        debug=args.debug,
+        seed=args.seed,
+        lanes_per_approach=args.lanes,
+        saturation_headway=args.saturation_headway
+    )
+
+    if args.controller:
+        engine.set_signal_controller(create_signal_controller(args.controller))
+
+    wall_start = time.perf_counter()
+    events = engine.run(args.duration)
+    wall_elapsed = time.perf_counter() - wall_start
+
+    print(f"Tiempo simulado: {engine.simulation_time:.1f}s en {events} eventos")
+    print(f"Tiempo real: {wall_elapsed:.3f}s ({engine.simulation_time / max(wall_elapsed, 1e-9):.0f}x)")
+    for key, value in engine.get_statistics().items():
+        print(f"  {key}: {value}")
@@ -3,6 +3,11 @@ import math
 from background_element import BackgroundElement
 
 class NightSkyElement(BackgroundElement):
+    __slots__ = (
+        'gradient_colors', 'base_gradient_colors', 'final_day_colors', 'target_gradient_colors',
+        'is_transitioning', 'transition_progress', 'transition_complete'
+    )
+    
     def __init__(self, screen_width, screen_height):
         super().__init__(0, 0, screen_width, screen_height)
         self.element_type = "night_sky"
@@ -105,21 +110,33 @@ class NightSkyElement(BackgroundElement):
         return f"#{r:02x}{g:02x}{b:02x}"
 
 class StarElement(BackgroundElement):
-    def __init__(self, x, y):
-        size = random.randint(2, 4)
+    __slots__ = (
+        'rng', 'base_opacity', 'twinkle_speed', 'twinkle_phase', 'is_twinkling', 'star_color', 'is_fading',
+        'fade_start_time', 'fade_duration', 'initial_opacity'
+    )
+    
+    def __init__(self, x, y, rng=None):
+        self.rng = rng if rng is not None else random
+        
+        size = self.rng.randint(2, 4)
         super().__init__(x, y, size, size)
         self.element_type = "star"
         self.set_depth(-98)
         self.add_tag("group_a")
         self.add_tag("star")
         
-        self.base_opacity = random.uniform(0.6, 1.0)
-        self.twinkle_speed = random.uniform(1.0, 3.0)
-        self.twinkle_phase = random.uniform(0, 2 * math.pi)
+        self.base_opacity = self.rng.uniform(0.6, 1.0)
+        self.twinkle_speed = self.rng.uniform(1.0, 3.0)
+        self.twinkle_phase = self.rng.uniform(0, 2 * math.pi)
         self.is_twinkling = True
         
+        self.is_fading = False
+        self.fade_start_time = None
+        self.fade_duration = 2.0
+        self.initial_opacity = self.base_opacity
+        
         star_colors = ["#ffffff", "#ffffcc", "#ccccff", "#ffcccc"]
-        self.star_color = random.choice(star_colors)
+        self.star_color = self.rng.choice(star_colors)
         self.set_color(self.star_color)
         
         self.set_opacity(self.base_opacity)
@@ -128,7 +145,7 @@ class StarElement(BackgroundElement):
         if not self.active:
             return
             
-        if hasattr(self, 'is_fading') and self.is_fading:
+        if self.is_fading:
             self.update_fade(delta_time)
             return
             
@@ -139,10 +156,10 @@ class StarElement(BackgroundElement):
             self.set_opacity(max(0.2, min(1.0, new_opacity)))
     
     def update_fade(self, delta_time):
-        if not hasattr(self, 'is_fading') or not self.is_fading:
+        if not self.is_fading:
             return
             
-        if not hasattr(self, 'fade_start_time') or self.fade_start_time is None:
+        if self.fade_start_time is None:
             self.fade_start_time = 0
             
         self.fade_start_time += delta_time
@@ -180,10 +197,12 @@ class StarElement(BackgroundElement):
             )
     
     def start_finale_twinkle(self):
-        self.twinkle_speed = random.uniform(8.0, 15.0)
+        self.twinkle_speed = self.rng.uniform(8.0, 15.0)
         self.is_twinkling = True
 
 class MoonElement(BackgroundElement):
+    __slots__ = ('screen_width', 'screen_height', 'moon_color', 'glow_color', 'glow_radius', 'glow_intensity')
+    
     def __init__(self, screen_width, screen_height):
         moon_size = 120
         x = screen_width // 2 - moon_size // 2
@@ -254,6 +273,11 @@ class MoonElement(BackgroundElement):
         return self.y > road_top
 
 class SunElement(BackgroundElement):
+    __slots__ = (
+        'sun_color', 'glow_color', 'glow_radius', 'glow_intensity', 'screen_width', 'screen_height',
+        'target_y', 'is_rising', 'rise_speed', '_debug_counter', '_stopped_debug'
+    )
+    
     def __init__(self, screen_width, screen_height):
         sun_size = 120
         x = screen_width // 2 - sun_size // 2
@@ -277,6 +301,9 @@ class SunElement(BackgroundElement):
         self.target_y = screen_height * 0.15
         self.is_rising = False
         self.rise_speed = 0
+        
+        self._debug_counter = -1
+        self._stopped_debug = False
     
     def start_sunrise(self):
         self.is_rising = True
@@ -297,10 +324,7 @@ class SunElement(BackgroundElement):
     
     def custom_update(self, delta_time):
         if self.is_rising and self.y > self.target_y:
-            if hasattr(self, '_debug_counter'):
-                self._debug_counter += 1
-            else:
-                self._debug_counter = 0
+            self._debug_counter += 1
             
             if self._debug_counter % 30 == 0:  
                 remaining = self.y - self.target_y
@@ -312,7 +336,7 @@ class SunElement(BackgroundElement):
             self.is_rising = False
             print(f"DEBUG: Sol termino ascenso en Y:{self.y:.1f}")
         elif not self.is_rising:
-            if not hasattr(self, '_stopped_debug'):
+            if not self._stopped_debug:
                 print(f"DEBUG: Sol detenido permanentemente en Y:{self.y:.1f}")
                 self._stopped_debug = True
     
@@ -348,14 +372,21 @@ class SunElement(BackgroundElement):
         )
 
 class BuildingSilhouetteElement(BackgroundElement):
-    def __init__(self, x, y, width, height, layer="front"):
+    __slots__ = (
+        'rng', 'layer', 'building_style', 'base_color', 'original_color', 'final_day_color',
+        'is_transitioning_color', 'start_color', 'target_color', 'transition_progress'
+    )
+    
+    def __init__(self, x, y, width, height, layer="front", rng=None):
+        self.rng = rng if rng is not None else random
+        
         super().__init__(x, y, width, height)
         self.element_type = "building_silhouette"
         self.layer = layer
         self.add_tag("group_a")
         self.add_tag("building_silhouette")
         
-        self.building_style = random.choice(["standard", "stepped", "antenna", "dome"])
+        self.building_style = self.rng.choice(["standard", "stepped", "antenna", "dome"])
         
         if layer == "front":
             self.set_depth(-90)
@@ -376,7 +407,7 @@ class BuildingSilhouetteElement(BackgroundElement):
                 "#1a2525", "#25251a", "#202020", "#1a1a2a"
             ]
         
-        self.base_color = random.choice(building_colors)
+        self.base_color = self.rng.choice(building_colors)
         self.original_color = self.base_color
         self.set_color(self.base_color)
         
@@ -411,7 +442,7 @@ class BuildingSilhouetteElement(BackgroundElement):
             self.update_color_transition()
     
     def update_color_transition(self):
-        if self.is_transitioning_color and hasattr(self, 'transition_progress'):
+        if self.is_transitioning_color:
             new_color = self.interpolate_color(self.start_color, self.target_color, self.transition_progress)
             self.set_color(new_color)
             self.base_color = new_color
@@ -480,6 +511,12 @@ class BuildingSilhouetteElement(BackgroundElement):
             )
 
 class RoadElement(BackgroundElement):
+    __slots__ = (
+        'road_color', 'line_color', 'original_road_color', 'original_line_color', 'final_road_color',
+        'final_line_color', 'is_transitioning_color', 'start_road_color', 'start_line_color',
+        'target_road_color', 'target_line_color', 'transition_progress'
+    )
+    
     def __init__(self, screen_width, screen_height):
         road_height = 120
         super().__init__(0, screen_height - road_height, screen_width, road_height)
@@ -520,7 +557,7 @@ class RoadElement(BackgroundElement):
             self.update_color_transition()
     
     def update_color_transition(self):
-        if self.is_transitioning_color and hasattr(self, 'transition_progress'):
+        if self.is_transitioning_color:
             self.road_color = self.interpolate_color(self.start_road_color, self.target_road_color, self.transition_progress)
             self.line_color = self.interpolate_color(self.start_line_color, self.target_line_color, self.transition_progress)
     
@@ -565,7 +602,9 @@ class RoadElement(BackgroundElement):
             )
 
 class NightBackgroundManager:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.elements = []
@@ -584,17 +623,17 @@ class NightBackgroundManager:
         
         far_buildings = self.generate_building_positions(road_top, "far")
         for pos in far_buildings:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "far")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "far", rng=self.rng)
             self.elements.append(building)
         
         distant_buildings = self.generate_building_positions(road_top, "distant")
         for pos in distant_buildings:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "distant")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "distant", rng=self.rng)
             self.elements.append(building)
         
         front_buildings = self.generate_building_positions(road_top, "front")
         for pos in front_buildings:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front", rng=self.rng)
             self.elements.append(building)
         
         moon = MoonElement(self.screen_width, self.screen_height)
@@ -607,14 +646,14 @@ class NightBackgroundManager:
         star_count = 120
         for _ in range(star_count):
             while True:
-                x = random.randint(0, int(self.screen_width * 0.95))
-                y = random.randint(0, int(self.screen_height * 0.7))
+                x = self.rng.randint(0, int(self.screen_width * 0.95))
+                y = self.rng.randint(0, int(self.screen_height * 0.7))
                 
                 distance_to_moon = math.sqrt((x - moon_x)**2 + (y - moon_y)**2)
                 if distance_to_moon > moon_radius:
                     break
             
-            star = StarElement(x, y)
+            star = StarElement(x, y, rng=self.rng)
             self.elements.append(star)
         
         return self.elements
@@ -646,14 +685,14 @@ class NightBackgroundManager:
             max_width = 100
         
         while current_x < self.screen_width + 50:
-            if random.random() < 0.3:
-                width = random.randint(min_width, min_width + 20)
-            elif random.random() < 0.6:
-                width = random.randint(min_width + 20, min_width + 50)
+            if self.rng.random() < 0.3:
+                width = self.rng.randint(min_width, min_width + 20)
+            elif self.rng.random() < 0.6:
+                width = self.rng.randint(min_width + 20, min_width + 50)
             else:
-                width = random.randint(min_width + 50, max_width)
+                width = self.rng.randint(min_width + 50, max_width)
                 
-            height = random.randint(min_height, max_height)
+            height = self.rng.randint(min_height, max_height)
             y = road_top - height
             
             positions.append({
@@ -663,7 +702,7 @@ class NightBackgroundManager:
                 'height': height
             })
             
-            gap = random.randint(min_gap, max_gap)
+            gap = self.rng.randint(min_gap, max_gap)
             current_x += width + gap
         
         return positions
@@ -712,7 +751,7 @@ class NightBackgroundManager:
         
         building_positions = self.generate_building_positions(road_top, "front")
         for pos in building_positions:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front", rng=self.rng)
             building.element_type = "toDay_building"
             self.elements.append(building)
         
@@ -761,7 +800,7 @@ class NightBackgroundManager:
         
         far_positions = self.generate_building_positions(road_top, "far")
         for pos in far_positions:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "far")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "far", rng=self.rng)
             building_final_state = building.get_final_state()
             building.apply_final_state(building_final_state)
             building.set_depth(-97)
@@ -771,7 +810,7 @@ class NightBackgroundManager:
         
         distant_positions = self.generate_building_positions(road_top, "distant")
         for pos in distant_positions:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "distant")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "distant", rng=self.rng)
             building_final_state = building.get_final_state()
             building.apply_final_state(building_final_state)
             building.set_depth(-92)
@@ -781,7 +820,7 @@ class NightBackgroundManager:
         
         front_positions = self.generate_building_positions(road_top, "front")
         for pos in front_positions:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front")
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], "front", rng=self.rng)
             building_final_state = building.get_final_state()
             building.apply_final_state(building_final_state)
             building.set_depth(-90)
@@ -825,9 +864,9 @@ class NightBackgroundManager:
         building_positions = self.generate_building_positions(road_top, "front")
         building_count = 0
         for pos in building_positions:
-            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'])
+            building = BuildingSilhouetteElement(pos['x'], pos['y'], pos['width'], pos['height'], rng=self.rng)
             day_colors = ["#8a8a9a", "#9a8a8a", "#8a9a8a", "#9a8a9a", "#8a9a9a"]
-            building.set_color(random.choice(day_colors))
+            building.set_color(self.rng.choice(day_colors))
             building.element_type = "day_building"
             building.set_depth(-90)
             building.activate()
@@ -0,0 +1,184 @@
+class OccupancyGrid:
+    """Ocupacion de la zona de conflicto de una interseccion.
+
+    La caja de la interseccion se divide en celdas de cell_size; la celda k
+    = fila * cols + columna es el bit k de los bitsets. Cada vehiculo guarda
+    la mascara de las celdas que toca su rectangulo y solo se actualizan las
+    celdas que cambian, asi que las consultas ("la caja esta libre", "quien
+    ocupa la celda k", "que accesos estan bloqueados") no recorren vehiculos.
+    """
+
+    def __init__(self, bounds, cell_size=25, lane_count=4):
+        self.left = bounds['left']
+        self.top = bounds['top']
+        self.right = bounds['right']
+        self.bottom = bounds['bottom']
+        self.cell_size = cell_size
+
+        self.cols = max(1, -(-(self.right - self.left) // cell_size))
+        self.rows = max(1, -(-(self.bottom - self.top) // cell_size))
+        self.cell_count = self.cols * self.rows
+        self.all_cells = (1 << self.cell_count) - 1
+
+        # Progreso del borde de entrada por (eje, sentido) del vehiculo
+        self.entry_progress = {
+            (0, 1): self.left, (0, -1): -self.right,
+            (1, 1): self.top, (1, -1): -self.bottom
+        }
+
+        self.occupants = [set() for _ in range(self.cell_count)]
+        self.vehicle_masks = {}
+        self.occupied = 0
+
+        # Celdas ocupadas por cada acceso, con un contador por celda
+        self.lane_count = lane_count
+        self.lane_counts = [[0] * self.cell_count for _ in range(lane_count)]
+        self.lane_cells = [0] * lane_count
+
+        # Celdas que recorre cada acceso; por defecto toda la caja
+        self.approach_paths = [self.all_cells] * lane_count
+
+        # Se llaman con el vehiculo cuando su rectangulo empieza a tocar la caja
+        self.enter_listeners = []
+
+    def add_enter_listener(self, callback):
+        if callback not in self.enter_listeners:
+            self.enter_listeners.append(callback)
+
+    def remove_enter_listener(self, callback):
+        if callback in self.enter_listeners:
+            self.enter_listeners.remove(callback)
+
+    def clear(self):
+        for cell in self.occupants:
+            cell.clear()
+        self.vehicle_masks.clear()
+        self.occupied = 0
+        self.lane_counts = [[0] * self.cell_count for _ in range(self.lane_count)]
+        self.lane_cells = [0] * self.lane_count
+
+    def get_cell_index(self, col, row):
+        return row * self.cols + col
+
+    def get_rect_mask(self, x1, y1, x2, y2):
+        """Mascara de las celdas que toca el rectangulo semiabierto
+        [x1, x2) x [y1, y2), 0 si no se superpone con la caja"""
+        if x2 <= self.left or x1 >= self.right or y2 <= self.top or y1 >= self.bottom:
+            return 0
+
+        cell_size = self.cell_size
+        first_col = max(0, int((x1 - self.left) // cell_size))
+        last_col = min(self.cols - 1, int(-((self.left - x2) // cell_size)) - 1)
+        first_row = max(0, int((y1 - self.top) // cell_size))
+        last_row = min(self.rows - 1, int(-((self.top - y2) // cell_size)) - 1)
+
+        row_mask = ((1 << (last_col - first_col + 1)) - 1) << first_col
+        mask = 0
+        for row in range(first_row, last_row + 1):
+            mask |= row_mask << (row * self.cols)
+        return mask
+
+    def set_approach_path(self, lane_index, axis, low, high):
+        """Franja transversal [low, high] que ocupa el acceso al atravesar la caja
+        (axis 0: el acceso circula en x, la franja es en y; axis 1 al reves)"""
+        if axis == 0:
+            self.approach_paths[lane_index] = self.get_rect_mask(self.left, low, self.right, high)
+        else:
+            self.approach_paths[lane_index] = self.get_rect_mask(low, self.top, high, self.bottom)
+
+    def update(self, vehicle):
+        x = vehicle.x
+        y = vehicle.y
+        mask = self.get_rect_mask(x, y, x + vehicle.width, y + vehicle.height)
+        previous = self.vehicle_masks.get(vehicle, 0)
+        if mask == previous:
+            return
+
+        if mask:
+            self.vehicle_masks[vehicle] = mask
+        else:
+            del self.vehicle_masks[vehicle]
+
+        self.apply_change(vehicle, previous, mask)
+
+        if not previous:
+            for callback in self.enter_listeners:
+                callback(vehicle)
+
+    def update_all(self, vehicles):
+        for vehicle in vehicles:
+            self.update(vehicle)
+
+    def update_lane(self, queue):
+        """Actualizar una cola ordenada de adelante hacia atras; se corta en el
+        primer vehiculo que todavia no llego a la caja, ya que los de atras
+        tampoco llegaron"""
+        if not queue:
+            return
+
+        head = queue[0]
+        entry_progress = self.entry_progress[head.axis, head.sign]
+        for vehicle in queue:
+            if vehicle.get_front_progress() <= entry_progress:
+                break
+            self.update(vehicle)
+
+    def remove(self, vehicle):
+        previous = self.vehicle_masks.pop(vehicle, 0)
+        if previous:
+            self.apply_change(vehicle, previous, 0)
+
+    def apply_change(self, vehicle, previous, mask):
+        occupants = self.occupants
+        lane_index = vehicle.lane_index
+        lane_counts = self.lane_counts[lane_index]
+
+        removed = previous & ~mask
+        while removed:
+            bit = removed & -removed
+            removed ^= bit
+            cell = bit.bit_length() - 1
+
+            occupants[cell].discard(vehicle)
+            if not occupants[cell]:
+                self.occupied &= ~bit
+
+            lane_counts[cell] -= 1
+            if lane_counts[cell] == 0:
+                self.lane_cells[lane_index] &= ~bit
+
+        added = mask & ~previous
+        while added:
+            bit = added & -added
+            added ^= bit
+            cell = bit.bit_length() - 1
+
+            occupants[cell].add(vehicle)
+            self.occupied |= bit
+
+            lane_counts[cell] += 1
+            self.lane_cells[lane_index] |= bit
+
+    def contains(self, vehicle):
+        return vehicle in self.vehicle_masks
+
+    def is_clear(self):
+        return self.occupied == 0
+
+    def is_cell_occupied(self, cell):
+        return bool(self.occupied >> cell & 1)
+
+    def get_occupants(self, cell):
+        return self.occupants[cell]
+
+    def is_approach_blocked(self, lane_index):
+        """True si algun vehiculo de otro acceso ocupa celdas del recorrido de lane_index"""
+        others = 0
+        for index, cells in enumerate(self.lane_cells):
+            if index != lane_index:
+                others |= cells
+        return (others & self.approach_paths[lane_index]) != 0
+
+    def get_blocked_approaches(self):
+        """Indices de los accesos bloqueados"""
+        return [lane_index for lane_index in range(self.lane_count) if self.is_approach_blocked(lane_index)]
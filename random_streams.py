@@ -0,0 +1,40 @@
+import random
+
+class RandomStreams:
+    """Generadores aleatorios independientes por subsistema.
+
+    Cada flujo se siembra a partir de la semilla comun y de su nombre, de
+    modo que consumir numeros en un subsistema (por ejemplo el fondo) no
+    altera la secuencia de otro (por ejemplo la aparicion de vehiculos).
+    Con seed=None los flujos se siembran desde el sistema operativo.
+    """
+
+    STREAM_NAMES = ('spawn', 'vehicle', 'background', 'timer', 'demand')
+
+    def __init__(self, seed=None):
+        self.seed = seed
+        self.streams = {name: random.Random() for name in self.STREAM_NAMES}
+
+        self.spawn = self.streams['spawn']
+        self.vehicle = self.streams['vehicle']
+        self.background = self.streams['background']
+        self.timer = self.streams['timer']
+        self.demand = self.streams['demand']
+
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+
+        for name, stream in self.streams.items():
+            if self.seed is None:
+                stream.seed()
+            else:
+                stream.seed(f"{self.seed}:{name}")
+
+    def get(self, name):
+        return self.streams[name]
+
+    def is_seeded(self):
+        return self.seed is not None
@@ -0,0 +1,46 @@
+import argparse
+import os
+import time
+from simulation_engine import SimulationEngine
+from sharded_network import ShardedSimulation
+
+def run_single(rows, cols, duration, seed):
+    """TrafficNetwork en un solo proceso, la referencia de los shards"""
+    engine = SimulationEngine(seed=seed, grid=(rows, cols))
+    start = time.perf_counter()
+    engine.run(duration)
+    return time.perf_counter() - start, engine.get_statistics()
+
+def run_sharded(rows, cols, shards, duration, seed):
+    """Tiempo de run() sin contar el arranque de los procesos"""
+    simulation = ShardedSimulation(rows, cols, shards=shards, seed=seed)
+    try:
+        simulation.start()
+        start = time.perf_counter()
+        simulation.run(duration)
+        elapsed = time.perf_counter() - start
+        return elapsed, simulation.shards, simulation.get_statistics()
+    finally:
+        simulation.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escalado de ShardedSimulation con el numero de procesos")
+    parser.add_argument("--grid", type=int, nargs=2, metavar=("FILAS", "COLUMNAS"), default=(4, 8))
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=60.0, help="segundos simulados")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rows, cols = args.grid
+    # Con menos CPUs que shards los procesos se turnan y el reparto solo suma costo
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    print(f"Red {rows}x{cols}, {args.duration:.0f}s simulados, {cpus} CPUs disponibles")
+
+    single_time, statistics = run_single(rows, cols, args.duration, args.seed)
+    print(f"{'shards':>7} {'segundos':>9} {'vs 1 proceso':>13} {'throughput':>11}")
+    print(f"{'-':>7} {single_time:>9.2f} {1.0:>12.2f}x {statistics['throughput_per_hour']:>11.0f}")
+
+    for shards in args.shards:
+        elapsed, used, statistics = run_sharded(rows, cols, shards, args.duration, args.seed)
+        print(f"{used:>7} {elapsed:>9.2f} {single_time / elapsed:>12.2f}x "
+              f"{statistics['throughput_per_hour']:>11.0f}")
@@ -0,0 +1,657 @@
+import math
+import time
+import threading
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from traffic_network import TrafficNetwork
+from simulation_vehicles import LANE_INDEX, LANE_AXIS, LANE_SIGN
+from random_streams import RandomStreams
+from signal_controllers import SIGNAL_CONTROLLERS, create_signal_controller
+from vehicle_store import FLAG_EMERGENCY_BRAKE, FLAG_CROSSED_INTERSECTION, FLAG_COLLISION_LOCK
+
+# Registro de un vehiculo que cruza a otro shard, en doubles
+RECORD_FIELDS = (
+    'corridor', 'segment', 'vehicle_type', 'x', 'y',
+    'base_speed', 'current_speed', 'target_speed',
+    'traffic_light_target_speed', 'last_distance_to_ahead', 'flags'
+)
+RECORD_SIZE = len(RECORD_FIELDS)
+
+# Vehiculo mas atrasado de cada corredor dentro de un shard: valido, x, y, ancho, alto, velocidad
+GHOST_SIZE = 6
+
+# Cabecera por shard: vehiculos en el buzon, vehiculos en cola en el ultimo paso
+HEADER_SIZE = 2
+
+DEFAULT_PARAMETERS = {
+    'traffic_light_duration': 10.0,
+    'min_duration': 10.0,
+    'max_duration': 20.0,
+    'congestion_count_threshold': 8,
+    'congestion_length_threshold': 400,
+    'spawn_interval': 2.0,
+    'controller': None
+}
+
+class BoundaryVehicle:
+    """Copia de solo lectura del lider que simula el shard de adelante"""
+
+    def __init__(self, x, y, width, height, current_speed, lane_index=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.current_speed = current_speed
+        self.follower = None
+
+        self.axis = LANE_AXIS[lane_index]
+        self.sign = LANE_SIGN[lane_index]
+
+    def get_rear_progress(self):
+        if self.axis == 0:
+            return self.sign * self.x - (0 if self.sign > 0 else self.width)
+        return self.sign * self.y - (0 if self.sign > 0 else self.height)
+
+
+class ShardNetwork(TrafficNetwork):
+    """Franja de una TrafficNetwork simulada por un proceso.
+
+    Todos los shards construyen la misma geometria, pero cada uno solo
+    actualiza los semaforos y los tramos de corredor de las intersecciones
+    de su franja (columnas o filas contiguas, segun axis). Los vehiculos que
+    pasan a un tramo de otro shard se empaquetan en outgoing, y el lider
+    que esta del otro lado del borde llega como BoundaryVehicle en ghosts.
+    """
+
+    def __init__(self, rows, cols, shard_index, owners, axis='col', sim_area_x=0, sim_area_y=0,
+                 block_length=300, road_width=100, debug=False):
+        self.shard_index = shard_index
+        self.owners = owners
+        self.axis = axis
+
+        super().__init__(rows, cols, sim_area_x, sim_area_y, block_length, road_width, debug)
+
+        self.owned_junctions = [junction for junction in self.junctions if self.owns_junction(junction)]
+
+        # Por corredor: tramos propios y ajenos, en orden de avance
+        self.owned_segments = []
+        self.foreign_segments = []
+        for corridor in self.corridors:
+            owners = [self.get_segment_owner(corridor, segment) for segment in range(len(corridor.queues))]
+            self.owned_segments.append([segment for segment, owner in enumerate(owners) if owner == shard_index])
+            self.foreign_segments.append([segment for segment, owner in enumerate(owners) if owner != shard_index])
+        self.ghosts = [None] * len(self.corridors)
+        self.in_transit = [None] * len(self.corridors)
+        self.outgoing = []
+        self.phase_changes = 0
+
+        for junction in self.owned_junctions:
+            junction.traffic_lights.add_state_listener(self.on_traffic_light_state_changed)
+
+    def owns_junction(self, junction):
+        index = junction.col if self.axis == 'col' else junction.row
+        return self.owners[index] == self.shard_index
+
+    def get_segment_owner(self, corridor, segment):
+        # El tramo de salida pertenece al shard de la ultima interseccion
+        junction = corridor.junctions[min(segment, len(corridor.junctions) - 1)]
+        return self.owners[junction.col if self.axis == 'col' else junction.row]
+
+    def on_traffic_light_state_changed(self, state):
+        if state != 'caution':
+            self.phase_changes += 1
+
+    def set_demand_profiles(self, profiles, max_backlog=None):
+        """Solo genera demanda el shard dueno de la entrada de cada corredor"""
+        profiles = {
+            index: profile for index, profile in profiles.items()
+            if self.get_segment_owner(self.corridors[index], 0) == self.shard_index
+        }
+        super().set_demand_profiles(profiles, max_backlog)
+
+    def update_traffic_lights(self, delta_time):
+        for junction in self.owned_junctions:
+            junction.traffic_lights.update(delta_time)
+
+    def update(self, delta_time):
+        self.queued_vehicles = 0
+
+        if self.demand_scheduler.get_next_time() <= self.demand_time:
+            self.process_demand()
+        self.demand_time += delta_time
+
+        for index, corridor in enumerate(self.corridors):
+            self.hand_over_vehicles(corridor)
+
+            self.update_corridor(corridor, self.get_corridor_leader(index))
+
+    def get_corridor_leader(self, index):
+        # Un vehiculo recien enviado esta detras de todos los del otro shard
+        return self.in_transit[index] or self.ghosts[index]
+
+    def collect_outgoing(self):
+        """Sacar los vehiculos que quedaron en tramos de otro shard"""
+        self.outgoing = []
+
+        for index, corridor in enumerate(self.corridors):
+            self.in_transit[index] = None
+
+            for segment in self.foreign_segments[index]:
+                queue = corridor.queues[segment]
+                while queue:
+                    vehicle = queue.popleft()
+                    if segment < len(corridor.junctions):
+                        corridor.junctions[segment].occupancy.remove(vehicle)
+                    self.outgoing.append(self.pack_vehicle(index, segment, vehicle))
+                    self.in_transit[index] = BoundaryVehicle(
+                        vehicle.x, vehicle.y, vehicle.width, vehicle.height, vehicle.current_speed,
+                        vehicle.lane_index
+                    )
+                    self.remove_vehicle(vehicle)
+
+        return self.outgoing
+
+    def pack_vehicle(self, corridor_index, segment, vehicle):
+        flags = 0
+        if vehicle.emergency_brake_active:
+            flags |= FLAG_EMERGENCY_BRAKE
+        if vehicle.has_crossed_intersection:
+            flags |= FLAG_CROSSED_INTERSECTION
+        if vehicle.collision_lock_active:
+            flags |= FLAG_COLLISION_LOCK
+
+        return (
+            corridor_index, segment, self.vehicle_types.index(vehicle.vehicle_type),
+            vehicle.x, vehicle.y,
+            vehicle.base_speed, vehicle.current_speed, vehicle.target_speed,
+            math.nan if vehicle.traffic_light_target_speed is None else vehicle.traffic_light_target_speed,
+            math.nan if vehicle.last_distance_to_ahead is None else vehicle.last_distance_to_ahead,
+            flags
+        )
+
+    def receive_vehicle(self, record):
+        (corridor_index, segment, vehicle_type, x, y, base_speed, current_speed, target_speed,
+         traffic_light_target_speed, last_distance_to_ahead, flags) = record
+
+        corridor = self.corridors[int(corridor_index)]
+        segment = int(segment)
+        flags = int(flags)
+
+        vehicle = self.vehicle_pool.acquire(
+            self.vehicle_types[int(vehicle_type)], corridor.lane, corridor.direction, rng=self.vehicle_rng
+        )
+        vehicle.set_intersection_bounds(corridor.get_bounds(segment))
+
+        vehicle.x = x
+        vehicle.y = y
+        vehicle.original_x = x
+        vehicle.original_y = y
+        vehicle.base_speed = base_speed
+        vehicle.current_speed = current_speed
+        vehicle.target_speed = target_speed
+        vehicle.traffic_light_target_speed = (
+            None if math.isnan(traffic_light_target_speed) else traffic_light_target_speed
+        )
+        vehicle.last_distance_to_ahead = None if math.isnan(last_distance_to_ahead) else last_distance_to_ahead
+        vehicle.emergency_brake_active = bool(flags & FLAG_EMERGENCY_BRAKE)
+        vehicle.has_crossed_intersection = bool(flags & FLAG_CROSSED_INTERSECTION)
+        vehicle.collision_lock_active = bool(flags & FLAG_COLLISION_LOCK)
+
+        if vehicle.axis == 0:
+            vehicle.set_velocity(current_speed * corridor.direction, 0)
+        else:
+            vehicle.set_velocity(0, current_speed * corridor.direction)
+
+        vehicle.activate()
+        vehicle.show()
+        vehicle.set_clip_bounds(self.clip_bounds)
+
+        corridor.queues[segment].append(vehicle)
+        if segment < len(corridor.junctions):
+            corridor.junctions[segment].traffic_counter.record_arrival(vehicle.lane_index)
+
+    def get_boundary_vehicle(self, index):
+        """Vehiculo mas atrasado de este shard en el corredor, o None"""
+        queues = self.corridors[index].queues
+        for segment in self.owned_segments[index]:
+            if queues[segment]:
+                return queues[segment][-1]
+        return None
+
+    def count_vehicles(self):
+        return sum(corridor.count() for corridor in self.corridors)
+
+
+class ShardBuffers:
+    """Vista de la memoria compartida de la simulacion por shards.
+
+    Hay dos copias (paridad del paso) de una region por shard con la
+    cabecera, los fantasmas de borde y el buzon de salida. En el paso t cada
+    shard lee la paridad t % 2 y escribe la otra; la barrera al final del
+    paso separa escrituras y lecturas, asi que no hacen falta locks.
+    """
+
+    def __init__(self, shards, corridors, max_transfers, name=None):
+        self.shards = shards
+        self.corridors = corridors
+        self.max_transfers = max_transfers
+
+        self.region_size = HEADER_SIZE + corridors * GHOST_SIZE + max_transfers * RECORD_SIZE
+        size = 2 * shards * self.region_size * 8
+
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self.values = self.memory.buf.cast('d')
+        if self.owner:
+            for index in range(len(self.values)):
+                self.values[index] = 0.0
+
+    def get_offset(self, parity, shard):
+        return (parity * self.shards + shard) * self.region_size
+
+    def write(self, parity, shard, records, queued, ghosts):
+        values = self.values
+        offset = self.get_offset(parity, shard)
+
+        if len(records) > self.max_transfers:
+            raise OverflowError(f"Shard {shard}: {len(records)} vehiculos en un paso, max_transfers={self.max_transfers}")
+
+        values[offset] = len(records)
+        values[offset + 1] = queued
+
+        position = offset + HEADER_SIZE
+        for ghost in ghosts:
+            if ghost is None:
+                values[position] = 0.0
+            else:
+                values[position] = 1.0
+                values[position + 1] = ghost.x
+                values[position + 2] = ghost.y
+                values[position + 3] = ghost.width
+                values[position + 4] = ghost.height
+                values[position + 5] = ghost.current_speed
+            position += GHOST_SIZE
+
+        for record in records:
+            for value in record:
+                values[position] = value
+                position += 1
+
+    def read_records(self, parity, shard):
+        values = self.values
+        offset = self.get_offset(parity, shard)
+        count = int(values[offset])
+
+        position = offset + HEADER_SIZE + self.corridors * GHOST_SIZE
+        records = []
+        for _ in range(count):
+            records.append(tuple(values[position:position + RECORD_SIZE]))
+            position += RECORD_SIZE
+        return records
+
+    def read_ghost(self, parity, shard, corridor, lane_index=0):
+        values = self.values
+        position = self.get_offset(parity, shard) + HEADER_SIZE + corridor * GHOST_SIZE
+        if values[position] == 0.0:
+            return None
+        return BoundaryVehicle(*values[position + 1:position + GHOST_SIZE], lane_index)
+
+    def read_queued(self, parity, shard):
+        return int(self.values[self.get_offset(parity, shard) + 1])
+
+    def read_transfer_count(self, parity, shard):
+        return int(self.values[self.get_offset(parity, shard)])
+
+    def close(self):
+        try:
+            self.values.release()
+            self.memory.close()
+        finally:
+            if self.owner:
+                self.memory.unlink()
+
+
+def split_owners(count, shards):
+    """Repartir count columnas (o filas) en shards franjas contiguas"""
+    owners = []
+    for shard in range(shards):
+        start = shard * count // shards
+        end = (shard + 1) * count // shards
+        owners.extend([shard] * (end - start))
+    return owners
+
+
+def send_error(connection, error):
+    details = traceback.format_exc()
+    try:
+        connection.send(('error', error, details))
+    except (BrokenPipeError, OSError):
+        pass
+    except Exception:
+        # La excepcion no se puede serializar: se envia su descripcion
+        connection.send(('error', RuntimeError(repr(error)), details))
+
+def run_shard(shard_index, config, buffer_name, barrier, connection):
+    """Proceso de un shard. Si algo falla, rompe la barrera para que los demas
+    shards no esperen este paso y envia la excepcion al proceso principal"""
+    try:
+        simulate_shard(shard_index, config, buffer_name, barrier, connection)
+    except Exception as error:
+        barrier.abort()
+        send_error(connection, error)
+    finally:
+        connection.close()
+
+def simulate_shard(shard_index, config, buffer_name, barrier, connection):
+    """Ejecuta pasos en sincronia con los demas shards hasta recibir 'stop'"""
+    rows, cols = config['grid']
+    shards = config['shards']
+    axis = config['axis']
+    parameters = config['parameters']
+
+    network = ShardNetwork(
+        rows, cols, shard_index, config['owners'], axis,
+        block_length=config['block_length'], debug=config['debug']
+    )
+    if config['seed'] is not None:
+        network.set_random_streams(RandomStreams(f"{config['seed']}/{shard_index}"))
+
+    network.set_spawn_interval(parameters['spawn_interval'])
+    network.set_traffic_light_duration(parameters['traffic_light_duration'])
+    network.set_duration_range(parameters['min_duration'], parameters['max_duration'])
+    network.set_congestion_thresholds(
+        parameters['congestion_count_threshold'], parameters['congestion_length_threshold']
+    )
+    if parameters['controller']:
+        network.set_signal_controller(create_signal_controller(
+            parameters['controller'], parameters['min_duration'], parameters['max_duration']
+        ))
+    network.reset_traffic_lights()
+
+    buffers = ShardBuffers(shards, len(network.corridors), config['max_transfers'], buffer_name)
+
+    # Para cada corredor, los shards que estan adelante en orden de avance
+    downstream_shards = []
+    for corridor in network.corridors:
+        order = []
+        for segment in range(len(corridor.queues)):
+            owner = network.get_segment_owner(corridor, segment)
+            if owner not in order:
+                order.append(owner)
+        position = order.index(shard_index) if shard_index in order else len(order)
+        downstream_shards.append(order[position + 1:])
+    lane_indexes = [LANE_INDEX[corridor.lane] for corridor in network.corridors]
+
+    delta_time = config['fixed_step']
+    parity = 0
+
+    queued_vehicle_time = 0.0
+    stopped_vehicle_time = 0.0
+    max_queued_vehicles = 0
+
+    try:
+        while True:
+            command = connection.recv()
+            if command[0] == 'stop':
+                break
+
+            ticks = command[1]
+            for _ in range(ticks):
+                for source in range(shards):
+                    if source == shard_index:
+                        continue
+                    for record in buffers.read_records(parity, source):
+                        if int(record[1]) in network.owned_segments[int(record[0])]:
+                            network.receive_vehicle(record)
+
+                for index, shards_ahead in enumerate(downstream_shards):
+                    ghost = None
+                    for source in shards_ahead:
+                        ghost = buffers.read_ghost(parity, source, index, lane_indexes[index])
+                        if ghost is not None:
+                            break
+                    network.ghosts[index] = ghost
+
+                network.update_traffic_lights(delta_time)
+                network.update(delta_time)
+                network.integrate(delta_time)
+                outgoing = network.collect_outgoing()
+
+                queued_vehicle_time += network.queued_vehicles * delta_time
+                stopped_vehicle_time += network.stopped_vehicles * delta_time
+
+                ghosts = [network.get_boundary_vehicle(index) for index in range(len(network.corridors))]
+                buffers.write(1 - parity, shard_index, outgoing, network.queued_vehicles, ghosts)
+
+                barrier.wait(config['barrier_timeout'])
+                parity = 1 - parity
+
+                if shard_index == 0:
+                    queued = sum(buffers.read_queued(parity, shard) for shard in range(shards))
+                    max_queued_vehicles = max(max_queued_vehicles, queued)
+
+            connection.send(('statistics', {
+                'vehicles_spawned': network.vehicles_spawned,
+                'vehicles_exited': network.vehicles_exited,
+                'phase_changes': network.phase_changes,
+                'queued_vehicle_time': queued_vehicle_time,
+                'stopped_vehicle_time': stopped_vehicle_time,
+                'max_queued_vehicles': max_queued_vehicles,
+                'vehicles_in_network': network.count_vehicles() + buffers.read_transfer_count(parity, shard_index)
+            }))
+    finally:
+        buffers.close()
+
+
+class ShardedSimulation:
+    """Red de intersecciones repartida en shards, cada uno en su proceso.
+
+    La red se corta en franjas contiguas de columnas (o de filas, si hay mas
+    filas que columnas) y cada franja la simula un ShardNetwork en su propio
+    proceso, con el mismo paso fijo para todos. Al final de cada paso los
+    vehiculos que cruzan un borde y el ultimo vehiculo de cada corredor se
+    publican en memoria compartida, y una barrera mantiene a los procesos en
+    sincronia. La frontera tiene un paso de retraso, asi que el resultado no
+    es identico al de TrafficNetwork en un proceso, pero con semilla si es
+    reproducible para un mismo numero de shards.
+
+    Cada paso paga la barrera y el intercambio de la frontera, asi que solo
+    conviene con al menos un CPU libre por shard; con menos CPUs que shards
+    es mas lento que un proceso. shard_benchmark.py mide el escalado.
+
+    get_statistics devuelve las mismas claves que SimulationEngine.
+    """
+
+    def __init__(self, rows, cols, shards=None, block_length=300, fixed_step=1.0 / 60.0,
+                 seed=None, parameters=None, max_transfers=64, barrier_timeout=60.0, debug=False):
+        self.rows = rows
+        self.cols = cols
+
+        self.axis = 'col' if cols >= rows else 'row'
+        strips = cols if self.axis == 'col' else rows
+        if shards is None:
+            shards = multiprocessing.cpu_count()
+        self.shards = max(1, min(shards, strips))
+
+        self.fixed_step = fixed_step
+
+        merged_parameters = dict(DEFAULT_PARAMETERS)
+        merged_parameters.update(parameters or {})
+
+        self.config = {
+            'grid': (rows, cols),
+            'shards': self.shards,
+            'axis': self.axis,
+            'owners': split_owners(strips, self.shards),
+            'block_length': block_length,
+            'fixed_step': fixed_step,
+            'seed': seed,
+            'parameters': merged_parameters,
+            'max_transfers': max_transfers,
+            'barrier_timeout': barrier_timeout,
+            'debug': debug
+        }
+
+        self.buffers = None
+        self.processes = []
+        self.connections = []
+
+        self.simulation_time = 0.0
+        self.tick_count = 0
+        self.shard_statistics = []
+
+    def start(self):
+        if self.processes:
+            return
+
+        corridors = 2 * (self.rows + self.cols)
+        self.buffers = ShardBuffers(self.shards, corridors, self.config['max_transfers'])
+        barrier = multiprocessing.Barrier(self.shards)
+
+        for shard_index in range(self.shards):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_shard,
+                args=(shard_index, self.config, self.buffers.memory.name, barrier, child_connection),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+
+    def run(self, duration):
+        self.start()
+
+        ticks = int(round(duration / self.fixed_step))
+        for connection in self.connections:
+            try:
+                connection.send(('run', ticks))
+            except (BrokenPipeError, OSError):
+                # El shard ya termino; su error queda pendiente en la conexion
+                pass
+        self.shard_statistics = self.receive_statistics()
+
+        self.tick_count += ticks
+        self.simulation_time += ticks * self.fixed_step
+        return ticks
+
+    def receive_statistics(self):
+        """Respuesta de cada shard al comando 'run'. Si alguno fallo, cierra la
+        simulacion y relanza su excepcion"""
+        statistics = [None] * self.shards
+        errors = []
+        pending = {connection: index for index, connection in enumerate(self.connections)}
+
+        # Despues del primer error los demas shards encuentran la barrera rota
+        # enseguida; uno trabado en otro lado no responde y se lo termina
+        deadline = None
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready = wait(list(pending), timeout)
+            if not ready:
+                break
+
+            for connection in ready:
+                index = pending.pop(connection)
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    message = ('error', RuntimeError(f"El shard {index} termino sin responder"), '')
+
+                if message[0] == 'statistics':
+                    statistics[index] = message[1]
+                    continue
+
+                errors.append((index, message[1], message[2]))
+                if deadline is None:
+                    deadline = time.monotonic() + self.config['barrier_timeout']
+
+        if errors:
+            self.close()
+            # La causa es el primer error que no sea la barrera rota por otro shard
+            index, error, details = min(
+                errors, key=lambda entry: isinstance(entry[1], threading.BrokenBarrierError)
+            )
+            raise error from RuntimeError(f"Traceback del shard {index}:\n{details}")
+
+        return statistics
+
+    def get_statistics(self):
+        elapsed = self.simulation_time
+        shard_statistics = self.shard_statistics
+
+        def total(key):
+            return sum(statistics[key] for statistics in shard_statistics)
+
+        exited = total('vehicles_exited') if shard_statistics else 0
+
+        return {
+            'simulation_time': elapsed,
+            'ticks': self.tick_count,
+            'vehicles_spawned': total('vehicles_spawned') if shard_statistics else 0,
+            'vehicles_exited': exited,
+            'throughput_per_hour': exited * 3600.0 / elapsed if elapsed > 0 else 0.0,
+            'phase_changes': total('phase_changes') if shard_statistics else 0,
+            'mean_queued_vehicles': total('queued_vehicle_time') / elapsed if elapsed > 0 else 0.0,
+            'max_queued_vehicles': shard_statistics[0]['max_queued_vehicles'] if shard_statistics else 0,
+            'stopped_time_per_vehicle': total('stopped_vehicle_time') / exited if exited > 0 else 0.0,
+            'vehicles_in_network': total('vehicles_in_network') if shard_statistics else 0,
+            'lane_changes': 0
+        }
+
+    def close(self):
+        for connection in self.connections:
+            try:
+                connection.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self.processes = []
+        self.connections = []
+
+        if self.buffers is not None:
+            self.buffers.close()
+            self.buffers = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Red de intersecciones repartida en procesos")
+    parser.add_argument("--grid", type=int, nargs=2, metavar=("FILAS", "COLUMNAS"), default=(4, 8))
+    parser.add_argument("--shards", type=int, default=None, help="procesos (por defecto, uno por CPU)")
+    parser.add_argument("--duration", type=float, default=600.0, help="segundos simulados")
+    parser.add_argument("--dt", type=float, default=1.0 / 60.0, help="paso de simulacion en segundos")
+    parser.add_argument("--seed", type=int, default=None, help="semilla para el modo benchmark reproducible")
+    parser.add_argument("--controller", choices=sorted(SIGNAL_CONTROLLERS), default=None,
+                        help="estrategia de semaforo (por defecto, la regla de congestion del contador)")
+    args = parser.parse_args()
+
+    simulation = ShardedSimulation(args.grid[0], args.grid[1], args.shards, fixed_step=args.dt, seed=args.seed,
+                                   parameters={'controller': args.controller})
+    try:
+        wall_start = time.perf_counter()
+        ticks = simulation.run(args.duration)
+        wall_elapsed = time.perf_counter() - wall_start
+    finally:
+        simulation.close()
+
+    print(f"Tiempo simulado: {simulation.simulation_time:.1f}s en {ticks} pasos con {simulation.shards} shards")
+    print(f"Tiempo real: {wall_elapsed:.2f}s ({simulation.simulation_time / max(wall_elapsed, 1e-9):.1f}x)")
+    for key, value in simulation.get_statistics().items():
+        print(f"  {key}: {value}")
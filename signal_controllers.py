@@ -0,0 +1,195 @@
+import math
+from collections import namedtuple
+from simulation_vehicles import LANE_NAMES, LANE_INDEX
+
+# Estadisticas de solo lectura que recibe un controlador. Las tuplas se
+# indexan por lane_index (orden de LANE_NAMES):
+#   counts, lengths: vehiculos y largo (px) esperando antes de la caja
+#   arrivals: vehiculos que llegaron a cada acceso desde el ultimo reinicio
+#   downstream: vehiculos en el tramo de salida de cada acceso (0 si el
+#               acceso sale del area)
+#   time: segundos del semaforo desde el ultimo reinicio
+SignalStats = namedtuple('SignalStats', ('time', 'counts', 'lengths', 'arrivals', 'downstream'))
+
+EMPTY_LANES = (0, 0, 0, 0)
+
+# Accesos con verde en cada fase: left_go da paso a la calle horizontal
+PHASE_LANES = {
+    'left_go': (LANE_INDEX['horizontal_bottom'], LANE_INDEX['horizontal_top']),
+    'right_go': (LANE_INDEX['vertical_left'], LANE_INDEX['vertical_right'])
+}
+
+def get_other_phase(phase):
+    return 'right_go' if phase == 'left_go' else 'left_go'
+
+def get_phase_count(stats, phase):
+    if stats is None:
+        return 0
+    counts = stats.counts
+    return sum(counts[lane_index] for lane_index in PHASE_LANES[phase])
+
+# Un controlador implementa decide(phase, elapsed, stats), que
+# TrafficLightCycle llama cuando vence el verde de phase tras elapsed
+# segundos. Devuelve (fase, duracion): la misma fase extiende el verde
+# duracion segundos; la otra fase pasa por la transicion y luego recibe
+# duracion segundos de verde. stats es None si el semaforo no tiene contador.
+# Un controlador que guarda estado entre decisiones implementa ademas
+# get_state(), que lo devuelve como una secuencia de floats (NaN = sin valor),
+# y set_state(values), para que los snapshots del motor lo incluyan.
+
+
+class FixedTimeController:
+    """Plan fijo: verdes de duracion constante, opcionalmente distinta por fase"""
+
+    def __init__(self, green_duration=10.0, phase_durations=None):
+        self.green_duration = green_duration
+        self.phase_durations = dict(phase_durations or {})
+
+    def decide(self, phase, elapsed, stats):
+        next_phase = get_other_phase(phase)
+        return next_phase, self.phase_durations.get(next_phase, self.green_duration)
+
+
+class ActuatedController:
+    """Verde minimo que se extiende de a extension segundos mientras queden
+    vehiculos esperando en los accesos de la fase, hasta max_green"""
+
+    def __init__(self, min_green=10.0, max_green=20.0, extension=2.0):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.extension = extension
+
+    def decide(self, phase, elapsed, stats):
+        remaining = self.max_green - elapsed
+        if remaining > 0 and get_phase_count(stats, phase) > 0:
+            return phase, min(self.extension, remaining)
+
+        return get_other_phase(phase), self.min_green
+
+
+class WebsterController:
+    """Plan de tiempos de Webster recalculado con los flujos medidos.
+
+    El ciclo optimo es (1.5 L + 5) / (1 - Y), con L el tiempo perdido por
+    ciclo e Y la suma de los cocientes de flujo criticos y = q / s de cada
+    fase; el verde efectivo se reparte en proporcion a y. Los flujos q se
+    miden en ventanas de window segundos (la primera ventana usa el promedio
+    desde el reinicio) y saturation_flow es el flujo de saturacion de un
+    acceso en vehiculos por segundo.
+    """
+
+    def __init__(self, min_green=10.0, max_green=40.0, saturation_flow=0.5, lost_time=6.0,
+                 max_cycle=120.0, window=900.0):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.saturation_flow = saturation_flow
+        self.lost_time = lost_time
+        self.max_cycle = max_cycle
+        self.window = window
+
+        self.window_start = None
+        self.flows = None
+
+    def measure_flows(self, stats):
+        start = self.window_start
+        if start is None or stats.time < start[0] or any(
+                arrivals < previous for arrivals, previous in zip(stats.arrivals, start[1])):
+            # Primera medicion o semaforo reiniciado: nueva ventana
+            self.window_start = (stats.time, stats.arrivals)
+            self.flows = None
+            start = self.window_start
+
+        elapsed = stats.time - start[0]
+        if elapsed >= self.window:
+            self.flows = [(arrivals - previous) / elapsed for arrivals, previous in zip(stats.arrivals, start[1])]
+            self.window_start = (stats.time, stats.arrivals)
+
+        if self.flows is not None:
+            return self.flows
+        if stats.time > 0:
+            return [arrivals / stats.time for arrivals in stats.arrivals]
+        return None
+
+    def get_state(self):
+        lane_count = len(LANE_NAMES)
+        state = [math.nan] * (1 + 2 * lane_count)
+        if self.window_start is not None:
+            state[0] = self.window_start[0]
+            state[1:1 + lane_count] = self.window_start[1]
+        if self.flows is not None:
+            state[1 + lane_count:] = self.flows
+        return state
+
+    def set_state(self, values):
+        lane_count = len(LANE_NAMES)
+        window_time = values[0]
+        self.window_start = None
+        if not math.isnan(window_time):
+            self.window_start = (window_time, tuple(int(value) for value in values[1:1 + lane_count]))
+
+        flows = values[1 + lane_count:]
+        self.flows = None if math.isnan(flows[0]) else list(flows)
+
+    def get_green_duration(self, phase, stats):
+        flows = self.measure_flows(stats) if stats is not None else None
+        if flows is None:
+            return self.min_green
+
+        ratios = {
+            name: max(flows[lane_index] for lane_index in lanes) / self.saturation_flow
+            for name, lanes in PHASE_LANES.items()
+        }
+        total_ratio = sum(ratios.values())
+        if total_ratio <= 0:
+            return self.min_green
+
+        if total_ratio >= 0.95:
+            cycle = self.max_cycle
+        else:
+            cycle = min(self.max_cycle, (1.5 * self.lost_time + 5.0) / (1.0 - total_ratio))
+
+        green = (cycle - self.lost_time) * ratios[phase] / total_ratio
+        return max(self.min_green, min(self.max_green, green))
+
+    def decide(self, phase, elapsed, stats):
+        next_phase = get_other_phase(phase)
+        return next_phase, self.get_green_duration(next_phase, stats)
+
+
+class MaxPressureController:
+    """Max-pressure: al vencer cada paso de verde se mantiene la fase si su
+    presion (vehiculos esperando menos vehiculos en los tramos de salida) no
+    es menor que la de la otra fase, entre min_green y max_green"""
+
+    def __init__(self, min_green=5.0, max_green=30.0, step=2.0):
+        self.min_green = min_green
+        self.max_green = max_green
+        self.step = step
+
+    def get_pressure(self, phase, stats):
+        if stats is None:
+            return 0
+        return sum(stats.counts[lane_index] - stats.downstream[lane_index] for lane_index in PHASE_LANES[phase])
+
+    def decide(self, phase, elapsed, stats):
+        next_phase = get_other_phase(phase)
+
+        remaining = self.max_green - elapsed
+        if remaining > 0 and self.get_pressure(phase, stats) >= self.get_pressure(next_phase, stats):
+            return phase, min(self.step, remaining)
+
+        return next_phase, self.min_green
+
+
+SIGNAL_CONTROLLERS = {
+    'fixed': FixedTimeController,
+    'actuated': ActuatedController,
+    'webster': WebsterController,
+    'max_pressure': MaxPressureController
+}
+
+def create_signal_controller(name, min_green=10.0, max_green=20.0):
+    """Controlador por nombre con un rango de verde comun (el plan fijo usa min_green)"""
+    if name == 'fixed':
+        return FixedTimeController(min_green)
+    return SIGNAL_CONTROLLERS[name](min_green=min_green, max_green=max_green)
@@ -0,0 +1,45 @@
+class FixedStepClock:
+    """Reloj de paso fijo con acumulador.
+
+    Convierte el tiempo real transcurrido entre callbacks en un numero
+    entero de pasos de simulacion de duracion fija. Si el tiempo acumulado
+    supera max_substeps pasos, el exceso se descarta para que un pico de
+    frame no se convierta en un paso fisico enorme.
+    """
+
+    def __init__(self, step=1.0 / 60.0, max_substeps=8):
+        self.step = step
+        self.max_substeps = max_substeps
+
+        self.accumulator = 0.0
+        self.dropped_time = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.dropped_time = 0.0
+
+    def advance(self, elapsed):
+        if elapsed > 0:
+            self.accumulator += elapsed
+
+        steps = int(self.accumulator / self.step)
+
+        if steps > self.max_substeps:
+            dropped = (steps - self.max_substeps) * self.step
+            self.accumulator -= dropped
+            self.dropped_time += dropped
+            steps = self.max_substeps
+
+        self.accumulator -= steps * self.step
+        return steps
+
+    def get_alpha(self):
+        """Fraccion de paso pendiente, util para interpolar el dibujo"""
+        return self.accumulator / self.step
+
+    def set_step(self, step):
+        self.step = step
+        self.accumulator = 0.0
+
+    def set_max_substeps(self, max_substeps):
+        self.max_substeps = max(1, max_substeps)
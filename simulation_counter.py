@@ -1,7 +1,9 @@
 import math
+from simulation_vehicles import LANE_NAMES, LANE_EDGES, LANE_SIGN
+from signal_controllers import SignalStats, EMPTY_LANES
 
 class SimulationCounter:
-    def __init__(self, sim_area_x, sim_area_y, sim_area_width, sim_area_height):
+    def __init__(self, sim_area_x, sim_area_y, sim_area_width, sim_area_height, road_width=100):
         self.sim_area_x = sim_area_x
         self.sim_area_y = sim_area_y
         self.sim_area_width = sim_area_width
@@ -9,7 +11,6 @@ class SimulationCounter:
         
         center_x = sim_area_x + sim_area_width // 2
         center_y = sim_area_y + sim_area_height // 2
-        road_width = 100
         
         self.intersection_bounds = {
             'left': center_x - road_width // 2,
@@ -18,13 +19,24 @@ class SimulationCounter:
             'bottom': center_y + road_width // 2
         }
         
+        # Progreso (sentido * coordenada) del borde de salida por lane_index
+        self.lane_exit_progress = [
+            sign * self.intersection_bounds[exit] for (entry, exit), sign in zip(LANE_EDGES, LANE_SIGN)
+        ]
+        
+        # 'vehicles' guarda los vehiculos que suman en cada carril (esperando
+        # antes de la caja) como claves de un dict: descartar uno es O(1) y
+        # se conserva el orden de llegada para get_lane_vehicles
         self.lane_stats = {
-            'horizontal_bottom': {'count': 0, 'total_length': 0, 'vehicles': []},
-            'horizontal_top': {'count': 0, 'total_length': 0, 'vehicles': []},
-            'vertical_left': {'count': 0, 'total_length': 0, 'vehicles': []},
-            'vertical_right': {'count': 0, 'total_length': 0, 'vehicles': []}
+            'horizontal_bottom': {'count': 0, 'total_length': 0, 'vehicles': {}},
+            'horizontal_top': {'count': 0, 'total_length': 0, 'vehicles': {}},
+            'vertical_left': {'count': 0, 'total_length': 0, 'vehicles': {}},
+            'vertical_right': {'count': 0, 'total_length': 0, 'vehicles': {}}
         }
         
+        # Llegadas acumuladas por lane_index, para medir flujos
+        self.arrivals = [0] * len(LANE_NAMES)
+        
         self.lane_direction_map = {
             'horizontal_bottom': 'right',
             'horizontal_top': 'left',
@@ -39,27 +51,50 @@ class SimulationCounter:
         self.max_duration = 20.0
         
         self.debug_enabled = True
+        
+        # OccupancyGrid de la caja, si el dueno de los vehiculos la mantiene
+        self.occupancy = None
+    
+    def set_occupancy(self, occupancy):
+        self.occupancy = occupancy
     
     def reset_lane_stats(self):
         for lane in self.lane_stats:
-            self.lane_stats[lane] = {'count': 0, 'total_length': 0, 'vehicles': []}
+            self.lane_stats[lane] = {'count': 0, 'total_length': 0, 'vehicles': {}}
+    
+    def clear(self):
+        self.reset_lane_stats()
+        self.arrivals = [0] * len(LANE_NAMES)
+    
+    def record_arrival(self, lane_index):
+        self.arrivals[lane_index] += 1
+    
+    def get_signal_stats(self, time, downstream=EMPTY_LANES):
+        """Vista de solo lectura para los controladores de semaforo"""
+        lane_stats = self.lane_stats
+        return SignalStats(
+            time,
+            tuple(lane_stats[lane]['count'] for lane in LANE_NAMES),
+            tuple(lane_stats[lane]['total_length'] for lane in LANE_NAMES),
+            tuple(self.arrivals),
+            downstream
+        )
     
     def has_crossed_intersection(self, vehicle):
-        vehicle_center_x = vehicle.x + vehicle.width / 2
-        vehicle_center_y = vehicle.y + vehicle.height / 2
-        
-        if vehicle.direction == 'right':
-            return vehicle_center_x > self.intersection_bounds['right']
-        elif vehicle.direction == 'left':
-            return vehicle_center_x < self.intersection_bounds['left']
-        elif vehicle.direction == 'down':
-            return vehicle_center_y > self.intersection_bounds['bottom']
-        elif vehicle.direction == 'up':
-            return vehicle_center_y < self.intersection_bounds['top']
+        if vehicle.axis == 0:
+            vehicle_center = vehicle.x + vehicle.width / 2
+        else:
+            vehicle_center = vehicle.y + vehicle.height / 2
         
-        return False
+        return vehicle.sign * vehicle_center > self.lane_exit_progress[vehicle.lane_index]
     
     def is_in_intersection(self, vehicle):
+        """Con OccupancyGrid el vehiculo entra a la caja cuando su rectangulo
+        la toca, medio largo antes que con la regla del centro que se usa sin
+        grilla; un vehiculo detenido en la linea todavia no la toca"""
+        if self.occupancy is not None:
+            return self.occupancy.contains(vehicle)
+        
         vehicle_center_x = vehicle.x + vehicle.width / 2
         vehicle_center_y = vehicle.y + vehicle.height / 2
         
@@ -71,40 +106,56 @@ class SimulationCounter:
         return in_horizontal_range and in_vertical_range
     
     def classify_vehicle_lane(self, vehicle):
-        if vehicle.direction == 'right':
-            return 'horizontal_bottom'
-        elif vehicle.direction == 'left':
-            return 'horizontal_top'
-        elif vehicle.direction == 'down':
-            return 'vertical_left'
-        elif vehicle.direction == 'up':
-            return 'vertical_right'
-        return None
+        return LANE_NAMES[vehicle.lane_index]
     
     def get_vehicle_length(self, vehicle):
-        if vehicle.direction in ['right', 'left']:
+        if vehicle.axis == 0:
             return vehicle.width
         else:
             return vehicle.height
     
     def update(self, vehicles):
+        """Recalcular las estadisticas desde cero con todos los vehiculos"""
         self.reset_lane_stats()
         
         for vehicle in vehicles:
-            if not vehicle.is_active():
-                continue
-            
-            if self.has_crossed_intersection(vehicle):
-                continue
-            
-            if self.is_in_intersection(vehicle):
-                continue
-            
-            lane = self.classify_vehicle_lane(vehicle)
-            if lane:
-                self.lane_stats[lane]['count'] += 1
-                self.lane_stats[lane]['total_length'] += self.get_vehicle_length(vehicle)
-                self.lane_stats[lane]['vehicles'].append(vehicle)
+            self.add_vehicle(vehicle)
+    
+    def get_lane_vehicles(self, lane):
+        """Vehiculos que suman en el carril, en orden de llegada"""
+        return list(self.lane_stats[lane]['vehicles'])
+    
+    def add_vehicle(self, vehicle):
+        """Sumar un vehiculo que aparece antes de la caja (evento de aparicion)"""
+        if not vehicle.is_active():
+            return
+        
+        if self.has_crossed_intersection(vehicle):
+            return
+        
+        if self.is_in_intersection(vehicle):
+            return
+        
+        stats = self.lane_stats[self.classify_vehicle_lane(vehicle)]
+        if vehicle in stats['vehicles']:
+            return
+        stats['count'] += 1
+        stats['total_length'] += self.get_vehicle_length(vehicle)
+        stats['vehicles'][vehicle] = None
+    
+    def discard_vehicle(self, vehicle):
+        """Restar un vehiculo que entra a la caja o desaparece; los que ya no
+        sumaban se ignoran"""
+        stats = self.lane_stats[self.classify_vehicle_lane(vehicle)]
+        if vehicle not in stats['vehicles']:
+            return
+        del stats['vehicles'][vehicle]
+        stats['count'] -= 1
+        stats['total_length'] -= self.get_vehicle_length(vehicle)
+    
+    def set_lane_stats(self, lane, count, total_length, vehicles=()):
+        """Cargar las estadisticas de un carril calculadas fuera del contador"""
+        self.lane_stats[lane] = {'count': count, 'total_length': total_length, 'vehicles': dict.fromkeys(vehicles)}
     
     def is_lane_congested(self, lane):
         stats = self.lane_stats[lane]
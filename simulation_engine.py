@@ -0,0 +1,344 @@
+import copy
+import time
+from simulation_vehicles import SimulationVehicleManager
+from simulation_counter import SimulationCounter
+from traffic_light_cycle import TrafficLightCycle
+from simulation_clock import FixedStepClock
+from random_streams import RandomStreams
+from traffic_network import TrafficNetwork
+from simulation_snapshot import snapshot_engine, restore_engine, save_snapshot, load_snapshot
+from trajectory_log import TrajectoryRecorder
+from signal_controllers import SIGNAL_CONTROLLERS, create_signal_controller
+
+class SimulationEngine:
+    """Motor de simulacion sin dependencias de tkinter.
+
+    Agrupa el manejador de vehiculos, el ciclo del semaforo y el contador
+    de trafico. La pantalla del simulador es solo un visor opcional que
+    lee su estado despues de cada paso.
+
+    La simulacion siempre avanza en pasos fijos de fixed_step segundos, sin
+    importar el jitter del reloj real, asi que dos corridas con la misma
+    entrada producen la misma trayectoria. Con una semilla (modo benchmark)
+    los sorteos de aparicion y de atributos de vehiculos usan flujos
+    RandomStreams propios, y dos corridas con la misma semilla son identicas.
+
+    Con grid=(filas, columnas) el motor simula una red TrafficNetwork de
+    intersecciones, cada una con su propio semaforo, en lugar del cruce unico.
+    En ese modo vehicle_manager apunta a la red y traffic_lights y
+    traffic_counter son None.
+    """
+
+    def __init__(self, sim_area_x=0, sim_area_y=0, sim_area_width=600, sim_area_height=600,
+                 debug=False, vector_store=False, fixed_step=1.0 / 60.0, max_substeps=8,
+                 seed=None, random_streams=None, grid=None, block_length=300, lanes_per_approach=1):
+        self.sim_area_x = sim_area_x
+        self.sim_area_y = sim_area_y
+        self.sim_area_width = sim_area_width
+        self.sim_area_height = sim_area_height
+
+        # Configuracion de construccion, para crear copias en fork()
+        self.options = {
+            'sim_area_x': sim_area_x, 'sim_area_y': sim_area_y,
+            'sim_area_width': sim_area_width, 'sim_area_height': sim_area_height,
+            'debug': debug, 'vector_store': vector_store,
+            'fixed_step': fixed_step, 'max_substeps': max_substeps,
+            'grid': grid, 'block_length': block_length, 'lanes_per_approach': lanes_per_approach
+        }
+
+        if random_streams is None and seed is not None:
+            random_streams = RandomStreams(seed)
+        self.random_streams = random_streams
+
+        self.network = None
+        self.traffic_counter = None
+        self.traffic_lights = None
+
+        if grid is not None:
+            rows, cols = grid
+            self.network = TrafficNetwork(rows, cols, sim_area_x, sim_area_y, block_length, debug=debug)
+            self.network.add_state_listener(self.on_traffic_light_state_changed)
+            self.vehicle_manager = self.network
+            self.sim_area_width = self.network.sim_area_width
+            self.sim_area_height = self.network.sim_area_height
+        else:
+            self.vehicle_manager = SimulationVehicleManager(
+                sim_area_x, sim_area_y, sim_area_width, sim_area_height, lanes_per_approach
+            )
+
+        self.vehicle_manager.set_random_streams(random_streams)
+
+        if vector_store:
+            if self.network is None:
+                self.vehicle_manager.enable_vector_store()
+            else:
+                print("Warning: la red de intersecciones usa la ruta escalar")
+
+        if self.network is None:
+            self.traffic_counter = SimulationCounter(
+                sim_area_x, sim_area_y, sim_area_width, sim_area_height,
+                road_width=self.vehicle_manager.road_width
+            )
+            self.traffic_counter.enable_debug(debug)
+            self.vehicle_manager.set_traffic_counter(self.traffic_counter)
+
+            self.traffic_lights = TrafficLightCycle(self.traffic_counter)
+            self.traffic_lights.enable_debug(debug)
+            self.traffic_lights.add_state_listener(self.vehicle_manager.set_traffic_light_state)
+            self.traffic_lights.add_state_listener(self.on_traffic_light_state_changed)
+
+        self.clock = FixedStepClock(fixed_step, max_substeps)
+
+        self.simulation_time = 0.0
+        self.tick_count = 0
+        self.running = False
+
+        self.recorder = None
+        self.signal_controller = None
+
+        self.stopped_speed_threshold = 1.0
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        self.phase_changes = 0
+        self.queued_vehicle_time = 0.0
+        self.max_queued_vehicles = 0
+        self.stopped_vehicle_time = 0.0
+
+    def on_traffic_light_state_changed(self, state):
+        if state != 'caution':
+            self.phase_changes += 1
+
+    def start(self):
+        self.running = True
+        self.clock.reset()
+        if self.network is not None:
+            self.network.reset_traffic_lights()
+        else:
+            self.traffic_lights.reset()
+
+    def stop(self):
+        self.running = False
+
+    def reset(self):
+        self.running = False
+
+        # Resembrar antes de limpiar: la demanda se recalcula al limpiar
+        if self.random_streams is not None and self.random_streams.is_seeded():
+            self.random_streams.reseed()
+
+        self.vehicle_manager.clear_all()
+        if self.network is not None:
+            self.network.reset_traffic_lights(notify=False)
+        else:
+            self.traffic_lights.reset(notify=False)
+        self.clock.reset()
+        self.simulation_time = 0.0
+        self.tick_count = 0
+        self.reset_statistics()
+
+    def advance(self, elapsed):
+        steps = self.clock.advance(elapsed)
+        for _ in range(steps):
+            self.step()
+        return steps
+
+    def step_until(self, deadline):
+        """Avanzar pasos fijos hasta que el reloj real pase deadline
+        (time.perf_counter); para correr tan rapido como se pueda sin
+        bloquear la interfaz"""
+        steps = 0
+        while time.perf_counter() < deadline:
+            self.step()
+            steps += 1
+        return steps
+
+    def step(self, delta_time=None):
+        if delta_time is None:
+            delta_time = self.clock.step
+
+        if self.network is not None:
+            self.network.update_traffic_lights(delta_time)
+            self.network.update(delta_time)
+        else:
+            self.traffic_lights.update(delta_time)
+            self.vehicle_manager.update(delta_time)
+
+        self.vehicle_manager.integrate(delta_time)
+
+        self.simulation_time += delta_time
+        self.tick_count += 1
+
+        self.collect_statistics(delta_time)
+
+        if self.recorder is not None:
+            self.recorder.record(self)
+
+    def collect_statistics(self, delta_time):
+        if self.network is not None:
+            queued = self.network.count_queued_vehicles()
+        else:
+            horizontal = self.traffic_counter.get_horizontal_totals()
+            vertical = self.traffic_counter.get_vertical_totals()
+            queued = horizontal['count'] + vertical['count']
+
+        self.queued_vehicle_time += queued * delta_time
+        if queued > self.max_queued_vehicles:
+            self.max_queued_vehicles = queued
+
+        stopped = self.vehicle_manager.count_stopped_vehicles(self.stopped_speed_threshold)
+        self.stopped_vehicle_time += stopped * delta_time
+
+    def get_statistics(self):
+        elapsed = self.simulation_time
+        exited = self.vehicle_manager.vehicles_exited
+
+        return {
+            'simulation_time': elapsed,
+            'ticks': self.tick_count,
+            'vehicles_spawned': self.vehicle_manager.vehicles_spawned,
+            'vehicles_exited': exited,
+            'throughput_per_hour': exited * 3600.0 / elapsed if elapsed > 0 else 0.0,
+            'phase_changes': self.phase_changes,
+            'mean_queued_vehicles': self.queued_vehicle_time / elapsed if elapsed > 0 else 0.0,
+            'max_queued_vehicles': self.max_queued_vehicles,
+            'stopped_time_per_vehicle': self.stopped_vehicle_time / exited if exited > 0 else 0.0,
+            'vehicles_in_network': len(self.vehicle_manager.get_vehicles()),
+            'lane_changes': self.vehicle_manager.lane_changes
+        }
+
+    def run(self, duration):
+        if not self.running:
+            self.start()
+
+        ticks = int(round(duration / self.clock.step))
+        for _ in range(ticks):
+            self.step()
+
+        return ticks
+
+    def get_vehicles(self):
+        return self.vehicle_manager.get_vehicles()
+
+    def set_traffic_light_duration(self, duration):
+        if self.network is not None:
+            self.network.set_traffic_light_duration(duration, self.running)
+            return
+
+        self.traffic_lights.initial_duration = duration
+        if not self.running:
+            self.traffic_lights.duration = duration
+
+    def set_duration_range(self, min_duration, max_duration):
+        if self.network is not None:
+            self.network.set_duration_range(min_duration, max_duration)
+        else:
+            self.traffic_counter.set_duration_range(min_duration, max_duration)
+
+    def set_congestion_thresholds(self, count_threshold, length_threshold):
+        if self.network is not None:
+            self.network.set_congestion_thresholds(count_threshold, length_threshold)
+        else:
+            self.traffic_counter.set_congestion_thresholds(count_threshold, length_threshold)
+
+    def set_signal_controller(self, controller):
+        """Estrategia de semaforo (ver signal_controllers); None vuelve a la
+        regla de congestion del contador"""
+        self.signal_controller = controller
+        if self.network is not None:
+            self.network.set_signal_controller(controller)
+        else:
+            self.traffic_lights.set_controller(controller)
+
+    def set_spawn_interval(self, spawn_interval):
+        self.vehicle_manager.set_spawn_interval(spawn_interval)
+
+    def set_demand_profiles(self, profiles, max_backlog=None):
+        self.vehicle_manager.set_demand_profiles(profiles, max_backlog)
+
+    def snapshot(self):
+        """Estado completo de la simulacion como bytes (ver simulation_snapshot)"""
+        return snapshot_engine(self)
+
+    def restore(self, data):
+        restore_engine(self, data)
+
+    def fork(self):
+        """Copia independiente en el estado actual, para ramas what-if"""
+        random_streams = None
+        if self.random_streams is not None:
+            random_streams = RandomStreams(self.random_streams.seed)
+
+        engine = SimulationEngine(random_streams=random_streams, **self.options)
+
+        scheduler = self.vehicle_manager.demand_scheduler
+        engine.set_demand_profiles(copy.deepcopy(scheduler.profiles), scheduler.max_backlog)
+        engine.set_signal_controller(copy.deepcopy(self.signal_controller))
+
+        engine.restore(self.snapshot())
+        return engine
+
+    def save_checkpoint(self, path):
+        save_snapshot(path, self.snapshot())
+
+    def load_checkpoint(self, path):
+        self.restore(load_snapshot(path))
+
+    def start_recording(self, path, keyframe_interval=600):
+        """Grabar cada paso en un registro de trayectorias (ver trajectory_log)"""
+        self.stop_recording()
+        self.recorder = TrajectoryRecorder(path, self, keyframe_interval)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            recorder = self.recorder
+            self.recorder = None
+            recorder.close()
+
+    def get_traffic_light_state(self, row=0, col=0):
+        if self.network is not None:
+            return self.network.get_junction(row, col).traffic_light_state
+        return self.traffic_lights.get_state()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulacion de trafico sin interfaz grafica")
+    parser.add_argument("--duration", type=float, default=3600.0, help="segundos simulados")
+    parser.add_argument("--dt", type=float, default=1.0 / 60.0, help="paso de simulacion en segundos")
+    parser.add_argument("--vector-store", action="store_true", help="estado de vehiculos en arreglos numpy")
+    parser.add_argument("--seed", type=int, default=None, help="semilla para el modo benchmark reproducible")
+    parser.add_argument("--grid", type=int, nargs=2, metavar=("FILAS", "COLUMNAS"), default=None,
+                        help="simular una red de intersecciones en lugar del cruce unico")
+    parser.add_argument("--lanes", type=int, default=1, help="carriles por acceso (1 a 4)")
+    parser.add_argument("--record", default=None, metavar="ARCHIVO", help="grabar las trayectorias en un registro")
+    parser.add_argument("--controller", choices=sorted(SIGNAL_CONTROLLERS), default=None,
+                        help="estrategia de semaforo (por defecto, la regla de congestion del contador)")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    engine = SimulationEngine(
+        debug=args.debug,
+        vector_store=args.vector_store,
+        fixed_step=args.dt,
+        seed=args.seed,
+        grid=args.grid,
+        lanes_per_approach=args.lanes
+    )
+
+    if args.controller:
+        engine.set_signal_controller(create_signal_controller(args.controller))
+
+    if args.record:
+        engine.start_recording(args.record)
+
+    wall_start = time.perf_counter()
+    ticks = engine.run(args.duration)
+    engine.stop_recording()
+    wall_elapsed = time.perf_counter() - wall_start
+
+    print(f"Tiempo simulado: {engine.simulation_time:.1f}s en {ticks} pasos")
+    print(f"Tiempo real: {wall_elapsed:.2f}s ({engine.simulation_time / max(wall_elapsed, 1e-9):.0f}x)")
+    for key, value in engine.get_statistics().items():
+        print(f"  {key}: {value}")
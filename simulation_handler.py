@@ -1,11 +1,23 @@
 import tkinter as tk
 import time
 from screen_element import ButtonElement
-from simulation_vehicles import SimulationVehicleManager
-from simulation_counter import SimulationCounter
+from simulation_engine import SimulationEngine
+from simulation_clock import FixedStepClock
+from simulation_vehicles import SimulationVehiclePool, LANE_NAMES
+from simulation_snapshot import VEHICLE_TYPES
+from trajectory_log import (
+    TrajectoryPlayer, get_vehicle_colors,
+    VEHICLE_ID, LANE_INDEX, DIRECTION, TYPE_INDEX, X, Y, SPEED, FLAGS
+)
+from vehicle_store import FLAG_VISIBLE
 
 class SimulationHandler:
-    def __init__(self, canvas, screen_width, screen_height, sim_area_x, sim_area_y, sim_area_width, sim_area_height):
+    # Multiplicador del tiempo simulado por cuadro (segundos simulados por segundo
+    # real); None corre tan rapido como se pueda dentro del presupuesto del cuadro
+    SPEED_LEVELS = (1, 4, 16, None)
+    
+    def __init__(self, canvas, screen_width, screen_height, sim_area_x, sim_area_y, sim_area_width, sim_area_height,
+                 random_streams=None, record_path=None, replay_path=None, signal_controller=None):
         self.canvas = canvas
         self.screen_width = screen_width
         self.screen_height = screen_height
@@ -20,6 +32,7 @@ class SimulationHandler:
         
         self.start_button = None
         self.pause_button = None
+        self.speed_button = None
         
         self.control_buttons = []
         
@@ -28,30 +41,44 @@ class SimulationHandler:
         
         self.simulation_vehicles = []
         
-        self.vehicle_manager = SimulationVehicleManager(
-            sim_area_x, sim_area_y, sim_area_width, sim_area_height
+        self.engine = SimulationEngine(
+            sim_area_x, sim_area_y, sim_area_width, sim_area_height, debug=True,
+            random_streams=random_streams
         )
+        if signal_controller is not None:
+            self.engine.set_signal_controller(signal_controller)
         
-        self.traffic_counter = SimulationCounter(
-            sim_area_x, sim_area_y, sim_area_width, sim_area_height
-        )
+        self.vehicle_manager = self.engine.vehicle_manager
+        self.traffic_counter = self.engine.traffic_counter
+        self.traffic_lights = self.engine.traffic_lights
+        self.traffic_lights.add_state_listener(self.on_traffic_light_state_changed)
         
         self.button_y = 35
         self.button_width = 90
         self.button_height = 22
         self.button_spacing = 15
         
-        self.traffic_light_state = "left_go"
-        self.traffic_light_timer = 0
-        self.traffic_light_duration = 10.0
-        self.transition_duration = 3.0
-        self.is_transitioning = False
-        self.transition_timer = 0
-        
-        self.previous_green_state = "left_go"
-        
         self.simulator_screen = None
         
+        # Avance rapido: la velocidad multiplica el tiempo simulado por cuadro
+        # y en MAX se simula durante max_speed_frame_budget segundos reales
+        self.speed_index = 0
+        self.simulation_speed = 1
+        self.max_speed_frame_budget = 0.012
+        self.base_max_substeps = self.engine.clock.max_substeps
+        
+        # Grabacion de la corrida o reproduccion de un registro de trayectorias
+        self.record_path = record_path
+        self.replay_path = replay_path
+        self.replay_player = None
+        self.replay_frames = None
+        self.replay_clock = None
+        self.replay_frame = None
+        self.replay_tick = None
+        self.replay_vehicles = {}
+        self.replay_pool = SimulationVehiclePool()
+        self.replay_light_state = None
+        
     def set_simulator_screen(self, simulator_screen):
         self.simulator_screen = simulator_screen
         
@@ -124,6 +151,29 @@ class SimulationHandler:
         
         self.control_buttons.append(self.pause_button)
         
+        self.speed_button = ButtonElement(
+            self.canvas,
+            center_x + self.button_spacing // 2 + self.button_width + self.button_spacing,
+            self.button_y,
+            self.button_width,
+            self.button_height,
+            self.get_speed_text()
+        )
+        self.speed_button.set_colors(
+            bg_color="#2196F3",
+            hover_bg="#42A5F5",
+            pressed_bg="#1976D2"
+        )
+        self.speed_button.on_click = self.cycle_speed
+        
+        for item_id in self.speed_button.element_ids:
+            try:
+                self.canvas.itemconfig(item_id, tags=("simulator_ui", "ui_element"))
+            except:
+                pass
+        
+        self.control_buttons.append(self.speed_button)
+        
         try:
             self.canvas.update_idletasks()
         except:
@@ -131,25 +181,47 @@ class SimulationHandler:
         
         print(f"DEBUG: Boton de pausa creado con {len(self.pause_button.element_ids)} elementos")
         
-        self.initialize_traffic_lights()
+        if self.replay_path:
+            self.start_replay(self.replay_path)
+        else:
+            self.initialize_traffic_lights()
+            if self.record_path:
+                self.engine.start_recording(self.record_path)
         
         self.last_update_time = time.time()
         self.start_simulation_loop()
     
     def initialize_traffic_lights(self):
-        self.traffic_light_state = "left_go"
-        self.previous_green_state = "left_go"
-        self.traffic_light_timer = 0
-        self.traffic_light_duration = 10.0
-        self.is_transitioning = False
-        self.transition_timer = 0
+        self.engine.start()
+    
+    def get_speed_text(self):
+        if self.simulation_speed is None:
+            return "MAX"
+        return f"{self.simulation_speed}x"
+    
+    def cycle_speed(self, button, event=None):
+        self.set_speed(self.SPEED_LEVELS[(self.speed_index + 1) % len(self.SPEED_LEVELS)])
+    
+    def set_speed(self, speed):
+        """Cambiar la velocidad (un valor de SPEED_LEVELS); el dibujo sigue
+        siendo uno por cuadro y solo cambia cuantos pasos corren entre dibujos"""
+        self.speed_index = self.SPEED_LEVELS.index(speed)
+        self.simulation_speed = speed
+        
+        # Sin esto el reloj descartaria el tiempo extra de cada cuadro
+        substeps = self.base_max_substeps * (speed or 1)
+        self.engine.clock.set_max_substeps(substeps)
+        self.engine.clock.reset()
+        if self.replay_clock is not None:
+            self.replay_clock.set_max_substeps(substeps)
+            self.replay_clock.reset()
         
-        if self.vehicle_manager:
-            self.vehicle_manager.set_traffic_light_state(self.traffic_light_state)
+        self.last_update_time = time.time()
         
-        if self.simulator_screen:
-            self.simulator_screen.set_traffic_light_state("left_go")
-            self.simulator_screen.update_timer(int(self.get_traffic_light_duration()))
+        if self.speed_button:
+            self.speed_button.set_text(self.get_speed_text())
+        
+        print(f"DEBUG: Velocidad de simulacion {self.get_speed_text()}")
     
     def toggle_pause(self, button, event=None):
         if self.simulation_paused:
@@ -199,8 +271,9 @@ class SimulationHandler:
         self.simulation_active = False
         self.simulation_paused = False
         
-        if self.vehicle_manager:
-            self.vehicle_manager.clear_all()
+        self.engine.stop_recording()
+        self.stop_replay()
+        self.engine.reset()
         
         try:
             self.canvas.delete("simulation_vehicle")
@@ -216,6 +289,15 @@ class SimulationHandler:
                 self.control_buttons.remove(self.pause_button)
             self.pause_button = None
         
+        if self.speed_button:
+            try:
+                self.speed_button.delete_element()
+            except:
+                pass
+            if self.speed_button in self.control_buttons:
+                self.control_buttons.remove(self.speed_button)
+            self.speed_button = None
+        
         if self.start_button:
             center_x = self.screen_width // 2
             self.start_button.set_position(
@@ -233,13 +315,6 @@ class SimulationHandler:
             self.simulator_screen.set_traffic_light_state("off")
             self.simulator_screen.update_timer(-1)
         
-        self.traffic_light_state = "left_go"
-        self.previous_green_state = "left_go"
-        self.traffic_light_timer = 0
-        self.traffic_light_duration = 10.0
-        self.is_transitioning = False
-        self.transition_timer = 0
-        
         self.simulation_vehicles.clear()
         
         try:
@@ -262,102 +337,189 @@ class SimulationHandler:
             delta_time = current_time - self.last_update_time
             self.last_update_time = current_time
             
-            self.update_traffic_lights(delta_time)
-            self.update_simulation_logic(delta_time)
+            # Varios pasos fijos por cuadro, pero un solo dibujo del canvas
+            if self.simulation_speed is None:
+                steps = self.step_until(time.perf_counter() + self.max_speed_frame_budget)
+            else:
+                steps = self.advance(delta_time * self.simulation_speed)
+            
+            if steps > 0:
+                self.refresh_display()
         else:
             self.last_update_time = time.time()
         
         self.start_simulation_loop()
     
-    def update_traffic_lights(self, delta_time):
+    def advance(self, elapsed):
+        if self.replay_player is not None:
+            return self.advance_replay(self.replay_clock.advance(elapsed))
+        return self.engine.advance(elapsed)
+    
+    def step_until(self, deadline):
+        if self.replay_player is None:
+            return self.engine.step_until(deadline)
+        
+        steps = 0
+        while time.perf_counter() < deadline and self.advance_replay(1):
+            steps += 1
+        return steps
+    
+    def refresh_display(self):
+        if self.replay_player is not None:
+            if self.replay_frame is not None:
+                self.draw_replay_frame(self.replay_frame)
+            return
+        
+        self.update_traffic_light_display()
+        self.draw_simulation()
+    
+    def on_traffic_light_state_changed(self, state):
         if not self.simulator_screen:
             return
         
-        if self.is_transitioning:
-            self.transition_timer += delta_time
-            
-            transition_second = int(self.transition_timer) + 1
+        self.simulator_screen.set_traffic_light_state(state)
+        
+        if self.traffic_lights.is_transitioning:
+            self.simulator_screen.update_timer_text(".")
+        else:
+            self.simulator_screen.update_timer(int(self.get_traffic_light_duration()))
+    
+    def update_traffic_light_display(self):
+        if not self.simulator_screen:
+            return
+        
+        if self.traffic_lights.is_transitioning:
+            transition_second = self.traffic_lights.get_transition_second()
             if transition_second == 1:
                 self.simulator_screen.update_timer_text(".")
             elif transition_second == 2:
                 self.simulator_screen.update_timer_text(". .")
             elif transition_second == 3:
                 self.simulator_screen.update_timer_text(". . .")
-            
-            if self.transition_timer >= self.transition_duration:
-                self.complete_transition()
         else:
-            self.traffic_light_timer += delta_time
-            
-            remaining_time = int(self.get_traffic_light_duration() - self.traffic_light_timer)
-            if remaining_time < 0:
-                remaining_time = 0
-            self.simulator_screen.update_timer(remaining_time)
-            
-            if self.traffic_light_timer >= self.get_traffic_light_duration():
-                self.start_transition()
+            self.simulator_screen.update_timer(int(self.traffic_lights.get_remaining_time()))
     
-    def start_transition(self):
-        print("DEBUG: Iniciando transicion de semaforo")
-        self.is_transitioning = True
-        self.transition_timer = 0
-        
-        self.previous_green_state = self.traffic_light_state
-        
-        self.traffic_light_state = "caution"
-        if self.vehicle_manager:
-            self.vehicle_manager.set_traffic_light_state(self.traffic_light_state)
+    def restore_snapshot(self, data):
+        """Cargar un estado guardado con engine.snapshot() y redibujarlo"""
+        self.engine.restore(data)
+        self.last_update_time = time.time()
         
         if self.simulator_screen:
-            self.simulator_screen.set_traffic_light_state("caution")
-            self.simulator_screen.update_timer_text(".")
+            self.simulator_screen.set_traffic_light_state(self.traffic_lights.get_state())
+        self.update_traffic_light_display()
+        self.draw_simulation()
+    
+    def start_replay(self, path):
+        """Reproducir un registro de TrajectoryRecorder sin volver a simular"""
+        self.stop_replay()
+        
+        self.replay_player = TrajectoryPlayer(path)
+        self.replay_frames = self.replay_player.frames()
+        self.replay_clock = FixedStepClock(self.replay_player.fixed_step, self.engine.clock.max_substeps)
+        self.replay_frame = None
+        self.replay_tick = None
+        self.replay_light_state = None
+        
+        print(f"DEBUG: Reproduciendo {path}")
     
-    def complete_transition(self):
-        print("DEBUG: Completando transicion de semaforo")
-        self.is_transitioning = False
-        self.transition_timer = 0
+    def stop_replay(self):
+        for vehicle in self.replay_vehicles.values():
+            self.replay_pool.release(vehicle)
+        self.replay_vehicles.clear()
+        
+        if self.replay_player is not None:
+            self.replay_frames = None
+            self.replay_player.close()
+        
+        self.replay_player = None
+        self.replay_frames = None
+        self.replay_clock = None
+        self.replay_frame = None
+        self.replay_tick = None
+    
+    def advance_replay(self, steps):
+        """Leer steps cuadros del registro; solo el ultimo se dibuja"""
+        for step in range(steps):
+            frame = next(self.replay_frames, None)
+            if frame is None:
+                print("DEBUG: Fin del registro de trayectorias")
+                self.pause_simulation()
+                return step
+            
+            self.replay_frame = frame
+            self.replay_tick = frame.tick
         
-        if self.previous_green_state == 'left_go':
-            self.traffic_light_state = 'right_go'
-        else:
-            self.traffic_light_state = 'left_go'
+        return steps
+    
+    def seek_replay(self, tick):
+        """Saltar a un tick del registro; la reproduccion sigue desde ahi"""
+        if self.replay_player is None or self.replay_player.get_chunk_count() == 0:
+            return
         
-        print(f"DEBUG: Cambio de {self.previous_green_state} -> {self.traffic_light_state}")
+        tick = min(max(tick, self.replay_player.get_first_tick()), self.replay_player.get_last_tick())
+        frame = self.replay_player.get_frame(tick)
         
-        if self.vehicle_manager:
-            self.vehicle_manager.set_traffic_light_state(self.traffic_light_state)
+        self.replay_frames = self.replay_player.frames(tick + 1)
+        self.replay_clock.reset()
+        self.replay_frame = frame
+        self.replay_tick = tick
+        self.draw_replay_frame(frame)
+    
+    def scrub_replay(self, seconds):
+        if self.replay_player is None:
+            return
         
-        if self.traffic_counter:
-            self.traffic_light_duration = self.traffic_counter.calculate_next_duration(
-                self.previous_green_state, 
-                self.traffic_light_state
-            )
-            print(f"DEBUG: Duracion calculada para {self.traffic_light_state}: {self.traffic_light_duration}s")
+        current_tick = self.replay_tick
+        if current_tick is None:
+            current_tick = self.replay_player.get_first_tick() or 0
+        self.seek_replay(current_tick + int(round(seconds / self.replay_player.fixed_step)))
+    
+    def draw_replay_frame(self, frame):
+        vehicles = self.replay_vehicles
+        present = set()
         
-        self.traffic_light_timer = 0
+        for row in frame.vehicles:
+            vehicle_id = row[VEHICLE_ID]
+            present.add(vehicle_id)
+            
+            vehicle = vehicles.get(vehicle_id)
+            if vehicle is None:
+                vehicle = self.replay_pool.acquire(
+                    VEHICLE_TYPES[row[TYPE_INDEX]], LANE_NAMES[row[LANE_INDEX]], row[DIRECTION]
+                )
+                vehicle.vehicle_id = vehicle_id
+                vehicle.vehicle_colors, vehicle.vehicle_color = get_vehicle_colors(row)
+                vehicle.set_color(vehicle.vehicle_color)
+                vehicle.needs_restyle = bool(vehicle.canvas_items)
+                vehicle.set_clip_bounds(self.vehicle_manager.clip_bounds)
+                vehicle.activate()
+                vehicles[vehicle_id] = vehicle
+            
+            vehicle.x = row[X]
+            vehicle.y = row[Y]
+            vehicle.current_speed = row[SPEED]
+            vehicle.visible = bool(row[FLAGS] & FLAG_VISIBLE)
+            vehicle.draw(self.canvas)
+        
+        for vehicle_id in [vehicle_id for vehicle_id in vehicles if vehicle_id not in present]:
+            self.replay_pool.release(vehicles.pop(vehicle_id))
+        
+        light_state = frame.light_states[0] if frame.light_states else 'off'
+        if light_state != self.replay_light_state and self.simulator_screen:
+            self.replay_light_state = light_state
+            self.simulator_screen.set_traffic_light_state(light_state)
+            self.simulator_screen.update_timer(-1)
         
-        if self.simulator_screen:
-            self.simulator_screen.set_traffic_light_state(self.traffic_light_state)
-            self.simulator_screen.update_timer(int(self.get_traffic_light_duration()))
+        self.ensure_vehicle_layering(self.canvas)
     
     def get_traffic_light_duration(self):
-        return self.traffic_light_duration
+        return self.traffic_lights.get_duration()
     
-    def update_simulation_logic(self, delta_time):
-        if self.vehicle_manager:
-            self.vehicle_manager.update(delta_time)
-            
-            all_vehicles = self.vehicle_manager.get_vehicles()
-            
-            if self.traffic_counter:
-                self.traffic_counter.update(all_vehicles)
-            
-            for vehicle in all_vehicles:
-                vehicle.update(delta_time)
-                vehicle.draw(self.canvas)
+    def draw_simulation(self):
+        for vehicle in self.engine.get_vehicles():
+            vehicle.draw(self.canvas)
         
-        if hasattr(self, 'canvas'):
-            self.ensure_vehicle_layering(self.canvas)
+        self.ensure_vehicle_layering(self.canvas)
     
     def cleanup(self):
         print("DEBUG: Limpiando simulation_handler")
@@ -369,6 +531,10 @@ class SimulationHandler:
                 pass
             self.animation_id = None
         
+        self.engine.stop_recording()
+        self.stop_replay()
+        self.replay_pool.clear()
+        
         if self.vehicle_manager:
             self.vehicle_manager.clear_all()
         
@@ -386,11 +552,13 @@ class SimulationHandler:
         self.control_buttons.clear()
         self.start_button = None
         self.pause_button = None
+        self.speed_button = None
         
         self.simulation_vehicles.clear()
         
         self.simulation_active = False
         self.simulation_paused = False
+        self.engine.stop()
         
         print("DEBUG: simulation_handler limpiado completamente")
     
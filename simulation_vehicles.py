@@ -1,23 +1,149 @@
 import random
 import math
+from bisect import bisect_left
+from collections import deque
 from background_element import BackgroundElement
+from vehicle_store import (
+    VehicleStore, NUMPY_AVAILABLE, np,
+    FLAG_ACTIVE, FLAG_VISIBLE, FLAG_EMERGENCY_BRAKE,
+    FLAG_CROSSED_INTERSECTION, FLAG_COLLISION_LOCK
+)
+from traffic_kernel import (
+    build_lane_order, apply_traffic_rules, project_lanes, lane_change_candidates,
+    CRITICAL_DISTANCE, EMERGENCY_FOLLOW_DISTANCE, SAFETY_MARGIN
+)
+from demand_scheduler import DemandScheduler, HeadwayProfile
+from occupancy_grid import OccupancyGrid
+
+LANE_NAMES = ('horizontal_bottom', 'horizontal_top', 'vertical_left', 'vertical_right')
+LANE_INDEX = {lane: index for index, lane in enumerate(LANE_NAMES)}
+
+# Geometria de cada carril indexada por lane_index: eje de avance (0 = x,
+# 1 = y), sentido (+1 hacia coordenadas crecientes) y bordes (entrada, salida)
+# que cruza. A lo largo del carril se mide el "progreso" = sentido * coordenada,
+# asi que todos los predicados del carril son una comparacion creciente.
+LANE_AXIS = (0, 0, 1, 1)
+LANE_SIGN = (1, -1, 1, -1)
+LANE_DIRECTIONS = ('right', 'left', 'down', 'up')
+LANE_EDGES = (('left', 'right'), ('right', 'left'), ('top', 'bottom'), ('bottom', 'top'))
+
+def get_lane_progress(lane_index, bounds):
+    """Progreso de los bordes de entrada y salida de bounds para un carril"""
+    entry, exit = LANE_EDGES[lane_index]
+    sign = LANE_SIGN[lane_index]
+    return sign * bounds[entry], sign * bounds[exit]
+
+def build_lane_geometry(area_bounds, spawn_offset=50, exit_margin=10):
+    """Tabla por lane_index con el progreso del frente de un vehiculo que
+    aparece y el progreso de la cola a partir del cual salio del area"""
+    geometry = []
+    for lane_index in range(len(LANE_NAMES)):
+        entry, exit = get_lane_progress(lane_index, area_bounds)
+        geometry.append((entry - spawn_offset, exit + exit_margin))
+    return geometry
+
+def project_lane(vehicles, vehicle_ahead=None, delta_time=None):
+    """Proyectar las restricciones de posicion de un carril despues de
+    integrar. Recorre la cola desde la linea de detencion hacia atras y
+    limita el frente de cada vehiculo contra la linea y contra la cola de su
+    lider ya corregido: en una sola pasada ningun vehiculo queda superpuesto,
+    sin importar el orden en que se actualizaron. Con delta_time integra cada
+    vehiculo (salvo los dormidos) en la misma pasada, justo antes de
+    proyectarlo. Devuelve el ultimo vehiculo para encadenar los tramos de un
+    corredor."""
+    for vehicle in vehicles:
+        if delta_time is not None and not vehicle.sleeping:
+            vehicle.update(delta_time)
+        vehicle.project_behind(vehicle_ahead)
+        vehicle_ahead = vehicle
+    
+    return vehicle_ahead
 
 class SimulationVehicle(BackgroundElement):
-    def __init__(self, vehicle_type, lane, direction):
+    BASE_DIMENSIONS = {
+        'compact': (40, 25),
+        'sedan': (50, 25),
+        'suv': (55, 25),
+        'coupe': (45, 25),
+        'van': (65, 25),
+        'pickup': (60, 25),
+        'bus': (80, 25),
+        'truck': (70, 25),
+        'semi': (90, 25),
+        'motorcycle': (30, 25)
+    }
+    
+    __slots__ = (
+        'rng', 'canvas', 'canvas_items', 'needs_restyle', 'clip_bounds',
+        'vehicle_type', 'vehicle_id', 'lane', 'lane_index', 'sub_lane', 'queue_index',
+        'lane_change_cooldown', 'direction_num', 'direction', 'vehicle_colors', 'vehicle_color',
+        'base_speed', 'current_speed', 'target_speed',
+        'safe_distance', 'deceleration_distance', 'acceleration_distance',
+        'axis', 'sign', 'front_offset', 'rear_offset',
+        'intersection_bounds', 'stop_progress', 'exit_progress', 'emergency_brake_active', 'traffic_light_target_speed',
+        'has_crossed_intersection', 'last_distance_to_ahead', 'collision_lock_active',
+        'leader', 'follower', 'sleeping', 'drawn_asleep', 'store', 'row'
+    )
+    
+    COLOR_PALETTES = (
+        {'body': '#E53935', 'details': '#B71C1C', 'windows': '#1E88E5'},
+        {'body': '#1E88E5', 'details': '#0D47A1', 'windows': '#81D4FA'},
+        {'body': '#43A047', 'details': '#1B5E20', 'windows': '#A5D6A7'},
+        {'body': '#FDD835', 'details': '#F9A825', 'windows': '#FFF59D'},
+        {'body': '#FB8C00', 'details': '#E65100', 'windows': '#FFE0B2'},
+        {'body': '#8E24AA', 'details': '#4A148C', 'windows': '#CE93D8'},
+        {'body': '#00ACC1', 'details': '#006064', 'windows': '#B2EBF2'},
+        {'body': '#212121', 'details': '#000000', 'windows': '#616161'},
+        {'body': '#FFFFFF', 'details': '#BDBDBD', 'windows': '#E0E0E0'},
+        {'body': '#6D4C41', 'details': '#3E2723', 'windows': '#A1887F'},
+        {'body': '#F06292', 'details': '#C2185B', 'windows': '#F8BBD0'},
+        {'body': '#9575CD', 'details': '#512DA8', 'windows': '#D1C4E9'},
+        {'body': '#4DD0E1', 'details': '#00838F', 'windows': '#B2EBF2'},
+        {'body': '#AED581', 'details': '#558B2F', 'windows': '#DCEDC8'},
+        {'body': '#FF8A65', 'details': '#D84315', 'windows': '#FFCCBC'}
+    )
+    
+    BODY_COLORS = (
+        '#E53935', '#1E88E5', '#43A047', '#FDD835', '#FB8C00',
+        '#8E24AA', '#00ACC1', '#212121', '#FFFFFF', '#6D4C41',
+        '#F06292', '#9575CD', '#4DD0E1', '#AED581', '#FF8A65'
+    )
+    
+    SPEEDS = (90, 110, 130, 150, 170)
+    
+    # Umbrales para dormir a un vehiculo detenido dentro de una cola
+    SLEEP_SPEED = 1.0
+    SLEEP_MAX_GAP = 11.0
+    SLEEP_GAP_TOLERANCE = 1.0
+    
+    def __init__(self, vehicle_type, lane, direction, rng=None, store=None):
+        self.canvas = None
+        self.canvas_items = []
+        self.needs_restyle = False
+        
+        # Fila del VehicleStore; solo la usa StoredSimulationVehicle
+        self.store = store
+        self.row = None
+        
+        self.reset(vehicle_type, lane, direction, rng)
+    
+    def reset(self, vehicle_type, lane, direction, rng=None):
+        """Inicializar (o reinicializar al salir del pool) el estado del vehiculo.
+        Los items del canvas se conservan y se recolorean en el siguiente dibujo."""
+        self.rng = rng if rng is not None else random
+        
         self.vehicle_type = vehicle_type
+        self.vehicle_id = -1
         self.lane = lane
+        lane_index = LANE_INDEX.get(lane, 0)
+        self.lane_index = lane_index
+        self.axis = LANE_AXIS[lane_index]
+        self.sign = LANE_SIGN[lane_index]
+        self.sub_lane = 0
+        self.queue_index = lane_index
+        self.lane_change_cooldown = 0
         self.direction_num = direction
-        
-        if 'horizontal_bottom' in lane:
-            self.direction = 'right'
-        elif 'horizontal_top' in lane:
-            self.direction = 'left'
-        elif 'vertical_left' in lane:
-            self.direction = 'down'
-        elif 'vertical_right' in lane:
-            self.direction = 'up'
-        else:
-            self.direction = 'right'
+        self.direction = LANE_DIRECTIONS[lane_index]
         
         width, height = self.get_vehicle_dimensions(vehicle_type, lane)
         super().__init__(0, 0, width, height)
@@ -35,21 +161,18 @@ class SimulationVehicle(BackgroundElement):
         self.current_speed = self.base_speed
         self.target_speed = self.base_speed
         
-        if 'horizontal' in lane:
-            if self.direction_num > 0:
-                self.set_velocity(self.base_speed, 0)
-            else:
-                self.set_velocity(-self.base_speed, 0)
-        else:
-            if self.direction_num > 0:
-                self.set_velocity(0, self.base_speed)
-            else:
-                self.set_velocity(0, -self.base_speed)
+        self.set_axis_velocity(self.base_speed)
+        
+        # Desplazamiento del frente y de la cola respecto a la coordenada del
+        # vehiculo, medidos en progreso a lo largo del carril
+        length = self.width if self.axis == 0 else self.height
+        self.front_offset = length if self.sign > 0 else 0
+        self.rear_offset = 0 if self.sign > 0 else -length
         
         self.vehicle_color = self.get_random_vehicle_color()
         self.set_color(self.vehicle_color)
         
-        self.canvas_items = []
+        self.needs_restyle = bool(self.canvas_items)
         self.clip_bounds = None
         
         self.safe_distance = self.width * 2.0
@@ -57,122 +180,172 @@ class SimulationVehicle(BackgroundElement):
         self.acceleration_distance = self.width * 7.0
         
         self.intersection_bounds = None
+        self.stop_progress = None
+        self.exit_progress = None
         self.emergency_brake_active = False
         self.traffic_light_target_speed = None
         self.has_crossed_intersection = False
         
         self.last_distance_to_ahead = None
         self.collision_lock_active = False
+        
+        self.leader = None
+        self.follower = None
+        
+        self.sleeping = False
+        self.drawn_asleep = False
     
     def get_vehicle_dimensions(self, vehicle_type, lane):
-        base_dimensions = {
-            'compact': (40, 25),
-            'sedan': (50, 25),
-            'suv': (55, 25),
-            'coupe': (45, 25),
-            'van': (65, 25),
-            'pickup': (60, 25),
-            'bus': (80, 25),
-            'truck': (70, 25),
-            'semi': (90, 25),
-            'motorcycle': (30, 25)
-        }
+        base_width, base_height = self.BASE_DIMENSIONS.get(vehicle_type, (50, 25))
         
-        base_width, base_height = base_dimensions.get(vehicle_type, (50, 25))
-        
-        if 'horizontal' in lane:
+        if LANE_AXIS[LANE_INDEX.get(lane, 0)] == 0:
             return (base_width, base_height)
         else:
             return (base_height, base_width)
     
     def get_vehicle_colors(self, vehicle_type):
-        color_palettes = [
-            {'body': '#E53935', 'details': '#B71C1C', 'windows': '#1E88E5'},
-            {'body': '#1E88E5', 'details': '#0D47A1', 'windows': '#81D4FA'},
-            {'body': '#43A047', 'details': '#1B5E20', 'windows': '#A5D6A7'},
-            {'body': '#FDD835', 'details': '#F9A825', 'windows': '#FFF59D'},
-            {'body': '#FB8C00', 'details': '#E65100', 'windows': '#FFE0B2'},
-            {'body': '#8E24AA', 'details': '#4A148C', 'windows': '#CE93D8'},
-            {'body': '#00ACC1', 'details': '#006064', 'windows': '#B2EBF2'},
-            {'body': '#212121', 'details': '#000000', 'windows': '#616161'},
-            {'body': '#FFFFFF', 'details': '#BDBDBD', 'windows': '#E0E0E0'},
-            {'body': '#6D4C41', 'details': '#3E2723', 'windows': '#A1887F'},
-            {'body': '#F06292', 'details': '#C2185B', 'windows': '#F8BBD0'},
-            {'body': '#9575CD', 'details': '#512DA8', 'windows': '#D1C4E9'},
-            {'body': '#4DD0E1', 'details': '#00838F', 'windows': '#B2EBF2'},
-            {'body': '#AED581', 'details': '#558B2F', 'windows': '#DCEDC8'},
-            {'body': '#FF8A65', 'details': '#D84315', 'windows': '#FFCCBC'}
-        ]
-        
-        return random.choice(color_palettes)
+        return self.rng.choice(self.COLOR_PALETTES)
     
     def get_random_vehicle_color(self):
-        colors = [
-            '#E53935', '#1E88E5', '#43A047', '#FDD835', '#FB8C00',
-            '#8E24AA', '#00ACC1', '#212121', '#FFFFFF', '#6D4C41',
-            '#F06292', '#9575CD', '#4DD0E1', '#AED581', '#FF8A65'
-        ]
-        return random.choice(colors)
+        return self.rng.choice(self.BODY_COLORS)
     
     def get_random_speed(self):
-        speeds = [90, 110, 130, 150, 170]
-        return random.choice(speeds)
+        return self.rng.choice(self.SPEEDS)
     
     def set_intersection_bounds(self, bounds):
         self.intersection_bounds = bounds
+        
+        if bounds:
+            self.stop_progress, self.exit_progress = get_lane_progress(self.lane_index, bounds)
+        else:
+            self.stop_progress = None
+            self.exit_progress = None
     
-    def get_distance_to_intersection(self):
-        if not self.intersection_bounds:
-            return None
+    def set_axis_velocity(self, speed):
+        if self.direction_num < 0:
+            speed = -speed
         
-        vehicle_center_x = self.x + self.width / 2
-        vehicle_center_y = self.y + self.height / 2
-        
-        if self.direction == 'right':
-            distance = self.intersection_bounds['left'] - (self.x + self.width)
-        elif self.direction == 'left':
-            distance = self.x - self.intersection_bounds['right']
-        elif self.direction == 'down':
-            distance = self.intersection_bounds['top'] - (self.y + self.height)
-        elif self.direction == 'up':
-            distance = self.y - self.intersection_bounds['bottom']
+        if self.axis == 0:
+            self.set_velocity(speed, 0)
         else:
+            self.set_velocity(0, speed)
+    
+    def get_front_progress(self):
+        if self.axis == 0:
+            return self.sign * self.x + self.front_offset
+        return self.sign * self.y + self.front_offset
+    
+    def get_rear_progress(self):
+        if self.axis == 0:
+            return self.sign * self.x + self.rear_offset
+        return self.sign * self.y + self.rear_offset
+    
+    def place_on_lane(self, front_progress, lane_position):
+        """Ubicar el frente en front_progress, centrado en lane_position"""
+        position = self.sign * (front_progress - self.front_offset)
+        
+        if self.axis == 0:
+            self.x = position
+            self.y = lane_position - self.height // 2
+        else:
+            self.x = lane_position - self.width // 2
+            self.y = position
+    
+    def limit_front_progress(self, max_progress):
+        """Retroceder el vehiculo hasta que su frente no supere max_progress
+        y detenerlo; devuelve True si hubo que corregir la posicion"""
+        limit = max_progress - self.front_offset
+        
+        if self.axis == 0:
+            if self.sign * self.x <= limit:
+                return False
+            self.x = self.sign * limit
+        else:
+            if self.sign * self.y <= limit:
+                return False
+            self.y = self.sign * limit
+        
+        self.current_speed = 0
+        self.target_speed = 0
+        self.set_velocity(0, 0)
+        self.drawn_asleep = False
+        return True
+    
+    def project_behind(self, vehicle_ahead):
+        """Limitar el frente al final del paso: no pasar la linea de detencion
+        si esta frenando ante ella, ni acercarse a la cola del lider a menos
+        de la distancia minima segun su estado"""
+        front = self.get_front_progress()
+        limit = front
+        
+        if self.emergency_brake_active and self.stop_progress is not None and front <= self.stop_progress:
+            limit = self.stop_progress - SAFETY_MARGIN
+        
+        if vehicle_ahead is not None:
+            if self.collision_lock_active:
+                min_distance = CRITICAL_DISTANCE
+            elif self.emergency_brake_active:
+                min_distance = EMERGENCY_FOLLOW_DISTANCE
+            else:
+                min_distance = 0
+            
+            leader_limit = vehicle_ahead.get_rear_progress() - min_distance
+            if leader_limit < limit:
+                limit = leader_limit
+        
+        if limit < front:
+            self.limit_front_progress(limit)
+    
+    def get_distance_to_intersection(self):
+        if self.stop_progress is None:
             return None
         
-        return distance
+        return self.stop_progress - self.get_front_progress()
+    
+    def get_gap_to(self, other):
+        return other.get_rear_progress() - self.get_front_progress()
     
     def has_crossed_any_border(self):
-        if not self.intersection_bounds:
+        if self.stop_progress is None:
             return False
         
-        vehicle_center_x = self.x + self.width / 2
-        vehicle_center_y = self.y + self.height / 2
-        
-        if self.direction == 'right':
-            return (self.x + self.width) > self.intersection_bounds['left']
-        elif self.direction == 'left':
-            return self.x < self.intersection_bounds['right']
-        elif self.direction == 'down':
-            return (self.y + self.height) > self.intersection_bounds['top']
-        elif self.direction == 'up':
-            return self.y < self.intersection_bounds['bottom']
-        
-        return False
+        return self.get_front_progress() > self.stop_progress
     
     def is_completely_past_intersection(self):
-        if not self.intersection_bounds:
+        if self.exit_progress is None:
             return False
         
-        if self.direction == 'right':
-            return self.x > self.intersection_bounds['right']
-        elif self.direction == 'left':
-            return (self.x + self.width) < self.intersection_bounds['left']
-        elif self.direction == 'down':
-            return self.y > self.intersection_bounds['bottom']
-        elif self.direction == 'up':
-            return (self.y + self.height) < self.intersection_bounds['top']
-        
-        return False
+        return self.get_rear_progress() > self.exit_progress
+    
+    def can_sleep(self, vehicle_ahead, distance):
+        """True si el vehiculo quedo detenido en la cola, pegado a un lider
+        tambien detenido. Fuera del frente de la cola el vehiculo solo oscila
+        alrededor de la distancia critica, asi que se lo puede congelar."""
+        return (distance <= self.SLEEP_MAX_GAP
+                and self.current_speed < self.SLEEP_SPEED
+                and vehicle_ahead.current_speed < self.SLEEP_SPEED
+                and not self.emergency_brake_active
+                and not self.has_crossed_intersection)
+    
+    def sleep(self, distance):
+        """Congelar el vehiculo bloqueado contra su lider"""
+        self.sleeping = True
+        self.current_speed = 0
+        self.target_speed = 0
+        self.set_velocity(0, 0)
+        self.collision_lock_active = True
+        self.last_distance_to_ahead = distance
+    
+    def can_keep_sleeping(self, vehicle_ahead):
+        """Seguir durmiendo mientras el lider sea el mismo y no se haya movido"""
+        return (vehicle_ahead is not None
+                and self.leader is vehicle_ahead
+                and vehicle_ahead.current_speed < self.SLEEP_SPEED
+                and self.get_gap_to(vehicle_ahead) - self.last_distance_to_ahead <= self.SLEEP_GAP_TOLERANCE)
+    
+    def wake(self):
+        self.sleeping = False
+        self.drawn_asleep = False
     
     def adjust_speed_for_traffic_light(self, traffic_light_state, is_lead_vehicle, vehicle_ahead=None):
         if not self.intersection_bounds:
@@ -207,7 +380,6 @@ class SimulationVehicle(BackgroundElement):
         if distance_to_intersection < absolute_stop_distance:
             self.traffic_light_target_speed = 0
             self.emergency_brake_active = True
-            self.apply_hard_position_lock()
             return
         
         stopping_distance_threshold = grid_size * 3.0
@@ -224,52 +396,14 @@ class SimulationVehicle(BackgroundElement):
             self.traffic_light_target_speed = 0
             self.emergency_brake_active = True
     
-    def apply_hard_position_lock(self):
-        if not self.intersection_bounds:
-            return
-        
-        safety_margin = 0.5
-        
-        if self.direction == 'right':
-            max_x = self.intersection_bounds['left'] - self.width - safety_margin
-            if self.x > max_x:
-                self.x = max_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'left':
-            min_x = self.intersection_bounds['right'] + safety_margin
-            if self.x < min_x:
-                self.x = min_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'down':
-            max_y = self.intersection_bounds['top'] - self.height - safety_margin
-            if self.y > max_y:
-                self.y = max_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'up':
-            min_y = self.intersection_bounds['bottom'] + safety_margin
-            if self.y < min_y:
-                self.y = min_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-    
     def can_proceed_through_light(self, traffic_light_state):
         if traffic_light_state == 'off':
             return True
         
         if traffic_light_state == 'left_go':
-            return 'horizontal' in self.lane
+            return self.axis == 0
         elif traffic_light_state == 'right_go':
-            return 'vertical' in self.lane
+            return self.axis == 1
         elif traffic_light_state == 'caution':
             return False
         
@@ -303,27 +437,14 @@ class SimulationVehicle(BackgroundElement):
             else:
                 self.current_speed += adjustment
             
-            if 'horizontal' in self.lane:
-                if self.direction_num > 0:
-                    self.set_velocity(self.current_speed, 0)
-                else:
-                    self.set_velocity(-self.current_speed, 0)
-            else:
-                if self.direction_num > 0:
-                    self.set_velocity(0, self.current_speed)
-                else:
-                    self.set_velocity(0, -self.current_speed)
-        
-        if self.emergency_brake_active and not self.has_crossed_any_border():
-            self.apply_hard_position_lock()
+            self.set_axis_velocity(self.current_speed)
         
         if self.is_completely_past_intersection():
             self.has_crossed_intersection = False
     
     def adjust_speed_for_traffic(self, distance, other_vehicle):
-        grid_size = 50
-        critical_distance = grid_size / 5.0
-        
+        """Velocidad objetivo segun el vehiculo de adelante. Las posiciones
+        se corrigen despues de integrar, en project_lane"""
         if distance is None or other_vehicle is None:
             self.target_speed = self.base_speed
             self.collision_lock_active = False
@@ -336,12 +457,11 @@ class SimulationVehicle(BackgroundElement):
         
         self.last_distance_to_ahead = distance
         
-        if distance < critical_distance:
+        if distance < CRITICAL_DISTANCE:
             self.collision_lock_active = True
             self.target_speed = 0
             self.current_speed = 0
             self.set_velocity(0, 0)
-            self.apply_collision_position_correction(other_vehicle, critical_distance)
             return
         
         if self.collision_lock_active:
@@ -352,11 +472,8 @@ class SimulationVehicle(BackgroundElement):
                 return
         
         if self.emergency_brake_active:
-            emergency_follow_distance = 0.2
-            
-            if distance < emergency_follow_distance:
+            if distance < EMERGENCY_FOLLOW_DISTANCE:
                 self.target_speed = 0
-                self.apply_emergency_position_correction(other_vehicle, emergency_follow_distance)
             else:
                 self.target_speed = min(other_vehicle.current_speed, 15)
             return
@@ -373,92 +490,37 @@ class SimulationVehicle(BackgroundElement):
         else:
             self.target_speed = self.base_speed
     
-    def apply_collision_position_correction(self, vehicle_ahead, min_distance):
-        if not vehicle_ahead:
-            return
-        
-        if self.direction == 'right':
-            safe_x = vehicle_ahead.x - self.width - min_distance
-            if self.x > safe_x:
-                self.x = safe_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'left':
-            safe_x = vehicle_ahead.x + vehicle_ahead.width + min_distance
-            if self.x < safe_x:
-                self.x = safe_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'down':
-            safe_y = vehicle_ahead.y - self.height - min_distance
-            if self.y > safe_y:
-                self.y = safe_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'up':
-            safe_y = vehicle_ahead.y + vehicle_ahead.height + min_distance
-            if self.y < safe_y:
-                self.y = safe_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-    
-    def apply_emergency_position_correction(self, vehicle_ahead, min_distance):
-        if not vehicle_ahead:
-            return
-        
-        if self.direction == 'right':
-            safe_x = vehicle_ahead.x - self.width - min_distance
-            if self.x > safe_x:
-                self.x = safe_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'left':
-            safe_x = vehicle_ahead.x + vehicle_ahead.width + min_distance
-            if self.x < safe_x:
-                self.x = safe_x
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'down':
-            safe_y = vehicle_ahead.y - self.height - min_distance
-            if self.y > safe_y:
-                self.y = safe_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-        
-        elif self.direction == 'up':
-            safe_y = vehicle_ahead.y + vehicle_ahead.height + min_distance
-            if self.y < safe_y:
-                self.y = safe_y
-                self.current_speed = 0
-                self.target_speed = 0
-                self.set_velocity(0, 0)
-    
     def deactivate(self):
         super().deactivate()
         self.cleanup_canvas_items()
     
+    def park(self):
+        """Desactivar sin borrar los items del canvas, para volver al pool"""
+        super().deactivate()
+        self.hide_canvas_items()
+        self.leader = None
+        self.follower = None
+    
     def cleanup_canvas_items(self):
-        if hasattr(self, 'canvas_items') and self.canvas_items:
+        self.drawn_asleep = False
+        if self.canvas_items:
             for item_id in self.canvas_items:
                 try:
-                    if hasattr(self, 'canvas') and self.canvas:
+                    if self.canvas:
                         self.canvas.delete(item_id)
                 except:
                     pass
             self.canvas_items.clear()
     
+    def hide_canvas_items(self):
+        self.drawn_asleep = False
+        if self.canvas_items and self.canvas:
+            for item_id in self.canvas_items:
+                try:
+                    self.canvas.itemconfig(item_id, state='hidden')
+                except:
+                    pass
+    
     def set_canvas(self, canvas):
         self.canvas = canvas
     
@@ -480,16 +542,11 @@ class SimulationVehicle(BackgroundElement):
         return True
     
     def draw(self, canvas):
-        if not hasattr(self, 'canvas') or self.canvas is None:
+        if self.canvas is None:
             self.canvas = canvas
         
         if not self.visible or self.opacity <= 0.01:
-            if hasattr(self, 'canvas_items') and self.canvas_items:
-                for item_id in self.canvas_items:
-                    try:
-                        canvas.itemconfig(item_id, state='hidden')
-                    except:
-                        pass
+            self.hide_canvas_items()
             return
         
         final_x = self.x + self.offset_x
@@ -506,120 +563,102 @@ class SimulationVehicle(BackgroundElement):
                 vehicle_bottom < self.clip_bounds['top'] or 
                 vehicle_top > self.clip_bounds['bottom']):
                 
-                if hasattr(self, 'canvas_items') and self.canvas_items:
-                    for item_id in self.canvas_items:
-                        try:
-                            canvas.itemconfig(item_id, state='hidden')
-                        except:
-                            pass
+                self.hide_canvas_items()
                 return
         
-        if not hasattr(self, 'canvas_items') or not self.canvas_items:
+        # Un vehiculo dormido no se mueve: basta con dibujarlo una vez
+        if self.drawn_asleep:
+            return
+        
+        if not self.canvas_items:
             self.canvas_items = self.create_vehicle_visual(canvas, final_x, final_y)
+            self.needs_restyle = False
+        elif self.needs_restyle:
+            self.restyle_vehicle_visual(canvas, final_x, final_y)
         else:
             self.update_vehicle_position(canvas, final_x, final_y)
         
-        if hasattr(self, 'canvas_items') and self.canvas_items:
+        if self.canvas_items:
             for item_id in self.canvas_items:
                 try:
                     canvas.itemconfig(item_id, state='normal')
                 except:
                     pass
-    
-    def create_vehicle_visual(self, canvas, x, y):
-        items = []
         
-        if 'horizontal' in self.lane:
-            items.extend(self.draw_horizontal_vehicle(canvas, x, y))
+        self.drawn_asleep = self.sleeping
+    
+    def get_visual_coords(self, x, y):
+        """Coordenadas de carroceria, parabrisas y luz para la posicion dada"""
+        if self.axis == 0:
+            if self.direction_num > 0:
+                window_x1 = x + self.width * 0.6
+                window_x2 = x + self.width * 0.95
+                light_x = x + self.width - 3
+            else:
+                window_x1 = x + self.width * 0.05
+                window_x2 = x + self.width * 0.4
+                light_x = x + 3
+            
+            windshield = (int(window_x1), int(y + 4), int(window_x2), int(y + self.height - 4))
+            light = (int(light_x - 2), int(y + self.height // 2 - 3),
+                     int(light_x + 2), int(y + self.height // 2 + 3))
         else:
-            items.extend(self.draw_vertical_vehicle(canvas, x, y))
+            if self.direction_num > 0:
+                window_y1 = y + self.height * 0.6
+                window_y2 = y + self.height * 0.95
+                light_y = y + self.height - 3
+            else:
+                window_y1 = y + self.height * 0.05
+                window_y2 = y + self.height * 0.4
+                light_y = y + 3
+            
+            windshield = (int(x + 4), int(window_y1), int(x + self.width - 4), int(window_y2))
+            light = (int(x + self.width // 2 - 3), int(light_y - 2),
+                     int(x + self.width // 2 + 3), int(light_y + 2))
         
-        return items
+        body = (int(x), int(y), int(x + self.width), int(y + self.height))
+        return body, windshield, light
     
-    def draw_horizontal_vehicle(self, canvas, x, y):
-        items = []
+    def create_vehicle_visual(self, canvas, x, y):
         colors = self.vehicle_colors
+        body, windshield, light = self.get_visual_coords(x, y)
+        tags = ('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
         
-        body = canvas.create_rectangle(
-            int(x), int(y),
-            int(x + self.width), int(y + self.height),
-            fill=colors['body'], outline='#000000', width=1,
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(body)
-        
-        if self.direction_num > 0:
-            window_x1 = x + self.width * 0.6
-            window_x2 = x + self.width * 0.95
-            light_x = x + self.width - 3
-        else:
-            window_x1 = x + self.width * 0.05
-            window_x2 = x + self.width * 0.4
-            light_x = x + 3
-        
-        windshield = canvas.create_rectangle(
-            int(window_x1), int(y + 4),
-            int(window_x2), int(y + self.height - 4),
-            fill=colors['windows'], outline='#000000', width=1,
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(windshield)
-        
-        light = canvas.create_oval(
-            int(light_x - 2), int(y + self.height // 2 - 3),
-            int(light_x + 2), int(y + self.height // 2 + 3),
-            fill='#FFFF88', outline='',
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(light)
+        items = [
+            canvas.create_rectangle(*body, fill=colors['body'], outline='#000000', width=1, tags=tags),
+            canvas.create_rectangle(*windshield, fill=colors['windows'], outline='#000000', width=1, tags=tags),
+            canvas.create_oval(*light, fill='#FFFF88', outline='', tags=tags)
+        ]
         
+        self.original_x = x
+        self.original_y = y
         return items
     
-    def draw_vertical_vehicle(self, canvas, x, y):
-        items = []
+    def restyle_vehicle_visual(self, canvas, x, y):
+        """Reutilizar los items de un vehiculo reciclado: mover y recolorear"""
         colors = self.vehicle_colors
+        body, windshield, light = self.get_visual_coords(x, y)
+        body_item, windshield_item, light_item = self.canvas_items
+        
+        try:
+            canvas.coords(body_item, *body)
+            canvas.itemconfig(body_item, fill=colors['body'])
+            canvas.coords(windshield_item, *windshield)
+            canvas.itemconfig(windshield_item, fill=colors['windows'])
+            canvas.coords(light_item, *light)
+        except:
+            pass
         
-        body = canvas.create_rectangle(
-            int(x), int(y),
-            int(x + self.width), int(y + self.height),
-            fill=colors['body'], outline='#000000', width=1,
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(body)
-        
-        if self.direction_num > 0:
-            window_y1 = y + self.height * 0.6
-            window_y2 = y + self.height * 0.95
-            light_y = y + self.height - 3
-        else:
-            window_y1 = y + self.height * 0.05
-            window_y2 = y + self.height * 0.4
-            light_y = y + 3
-        
-        windshield = canvas.create_rectangle(
-            int(x + 4), int(window_y1),
-            int(x + self.width - 4), int(window_y2),
-            fill=colors['windows'], outline='#000000', width=1,
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(windshield)
-        
-        light = canvas.create_oval(
-            int(x + self.width // 2 - 3), int(light_y - 2),
-            int(x + self.width // 2 + 3), int(light_y + 2),
-            fill='#FFFF88', outline='',
-            tags=('simulator_ui', 'simulation_vehicle', 'vehicle_layer')
-        )
-        items.append(light)
-        
-        return items
+        self.original_x = x
+        self.original_y = y
+        self.needs_restyle = False
     
     def update_vehicle_position(self, canvas, x, y):
         if not self.canvas_items:
             return
         
-        dx = x - (self.original_x if hasattr(self, 'original_x') else self.x)
-        dy = y - (self.original_y if hasattr(self, 'original_y') else self.y)
+        dx = x - self.original_x
+        dy = y - self.original_y
         
         for item_id in self.canvas_items:
             try:
@@ -631,8 +670,178 @@ class SimulationVehicle(BackgroundElement):
         self.original_y = y
 
 
+def _store_field(name):
+    def getter(self):
+        return getattr(self.store, name).item(self.row)
+    
+    def setter(self, value):
+        getattr(self.store, name)[self.row] = value
+    
+    return property(getter, setter)
+
+
+def _optional_store_field(name):
+    def getter(self):
+        value = getattr(self.store, name).item(self.row)
+        return None if math.isnan(value) else value
+    
+    def setter(self, value):
+        getattr(self.store, name)[self.row] = math.nan if value is None else value
+    
+    return property(getter, setter)
+
+
+def _store_flag(flag):
+    def getter(self):
+        return self.store.get_flag(self.row, flag)
+    
+    def setter(self, value):
+        self.store.set_flag(self.row, flag, value)
+    
+    return property(getter, setter)
+
+
+class StoredSimulationVehicle(SimulationVehicle):
+    """Vista de una fila del VehicleStore con la misma interfaz que SimulationVehicle.
+    
+    Tiene los mismos slots que SimulationVehicle, asi que un vehiculo pasa de
+    una clase a la otra en el lugar (attach/detach) sin cambiar de identidad:
+    las colas, el pool, la grilla de ocupacion y el canvas lo siguen viendo.
+    """
+    
+    __slots__ = ()
+    
+    # Atributos que viven en el store en lugar de en los slots
+    STORE_ATTRIBUTES = (
+        'x', 'y', 'width', 'height', 'velocity_x', 'velocity_y',
+        'current_speed', 'target_speed', 'base_speed', 'lane_index',
+        'traffic_light_target_speed', 'last_distance_to_ahead', 'lane_change_cooldown',
+        'active', 'visible', 'emergency_brake_active', 'has_crossed_intersection', 'collision_lock_active'
+    )
+    
+    def __init__(self, vehicle_type, lane, direction, store, rng=None):
+        super().__init__(vehicle_type, lane, direction, rng, store)
+    
+    @classmethod
+    def attach(cls, vehicle, store):
+        """Mover un SimulationVehicle a una fila nueva del store"""
+        values = [getattr(vehicle, name) for name in cls.STORE_ATTRIBUTES]
+        
+        vehicle.store = store
+        vehicle.row = store.allocate()
+        vehicle.__class__ = cls
+        for name, value in zip(cls.STORE_ATTRIBUTES, values):
+            setattr(vehicle, name, value)
+        store.bind_lane(vehicle.row, vehicle.lane_index, vehicle.axis, 1 if vehicle.direction_num > 0 else -1)
+    
+    def detach(self):
+        """Volver a un SimulationVehicle con los valores de su fila"""
+        names = self.STORE_ATTRIBUTES
+        values = [getattr(self, name) for name in names]
+        
+        self.release_row()
+        self.__class__ = SimulationVehicle
+        self.store = None
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+    
+    def reset(self, vehicle_type, lane, direction, rng=None):
+        if self.row is None:
+            self.row = self.store.allocate()
+        self.store.set_flag(self.row, FLAG_ACTIVE | FLAG_VISIBLE, True)
+        
+        super().reset(vehicle_type, lane, direction, rng)
+        
+        self.store.bind_lane(self.row, LANE_INDEX.get(lane, 0), self.axis, 1 if direction > 0 else -1)
+    
+    def park(self):
+        super().park()
+        self.release_row()
+    
+    def release_row(self):
+        if self.row is not None:
+            self.store.release(self.row)
+            self.row = None
+    
+    x = _store_field('x')
+    y = _store_field('y')
+    width = _store_field('width')
+    height = _store_field('height')
+    velocity_x = _store_field('velocity_x')
+    velocity_y = _store_field('velocity_y')
+    current_speed = _store_field('current_speed')
+    target_speed = _store_field('target_speed')
+    base_speed = _store_field('base_speed')
+    lane_index = _store_field('lane_id')
+    traffic_light_target_speed = _optional_store_field('traffic_light_target_speed')
+    last_distance_to_ahead = _optional_store_field('last_distance_to_ahead')
+    lane_change_cooldown = _store_field('lane_change_cooldown')
+    
+    active = _store_flag(FLAG_ACTIVE)
+    visible = _store_flag(FLAG_VISIBLE)
+    emergency_brake_active = _store_flag(FLAG_EMERGENCY_BRAKE)
+    has_crossed_intersection = _store_flag(FLAG_CROSSED_INTERSECTION)
+    collision_lock_active = _store_flag(FLAG_COLLISION_LOCK)
+
+
+class SimulationVehiclePool:
+    """Vehiculos libres agrupados por tipo.
+    
+    Un vehiculo que sale de la simulacion vuelve al pool con sus items del
+    canvas ocultos; al reutilizarlo se reinicializa en el lugar y sus items
+    se mueven y recolorean en lugar de crearse de nuevo.
+    """
+    
+    def __init__(self, max_per_type=16):
+        self.max_per_type = max_per_type
+        self.free_vehicles = {}
+        
+        self.created = 0
+        self.reused = 0
+    
+    def acquire(self, vehicle_type, lane, direction, rng=None, store=None):
+        free = self.free_vehicles.get(vehicle_type)
+        if free:
+            vehicle = free.pop()
+            if vehicle.store is not store:
+                # El pool mezcla vehiculos de antes y despues de pasar al store;
+                # los del store ya liberaron su fila al estacionarse
+                vehicle.__class__ = SimulationVehicle if store is None else StoredSimulationVehicle
+                vehicle.store = store
+            vehicle.reset(vehicle_type, lane, direction, rng)
+            self.reused += 1
+            return vehicle
+        
+        self.created += 1
+        if store is not None:
+            return StoredSimulationVehicle(vehicle_type, lane, direction, store, rng=rng)
+        return SimulationVehicle(vehicle_type, lane, direction, rng=rng)
+    
+    def release(self, vehicle):
+        vehicle.park()
+        
+        free = self.free_vehicles.setdefault(vehicle.vehicle_type, [])
+        if len(free) >= self.max_per_type:
+            vehicle.cleanup_canvas_items()
+            return
+        
+        free.append(vehicle)
+    
+    def count(self):
+        return sum(len(free) for free in self.free_vehicles.values())
+    
+    def clear(self):
+        for free in self.free_vehicles.values():
+            for vehicle in free:
+                vehicle.cleanup_canvas_items()
+        self.free_vehicles.clear()
+
+
 class SimulationVehicleManager:
-    def __init__(self, sim_area_x, sim_area_y, sim_area_width, sim_area_height):
+    MAX_LANES_PER_APPROACH = 4
+    LANE_WIDTH = 50
+    
+    def __init__(self, sim_area_x, sim_area_y, sim_area_width, sim_area_height, lanes_per_approach=1):
         self.sim_area_x = sim_area_x
         self.sim_area_y = sim_area_y
         self.sim_area_width = sim_area_width
@@ -645,17 +854,24 @@ class SimulationVehicleManager:
             'bottom': sim_area_y + sim_area_height
         }
         
+        # (progreso de aparicion, progreso de salida del area) por lane_index
+        self.lane_geometry = build_lane_geometry(self.clip_bounds)
+        
+        self.lanes_per_approach = max(1, min(self.MAX_LANES_PER_APPROACH, lanes_per_approach))
+        
+        # Una cola ordenada por carril: indice = acceso * carriles_por_acceso + carril.
+        # vehicles es la lista plana; una salida solo la marca como vencida y
+        # get_vehicles la reconstruye una vez, en lugar de en cada salida
         self.vehicles = []
+        self.vehicles_stale = False
+        self.lane_queues = [deque() for _ in range(len(LANE_NAMES) * self.lanes_per_approach)]
+        self.lane_rows = [None] * len(self.lane_queues)
         self.max_vehicles_per_lane = 5
         
-        self.spawn_cooldowns = {
-            'horizontal_bottom': 0,
-            'horizontal_top': 0,
-            'vertical_left': 0,
-            'vertical_right': 0
-        }
-        
         self.spawn_interval = 2.0
+        self.spawn_retry_delay = 0.25
+        self.min_spawn_gap = 250
+        self.demand_time = 0.0
         
         self.vehicle_types = [
             'compact', 'sedan', 'suv', 'coupe', 'van',
@@ -664,13 +880,24 @@ class SimulationVehicleManager:
         
         center_x = sim_area_x + sim_area_width // 2
         center_y = sim_area_y + sim_area_height // 2
-        road_width = 100
+        road_width = 2 * self.LANE_WIDTH * self.lanes_per_approach
+        self.road_width = road_width
+        
+        # Carril 0 junto al eje de la calle, los siguientes hacia afuera
+        lane_axes = {
+            'horizontal_bottom': (center_y, 1),
+            'horizontal_top': (center_y, -1),
+            'vertical_left': (center_x, -1),
+            'vertical_right': (center_x, 1)
+        }
+        self.sub_lane_positions = {
+            lane: [axis + side * (self.LANE_WIDTH // 2 + self.LANE_WIDTH * sub_lane)
+                   for sub_lane in range(self.lanes_per_approach)]
+            for lane, (axis, side) in lane_axes.items()
+        }
         
         self.lane_positions = {
-            'horizontal_bottom': center_y + road_width // 4,
-            'horizontal_top': center_y - road_width // 4,
-            'vertical_left': center_x - road_width // 4,
-            'vertical_right': center_x + road_width // 4
+            lane: positions[0] for lane, positions in self.sub_lane_positions.items()
         }
         
         self.lane_directions = {
@@ -687,185 +914,561 @@ class SimulationVehicleManager:
             'bottom': center_y + road_width // 2
         }
         
+        # Celdas de la caja ocupadas por vehiculos; cada acceso recorre la
+        # franja de sus carriles
+        self.occupancy = OccupancyGrid(self.intersection_bounds, lane_count=len(LANE_NAMES))
+        for lane_index, lane in enumerate(LANE_NAMES):
+            positions = self.sub_lane_positions[lane]
+            self.occupancy.set_approach_path(
+                lane_index, LANE_AXIS[lane_index],
+                min(positions) - self.LANE_WIDTH // 2, max(positions) + self.LANE_WIDTH // 2
+            )
+        
         self.traffic_light_state = 'off'
+        self.traffic_counter = None
+        
+        # Vehiculos detenidos detras de un lider detenido: no se actualizan
+        # hasta que cambie el semaforo o su lider se mueva
+        self.sleeping_vehicles = set()
+        
+        # Con pocos vehiculos el costo fijo de cada operacion de numpy supera
+        # al de recorrer las colas, y los vehiculos del store pagan una
+        # propiedad por atributo en la ruta escalar. Con el store habilitado
+        # los vehiculos pasan a el al llegar a vector_min_vehicles y vuelven
+        # a objetos de Python bajo la mitad (ver vector_benchmark.py).
+        # vehicle_store solo existe mientras los vehiculos viven en el
+        self.vector_store_enabled = False
+        self.vector_store_capacity = 64
+        self.vehicle_store = None
+        self.vector_min_vehicles = 150
+        self.lane_order = None
+        self.vehicle_pool = SimulationVehiclePool()
+        
+        self.spawn_rng = random
+        self.vehicle_rng = random
+        self.demand_rng = random
+        
+        self.demand_scheduler = None
+        self.set_spawn_interval(self.spawn_interval)
+        
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        
+        self.lane_change_interval = 0.25
+        self.lane_change_timer = 0.0
+        self.lane_change_cooldown = 3.0
+        self.lane_change_min_distance = 100
+        self.lane_change_advantage = 20
+        self.lane_changes = 0
+    
+    def get_queue_index(self, lane_index, sub_lane):
+        return lane_index * self.lanes_per_approach + sub_lane
+    
+    def get_approach_queues(self, lane_index):
+        start = lane_index * self.lanes_per_approach
+        return self.lane_queues[start:start + self.lanes_per_approach]
+    
+    def set_random_streams(self, random_streams):
+        if random_streams is None:
+            self.spawn_rng = random
+            self.vehicle_rng = random
+            self.demand_rng = random
+        else:
+            self.spawn_rng = random_streams.spawn
+            self.vehicle_rng = random_streams.vehicle
+            self.demand_rng = random_streams.demand
+        
+        self.demand_scheduler.rng = self.demand_rng
+        self.demand_scheduler.reset(self.demand_time)
+    
+    def set_spawn_interval(self, spawn_interval):
+        """Demanda por defecto: una llegada cada spawn_interval segundos por
+        acceso; mientras la entrada esta bloqueada espera a lo sumo una"""
+        self.spawn_interval = spawn_interval
+        self.set_demand_profiles(
+            {lane: HeadwayProfile(spawn_interval) for lane in LANE_NAMES},
+            max_backlog=1
+        )
+    
+    def set_demand_profiles(self, profiles, max_backlog=None):
+        """profiles: perfil de llegadas por nombre de acceso (una instancia
+        por acceso, ya que algunos perfiles guardan estado)"""
+        self.demand_scheduler = DemandScheduler(profiles, rng=self.demand_rng, max_backlog=max_backlog,
+                                               time=self.demand_time)
+    
+    def process_demand(self):
+        """Intentar una aparicion solo en los accesos con una llegada vencida"""
+        scheduler = self.demand_scheduler
+        
+        for lane in scheduler.pop_due(self.demand_time):
+            if not scheduler.has_backlog(lane):
+                continue
+            
+            sub_lane = self.choose_spawn_sub_lane(LANE_INDEX[lane])
+            if sub_lane is not None and self.spawn_vehicle(lane, sub_lane):
+                scheduler.consume(lane)
+                if not scheduler.has_backlog(lane):
+                    continue
+            
+            scheduler.retry(lane, self.demand_time + self.spawn_retry_delay)
+    
+    def enable_vector_store(self, capacity=64):
+        if not NUMPY_AVAILABLE:
+            print("Warning: numpy no disponible, se usa la ruta escalar")
+            return False
+        
+        self.vector_store_enabled = True
+        self.vector_store_capacity = capacity
+        self.update_vector_store()
+        return True
+    
+    def disable_vector_store(self):
+        self.vector_store_enabled = False
+        self.update_vector_store()
+    
+    def update_vector_store(self):
+        """Mover los vehiculos al store o sacarlos segun el tamano de la flota"""
+        if self.vehicle_store is None:
+            if self.vector_store_enabled and len(self.get_vehicles()) >= self.vector_min_vehicles:
+                self.attach_vector_store()
+        elif not self.vector_store_enabled or len(self.get_vehicles()) < self.vector_min_vehicles // 2:
+            self.detach_vector_store()
+    
+    def attach_vector_store(self):
+        vehicles = self.get_vehicles()
+        store = VehicleStore(max(self.vector_store_capacity, len(vehicles)))
+        store.set_intersection_bounds(self.intersection_bounds)
+        
+        for vehicle in vehicles:
+            StoredSimulationVehicle.attach(vehicle, store)
+        
+        self.vehicle_store = store
+        self.lane_rows = [None] * len(self.lane_queues)
+    
+    def detach_vector_store(self):
+        for vehicle in self.get_vehicles():
+            vehicle.detach()
+        
+        self.vehicle_store = None
+        self.lane_rows = [None] * len(self.lane_queues)
+        self.lane_order = None
     
     def set_traffic_light_state(self, state):
+        if state != self.traffic_light_state:
+            self.wake_all()
         self.traffic_light_state = state
     
+    def wake_vehicle(self, vehicle):
+        vehicle.wake()
+        self.sleeping_vehicles.discard(vehicle)
+    
+    def wake_all(self):
+        for vehicle in self.sleeping_vehicles:
+            vehicle.wake()
+        self.sleeping_vehicles.clear()
+    
     def update(self, delta_time):
-        for lane in self.spawn_cooldowns:
-            self.spawn_cooldowns[lane] -= delta_time
+        if self.demand_scheduler.get_next_time() <= self.demand_time:
+            self.process_demand()
+        self.demand_time += delta_time
+        
+        # Los vehiculos solo se desactivan al salir de su cola (remove_vehicle
+        # o clear_all), y la cola esta en orden de avance: solo la cabeza
+        # puede salir del area
+        for queue in self.lane_queues:
+            while queue and self.is_vehicle_completely_out_of_bounds(queue[0]):
+                self.remove_vehicle(queue[0])
+                self.vehicles_exited += 1
+        
+        if self.lanes_per_approach > 1:
+            self.lane_change_timer += delta_time
+            if self.lane_change_timer >= self.lane_change_interval:
+                self.change_lanes(self.lane_change_timer)
+                self.lane_change_timer = 0.0
+        
+        self.update_vector_store()
+        if not self.use_vector_path():
+            self.lane_order = None
+            for queue in self.lane_queues:
+                self.update_lane(queue)
+        else:
+            # El kernel no conoce a los vehiculos dormidos de la ruta escalar
+            self.wake_all()
+            self.lane_order = build_lane_order(
+                self.vehicle_store,
+                [self.get_lane_rows(queue_index) for queue_index in range(len(self.lane_queues))]
+            )
+            apply_traffic_rules(self.vehicle_store, self.lane_order, self.traffic_light_state)
+    
+    def use_vector_path(self):
+        return self.vehicle_store is not None
+    
+    def get_progress(self, vehicle):
+        """Posicion del frente del vehiculo a lo largo de su sentido de avance"""
+        return vehicle.get_front_progress()
+    
+    def choose_spawn_sub_lane(self, lane_index):
+        """Carril con la cola mas alejada de la entrada, entre los que tienen cupo"""
+        best_sub_lane = None
+        best_progress = None
         
-        for lane in ['horizontal_bottom', 'horizontal_top', 'vertical_left', 'vertical_right']:
-            lane_vehicles = [v for v in self.vehicles if v.has_tag(lane)]
+        for sub_lane, queue in enumerate(self.get_approach_queues(lane_index)):
+            if len(queue) >= self.max_vehicles_per_lane:
+                continue
+            if not queue:
+                return sub_lane
             
-            if self.spawn_cooldowns[lane] <= 0 and len(lane_vehicles) < self.max_vehicles_per_lane:
-                spawned = self.spawn_vehicle(lane)
-                if spawned:
-                    self.spawn_cooldowns[lane] = self.spawn_interval
-        
-        vehicles_by_lane = {
-            'horizontal_bottom': [],
-            'horizontal_top': [],
-            'vertical_left': [],
-            'vertical_right': []
-        }
+            progress = self.get_progress(queue[-1])
+            if best_progress is None or progress > best_progress:
+                best_sub_lane = sub_lane
+                best_progress = progress
         
-        for vehicle in self.vehicles[:]:
-            if not vehicle.is_active():
-                vehicle.cleanup_canvas_items()
-                self.vehicles.remove(vehicle)
-            else:
-                if self.is_vehicle_completely_out_of_bounds(vehicle):
-                    vehicle.deactivate()
-                    vehicle.cleanup_canvas_items()
-                    self.vehicles.remove(vehicle)
-                else:
-                    for lane in vehicles_by_lane.keys():
-                        if vehicle.has_tag(lane):
-                            vehicles_by_lane[lane].append(vehicle)
-                            break
-        
-        for lane, lane_vehicles in vehicles_by_lane.items():
-            lane_vehicles.sort(key=lambda v: v.x if 'horizontal' in lane else v.y)
-            
-            vehicles_before_intersection = []
-            vehicles_after_intersection = []
+        return best_sub_lane
+    
+    def change_lanes(self, elapsed):
+        """Cambios de carril por aceptacion de brecha.
+        
+        Cada carril mantiene una lista de posiciones ordenada (cabeza
+        primero), asi que el lider y el seguidor en el carril vecino se
+        encuentran con una busqueda binaria en lugar de comparar todos los
+        pares de vehiculos.
+        """
+        for lane_index in range(len(LANE_NAMES)):
+            queues = self.get_approach_queues(lane_index)
+            if self.vehicle_store is not None:
+                self.change_lanes_in_store(lane_index, queues, elapsed)
+                continue
             
-            for vehicle in lane_vehicles:
-                if vehicle.has_crossed_any_border():
-                    vehicles_after_intersection.append(vehicle)
-                else:
-                    distance = vehicle.get_distance_to_intersection()
-                    if distance is not None and distance >= 0:
-                        vehicles_before_intersection.append(vehicle)
+            # Cambiar de carril no mueve a nadie a lo largo del acceso, asi
+            # que el avance del frente y de la cola se lee una vez por pasada,
+            # en listas paralelas a las colas
+            fronts = [[vehicle.get_front_progress() for vehicle in queue] for queue in queues]
+            rears = [[vehicle.get_rear_progress() for vehicle in queue] for queue in queues]
             
-            lead_vehicle = None
-            if vehicles_before_intersection:
-                lead_vehicle = min(vehicles_before_intersection, 
-                                 key=lambda v: v.get_distance_to_intersection())
+            # Claves crecientes: el negativo del avance del frente
+            keys = [[-front for front in queue_fronts] for queue_fronts in fronts]
             
-            for i, vehicle in enumerate(lane_vehicles):
-                vehicle_ahead = None
-                min_distance = float('inf')
-                
-                for other in lane_vehicles:
-                    if other == vehicle:
+            for queue in queues:
+                position = 0
+                while position < len(queue):
+                    vehicle = queue[position]
+                    if self.try_lane_change(vehicle, position, queues, keys, fronts, rears, elapsed):
                         continue
-                    
-                    if 'horizontal_bottom' in lane:
-                        if other.x > vehicle.x:
-                            distance = other.x - (vehicle.x + vehicle.width)
-                            if distance < min_distance:
-                                min_distance = distance
-                                vehicle_ahead = other
-                    elif 'horizontal_top' in lane:
-                        if other.x < vehicle.x:
-                            distance = vehicle.x - (other.x + other.width)
-                            if distance < min_distance:
-                                min_distance = distance
-                                vehicle_ahead = other
-                    elif 'vertical_left' in lane:
-                        if other.y > vehicle.y:
-                            distance = other.y - (vehicle.y + vehicle.height)
-                            if distance < min_distance:
-                                min_distance = distance
-                                vehicle_ahead = other
-                    elif 'vertical_right' in lane:
-                        if other.y < vehicle.y:
-                            distance = vehicle.y - (other.y + other.height)
-                            if distance < min_distance:
-                                min_distance = distance
-                                vehicle_ahead = other
-                
-                is_lead_for_traffic_light = (vehicle == lead_vehicle)
-                
-                vehicle.adjust_speed_for_traffic_light(
-                    self.traffic_light_state,
-                    is_lead_vehicle=is_lead_for_traffic_light,
-                    vehicle_ahead=vehicle_ahead
-                )
-                
-                if vehicle_ahead:
-                    vehicle.adjust_speed_for_traffic(min_distance, vehicle_ahead)
-                else:
-                    vehicle.adjust_speed_for_traffic(None, None)
+                    position += 1
     
-    def is_vehicle_completely_out_of_bounds(self, vehicle):
-        margin = 10
+    def change_lanes_in_store(self, lane_index, queues, elapsed):
+        """Misma pasada con las pruebas por lotes del kernel: solo los
+        vehiculos que aceptarian una brecha llegan a try_lane_change"""
+        lane_order = build_lane_order(
+            self.vehicle_store,
+            [self.get_lane_rows(self.get_queue_index(lane_index, sub_lane)) for sub_lane in range(len(queues))]
+        )
+        front, rear, candidates = lane_change_candidates(
+            self.vehicle_store, lane_order, len(queues),
+            self.lane_change_min_distance, self.lane_change_advantage, elapsed
+        )
+        if len(candidates) == 0:
+            return
         
-        if 'horizontal_bottom' in vehicle.lane:
-            return vehicle.x > self.sim_area_x + self.sim_area_width + margin
-        elif 'horizontal_top' in vehicle.lane:
-            return vehicle.x + vehicle.width < self.sim_area_x - margin
-        elif 'vertical_left' in vehicle.lane:
-            return vehicle.y > self.sim_area_y + self.sim_area_height + margin
-        elif 'vertical_right' in vehicle.lane:
-            return vehicle.y + vehicle.height < self.sim_area_y - margin
+        splits = np.cumsum([len(queue) for queue in queues])[:-1]
+        fronts = [part.tolist() for part in np.split(front, splits)]
+        rears = [part.tolist() for part in np.split(rear, splits)]
+        keys = [[-value for value in queue_fronts] for queue_fronts in fronts]
         
-        return False
+        vehicles = [
+            queues[sub_lane][slot]
+            for sub_lane, slot in zip(lane_order.lanes[candidates].tolist(), lane_order.slots[candidates].tolist())
+        ]
+        for vehicle, key in zip(vehicles, (-front[candidates]).tolist()):
+            # Los cambios anteriores de la pasada pueden correr su posicion
+            sub_lane = vehicle.sub_lane
+            queue = queues[sub_lane]
+            position = bisect_left(keys[sub_lane], key)
+            while queue[position] is not vehicle:
+                position += 1
+            self.try_lane_change(vehicle, position, queues, keys, fronts, rears, elapsed)
+    
+    def try_lane_change(self, vehicle, position, queues, keys, fronts, rears, elapsed):
+        if vehicle.lane_change_cooldown > 0:
+            vehicle.lane_change_cooldown -= elapsed
+            return False
+        
+        if position == 0:
+            return False
+        
+        sub_lane = vehicle.sub_lane
+        front = fronts[sub_lane][position]
+        stop_progress = vehicle.stop_progress
+        if stop_progress is not None:
+            if front > stop_progress or stop_progress - front < self.lane_change_min_distance:
+                return False
+        
+        current_gap = rears[sub_lane][position - 1] - front
+        if current_gap >= vehicle.acceleration_distance:
+            return False
+        
+        key = -front
+        best = None
+        
+        for target_lane in (sub_lane - 1, sub_lane + 1):
+            if target_lane < 0 or target_lane >= len(queues):
+                continue
+            
+            target_queue = queues[target_lane]
+            index = bisect_left(keys[target_lane], key)
+            
+            lead_gap = rears[target_lane][index - 1] - front if index > 0 else float('inf')
+            if lead_gap < vehicle.safe_distance:
+                continue
+            
+            if index < len(target_queue):
+                lag = target_queue[index]
+                if rears[sub_lane][position] - fronts[target_lane][index] < lag.safe_distance:
+                    continue
+            
+            if lead_gap < current_gap + self.lane_change_advantage:
+                continue
+            
+            if best is None or lead_gap > best[0]:
+                best = (lead_gap, target_lane, index)
+        
+        if best is None:
+            return False
+        
+        _, target_lane, index = best
+        self.move_to_sub_lane(vehicle, position, target_lane, index, queues, (keys, fronts, rears))
+        return True
+    
+    def move_to_sub_lane(self, vehicle, position, target_lane, index, queues, parallel_lists):
+        """parallel_lists: listas por carril alineadas con las colas (claves,
+        frentes y colas), que se mueven junto con el vehiculo"""
+        source_lane = vehicle.sub_lane
+        if vehicle.sleeping:
+            self.wake_vehicle(vehicle)
+        
+        del queues[source_lane][position]
+        queues[target_lane].insert(index, vehicle)
+        for values in parallel_lists:
+            values[target_lane].insert(index, values[source_lane].pop(position))
+        
+        self.lane_rows[vehicle.queue_index] = None
+        vehicle.sub_lane = target_lane
+        vehicle.queue_index = self.get_queue_index(vehicle.lane_index, target_lane)
+        self.lane_rows[vehicle.queue_index] = None
+        
+        center = self.sub_lane_positions[vehicle.lane][target_lane]
+        if vehicle.axis == 0:
+            vehicle.y = center - vehicle.height // 2
+        else:
+            vehicle.x = center - vehicle.width // 2
+        self.occupancy.update(vehicle)
+        
+        vehicle.last_distance_to_ahead = None
+        vehicle.collision_lock_active = False
+        vehicle.lane_change_cooldown = self.lane_change_cooldown
+        
+        self.lane_changes += 1
+    
+    def get_lane_rows(self, queue_index):
+        rows = self.lane_rows[queue_index]
+        if rows is None:
+            queue = self.lane_queues[queue_index]
+            rows = np.fromiter((vehicle.row for vehicle in queue), dtype=np.intp, count=len(queue))
+            self.lane_rows[queue_index] = rows
+        return rows
+    
+    def count_stopped_vehicles(self, speed_threshold):
+        if self.vehicle_store is not None:
+            return self.vehicle_store.count_below_speed(speed_threshold)
+        
+        stopped = 0
+        for vehicle in self.get_vehicles():
+            if vehicle.current_speed < speed_threshold:
+                stopped += 1
+        return stopped
+    
+    def update_lane(self, queue):
+        lead_vehicle = None
+        for vehicle in queue:
+            if vehicle.has_crossed_any_border():
+                continue
+            distance = vehicle.get_distance_to_intersection()
+            if distance is not None and distance >= 0:
+                lead_vehicle = vehicle
+            break
+        
+        sleeping_vehicles = self.sleeping_vehicles
+        vehicle_ahead = None
+        for vehicle in queue:
+            if vehicle.sleeping:
+                if vehicle is not lead_vehicle and vehicle.can_keep_sleeping(vehicle_ahead):
+                    vehicle.follower = None
+                    vehicle_ahead.follower = vehicle
+                    vehicle_ahead = vehicle
+                    continue
+                self.wake_vehicle(vehicle)
+            
+            vehicle.leader = vehicle_ahead
+            vehicle.follower = None
+            if vehicle_ahead is not None:
+                vehicle_ahead.follower = vehicle
+            
+            distance_ahead = vehicle.get_gap_to(vehicle_ahead) if vehicle_ahead else None
+            
+            vehicle.adjust_speed_for_traffic_light(
+                self.traffic_light_state,
+                is_lead_vehicle=(vehicle is lead_vehicle),
+                vehicle_ahead=vehicle_ahead
+            )
+            
+            vehicle.adjust_speed_for_traffic(distance_ahead, vehicle_ahead)
+            
+            if vehicle_ahead is not None and vehicle is not lead_vehicle:
+                gap = vehicle.get_gap_to(vehicle_ahead)
+                if vehicle.can_sleep(vehicle_ahead, gap):
+                    vehicle.sleep(gap)
+                    sleeping_vehicles.add(vehicle)
+            
+            vehicle_ahead = vehicle
+    
+    def integrate(self, delta_time):
+        if self.lane_order is not None:
+            # Las colas no cambian entre update e integrate: se reusa el orden
+            self.vehicle_store.integrate(delta_time)
+            project_lanes(self.vehicle_store, self.lane_order)
+            self.lane_order = None
+        else:
+            for queue in self.lane_queues:
+                project_lane(queue, delta_time=delta_time)
+        
+        for queue in self.lane_queues:
+            self.occupancy.update_lane(queue)
+    
+    def set_traffic_counter(self, traffic_counter):
+        """Mantener las estadisticas del contador con los eventos de aparicion,
+        entrada a la caja y salida, en lugar de recalcularlas cada paso"""
+        if self.traffic_counter is not None:
+            self.occupancy.remove_enter_listener(self.traffic_counter.discard_vehicle)
+        
+        self.traffic_counter = traffic_counter
+        traffic_counter.set_occupancy(self.occupancy)
+        self.occupancy.add_enter_listener(traffic_counter.discard_vehicle)
+        traffic_counter.update(self.get_vehicles())
+    
+    def is_intersection_clear(self):
+        return self.occupancy.is_clear()
+    
+    def get_blocked_approaches(self):
+        """Accesos cuyo recorrido por la caja ocupa un vehiculo de otro acceso"""
+        return [LANE_NAMES[lane_index] for lane_index in self.occupancy.get_blocked_approaches()]
+    
+    def remove_vehicle(self, vehicle):
+        queue_index = vehicle.queue_index
+        queue = self.lane_queues[queue_index]
+        if queue and queue[0] is vehicle:
+            queue.popleft()
+            if self.lane_rows[queue_index] is not None:
+                self.lane_rows[queue_index] = self.lane_rows[queue_index][1:]
+        else:
+            queue.remove(vehicle)
+            self.lane_rows[queue_index] = None
+        
+        self.vehicles_stale = True
+        
+        if vehicle.sleeping:
+            self.wake_vehicle(vehicle)
+        self.occupancy.remove(vehicle)
+        if self.traffic_counter is not None:
+            self.traffic_counter.discard_vehicle(vehicle)
+        self.vehicle_pool.release(vehicle)
+    
+    def refresh_vehicle_list(self):
+        self.vehicles = [vehicle for queue in self.lane_queues for vehicle in queue]
+        self.vehicles_stale = False
+    
+    def is_vehicle_completely_out_of_bounds(self, vehicle):
+        return vehicle.get_rear_progress() > self.lane_geometry[vehicle.lane_index][1]
     
-    def spawn_vehicle(self, lane):
-        vehicle_type = random.choice(self.vehicle_types)
+    def spawn_vehicle(self, lane, sub_lane=0):
+        vehicle_type = self.spawn_rng.choice(self.vehicle_types)
         direction = self.lane_directions[lane]
         
-        vehicle = SimulationVehicle(vehicle_type, lane, direction)
+        vehicle = self.vehicle_pool.acquire(
+            vehicle_type, lane, direction, rng=self.vehicle_rng, store=self.vehicle_store
+        )
         
         vehicle.set_intersection_bounds(self.intersection_bounds)
         
-        if 'horizontal_bottom' in lane:
-            x = self.sim_area_x - vehicle.width - 50
-            y = self.lane_positions['horizontal_bottom'] - vehicle.height // 2
-        elif 'horizontal_top' in lane:
-            x = self.sim_area_x + self.sim_area_width + 50
-            y = self.lane_positions['horizontal_top'] - vehicle.height // 2
-        elif 'vertical_left' in lane:
-            x = self.lane_positions['vertical_left'] - vehicle.width // 2
-            y = self.sim_area_y - vehicle.height - 50
-        else:
-            x = self.lane_positions['vertical_right'] - vehicle.width // 2
-            y = self.sim_area_y + self.sim_area_height + 50
+        vehicle.sub_lane = sub_lane
+        lane_index = LANE_INDEX[lane]
+        vehicle.queue_index = self.get_queue_index(lane_index, sub_lane)
         
-        lane_vehicles = [v for v in self.vehicles if v.has_tag(lane)]
+        vehicle.place_on_lane(self.lane_geometry[lane_index][0], self.sub_lane_positions[lane][sub_lane])
         
-        if not self.check_spawn_collision(x, y, vehicle.width, vehicle.height, lane_vehicles, direction):
+        # El vehiculo nuevo entra detras del ultimo de su carril
+        queue = self.lane_queues[vehicle.queue_index]
+        if not self.check_spawn_collision(vehicle, queue[-1] if queue else None):
+            self.vehicle_pool.release(vehicle)
             return None
         
-        vehicle.x = x
-        vehicle.y = y
-        vehicle.original_x = x
-        vehicle.original_y = y
+        vehicle.original_x = vehicle.x
+        vehicle.original_y = vehicle.y
         vehicle.activate()
         vehicle.show()
         vehicle.set_clip_bounds(self.clip_bounds)
         
+        queue.append(vehicle)
         self.vehicles.append(vehicle)
+        vehicle.vehicle_id = self.vehicles_spawned
+        self.vehicles_spawned += 1
+        
+        if self.traffic_counter is not None:
+            self.traffic_counter.record_arrival(lane_index)
+            self.traffic_counter.add_vehicle(vehicle)
+        
+        if self.vehicle_store is not None and self.lane_rows[vehicle.queue_index] is not None:
+            self.lane_rows[vehicle.queue_index] = np.append(self.lane_rows[vehicle.queue_index], vehicle.row)
         
         return vehicle
     
-    def check_spawn_collision(self, spawn_x, spawn_y, vehicle_width, vehicle_height, lane_vehicles, direction):
-        min_gap = 250
-    
-        for vehicle in lane_vehicles:
-            if not vehicle.is_active():
-                continue
-            
-            if direction > 0:
-                distance_ahead = vehicle.x - (spawn_x + vehicle_width)
-                if distance_ahead < min_gap and distance_ahead > -vehicle_width:
-                    return False
-            else:
-                distance_ahead = spawn_x - (vehicle.x + vehicle.width)
-                if distance_ahead < min_gap and distance_ahead > -vehicle_width:
-                    return False
-    
-        return True
+    def check_spawn_collision(self, vehicle, tail_vehicle):
+        """True si el vehiculo colocado en la entrada deja min_spawn_gap hasta
+        la cola del ultimo de su carril, medido a lo largo del carril"""
+        if tail_vehicle is None or not tail_vehicle.is_active():
+            return True
+        
+        return vehicle.get_gap_to(tail_vehicle) >= self.min_spawn_gap
     
     def clear_all(self):
-        for vehicle in self.vehicles[:]:
+        for vehicle in self.get_vehicles():
             vehicle.deactivate()
             vehicle.cleanup_canvas_items()
-        self.vehicles.clear()
+        self.vehicles = []
+        self.vehicles_stale = False
+        
+        for queue in self.lane_queues:
+            queue.clear()
+        self.lane_rows = [None] * len(self.lane_queues)
+        self.lane_order = None
+        
+        self.wake_all()
+        self.occupancy.clear()
+        if self.traffic_counter is not None:
+            self.traffic_counter.clear()
+        self.vehicle_pool.clear()
+        
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        self.lane_changes = 0
+        self.lane_change_timer = 0.0
+        
+        self.demand_time = 0.0
+        self.demand_scheduler.reset(self.demand_time)
+        
+        # Sin vehiculos la flota queda bajo el umbral del store
+        self.vehicle_store = None
     
     def get_vehicles(self):
+        if self.vehicles_stale:
+            self.refresh_vehicle_list()
         return self.vehicles
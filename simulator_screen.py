@@ -37,7 +37,11 @@ class SimulatorScreen(ScreenHandler):
             self.sim_area_x,
             self.sim_area_y,
             self.sim_area_width,
-            self.sim_area_height
+            self.sim_area_height,
+            random_streams=getattr(app, 'random_streams', None),
+            record_path=getattr(app, 'record_path', None),
+            replay_path=getattr(app, 'replay_path', None),
+            signal_controller=getattr(app, 'signal_controller', None)
         )
         self.simulation_handler.set_simulator_screen(self)
     
@@ -484,12 +488,22 @@ class SimulatorScreen(ScreenHandler):
         self.setup_cursor_callbacks()
         
         self.cursor_handler.enable_smooth_movement(0.9)
+        
+        # Recorrer un registro de trayectorias en reproduccion
+        self.canvas.bind('<Left>', lambda event: self.simulation_handler.scrub_replay(-5))
+        self.canvas.bind('<Right>', lambda event: self.simulation_handler.scrub_replay(5))
+        self.canvas.bind('<Shift-Left>', lambda event: self.simulation_handler.scrub_replay(-60))
+        self.canvas.bind('<Shift-Right>', lambda event: self.simulation_handler.scrub_replay(60))
+        self.canvas.focus_set()
     
     def on_hide(self):
         print("DEBUG: Simulator on_hide llamado")
     
         self.cursor_handler.disable_smooth_movement()
     
+        for sequence in ('<Left>', '<Right>', '<Shift-Left>', '<Shift-Right>'):
+            self.canvas.unbind(sequence)
+    
         if self.simulation_handler:
             self.simulation_handler.cleanup()
     
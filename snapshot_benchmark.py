@@ -0,0 +1,45 @@
+import argparse
+import time
+from simulation_engine import SimulationEngine
+
+def build_engine(grid, vector_store, seed):
+    if grid is None:
+        return SimulationEngine(seed=seed, vector_store=vector_store)
+    return SimulationEngine(seed=seed, grid=(grid, grid))
+
+def time_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+def run_benchmark(grid=10, warmup=120.0, vector_store=False, repeats=50, seed=1):
+    """Costo de snapshot() y restore() de un motor calentado warmup segundos.
+    grid None es un cruce aislado; la red de cruces usa la ruta escalar."""
+    engine = build_engine(grid, vector_store, seed)
+    engine.run(warmup)
+    target = build_engine(grid, vector_store, seed)
+
+    data = engine.snapshot()
+    return {
+        'vehicles': len(engine.vehicle_manager.get_vehicles()),
+        'bytes': len(data),
+        'snapshot_ms': time_call(engine.snapshot, repeats) * 1000.0,
+        'restore_ms': time_call(lambda: target.restore(data), repeats) * 1000.0
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo de snapshot y restore de un SimulationEngine")
+    parser.add_argument("--grids", type=int, nargs="+", default=[0, 5, 10, 20],
+                        help="tamanos de la red (0 es un cruce aislado)")
+    parser.add_argument("--warmup", type=float, default=120.0)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--vector-store", action="store_true", help="cruce aislado con VehicleStore")
+    args = parser.parse_args()
+
+    print(f"{'red':>6} {'vehiculos':>10} {'bytes':>8} {'snapshot ms':>12} {'restore ms':>11}")
+    for grid in args.grids:
+        result = run_benchmark(grid or None, args.warmup, args.vector_store, args.repeats)
+        name = f"{grid}x{grid}" if grid else "cruce"
+        print(f"{name:>6} {result['vehicles']:>10} {result['bytes']:>8} "
+              f"{result['snapshot_ms']:>12.3f} {result['restore_ms']:>11.3f}")
@@ -0,0 +1,49 @@
+from demand_scheduler import DemandScheduler, HeadwayProfile
+
+def test_arrivals_are_served_in_time_order():
+    scheduler = DemandScheduler({
+        'a': HeadwayProfile(2.0, start_time=0.5),
+        'b': HeadwayProfile(3.0)
+    }, horizon=10.0)
+
+    served = []
+    while scheduler.get_next_time() <= 7.0:
+        time = scheduler.get_next_time()
+        for lane in scheduler.pop_due(time):
+            served.append((time, lane))
+            scheduler.consume(lane)
+
+    assert served == [(0.0, 'b'), (0.5, 'a'), (2.5, 'a'), (3.0, 'b'), (4.5, 'a'), (6.0, 'b'), (6.5, 'a')]
+    assert scheduler.get_backlog_total() == 0
+
+def test_late_poll_lists_each_lane_once():
+    scheduler = DemandScheduler({'a': HeadwayProfile(1.0), 'b': HeadwayProfile(1.0)}, horizon=10.0)
+
+    assert scheduler.pop_due(2.5) == ['a', 'b']
+    assert scheduler.backlog == {'a': 3, 'b': 3}
+    assert scheduler.arrivals == 6
+
+def test_blocked_lane_keeps_backlog_and_retries_once():
+    scheduler = DemandScheduler({'a': HeadwayProfile(1.0)}, horizon=10.0, max_backlog=2)
+
+    assert scheduler.pop_due(0.0) == ['a']
+    # Entrada bloqueada: un solo reintento aunque se pida dos veces
+    scheduler.retry('a', 0.25)
+    scheduler.retry('a', 0.75)
+    assert scheduler.get_next_time() == 0.25
+    assert scheduler.pop_due(0.5) == ['a']
+    assert scheduler.backlog['a'] == 1
+
+    # Con un reintento pendiente la llegada suma al backlog sin volver a listar el carril
+    scheduler.retry('a', 1.5)
+    assert scheduler.pop_due(1.0) == []
+    assert scheduler.backlog['a'] == 2
+
+    # Vence el reintento; la llegada de 2.0 encuentra el backlog lleno y se descarta
+    assert scheduler.pop_due(2.0) == ['a']
+    assert scheduler.backlog['a'] == 2
+    assert scheduler.dropped_arrivals == 1
+
+    scheduler.consume('a')
+    scheduler.consume('a')
+    assert not scheduler.has_backlog('a')
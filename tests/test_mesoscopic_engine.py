@@ -0,0 +1,6 @@
+from meso_comparison import compare, within_tolerance
+
+def test_indicators_match_microscopic_engine():
+    results, _, _ = compare(seed=1, duration=600.0)
+
+    assert within_tolerance(results), results
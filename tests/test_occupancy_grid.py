@@ -0,0 +1,62 @@
+from occupancy_grid import OccupancyGrid
+from simulation_vehicles import SimulationVehicle, LANE_INDEX
+
+BOUNDS = {'left': 0, 'top': 0, 'right': 100, 'bottom': 100}
+
+def place(lane, x, y):
+    vehicle = SimulationVehicle('sedan', lane, 1)
+    vehicle.x = x
+    vehicle.y = y
+    return vehicle
+
+def test_enter_listener_fires_once_per_entry():
+    grid = OccupancyGrid(BOUNDS, cell_size=25)
+    entered = []
+    grid.add_enter_listener(entered.append)
+
+    vehicle = place('horizontal_bottom', -50, 60)
+    grid.update(vehicle)
+    assert entered == [] and grid.is_clear()
+
+    # El rectangulo toca la caja aunque el centro siga afuera
+    vehicle.x = -20
+    grid.update(vehicle)
+    vehicle.x = 10
+    grid.update(vehicle)
+    assert entered == [vehicle]
+    assert grid.contains(vehicle)
+
+    vehicle.x = 100
+    grid.update(vehicle)
+    assert not grid.contains(vehicle) and grid.is_clear()
+
+    vehicle.x = 80
+    grid.update(vehicle)
+    assert entered == [vehicle, vehicle]
+
+def test_approach_blocked_by_crossing_traffic():
+    grid = OccupancyGrid(BOUNDS, cell_size=25)
+    east = LANE_INDEX['horizontal_bottom']
+    south = LANE_INDEX['vertical_left']
+    grid.set_approach_path(east, 0, 50, 100)
+    grid.set_approach_path(south, 1, 0, 50)
+
+    # Un vehiculo del propio acceso no lo bloquea
+    own = place('horizontal_bottom', 30, 60)
+    grid.update(own)
+    assert not grid.is_approach_blocked(east)
+    blocked = grid.get_blocked_approaches()
+    assert south in blocked and east not in blocked
+
+    # Uno del otro acceso en la mitad de arriba no cruza el recorrido de east
+    crossing = place('vertical_left', 10, 0)
+    grid.update(crossing)
+    assert not grid.is_approach_blocked(east)
+
+    crossing.y = 40
+    grid.update(crossing)
+    assert grid.is_approach_blocked(east)
+
+    grid.remove(crossing)
+    assert not grid.is_approach_blocked(east)
+    assert grid.get_occupants(grid.get_cell_index(1, 2)) == {own}
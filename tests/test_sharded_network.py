@@ -0,0 +1,43 @@
+import pytest
+
+from simulation_engine import SimulationEngine
+from sharded_network import ShardedSimulation
+
+def test_shard_failure_is_raised_instead_of_hanging():
+    # Sin lugar en el buzon, el primer vehiculo que cruza de shard falla
+    simulation = ShardedSimulation(2, 4, shards=2, max_transfers=0, seed=1, barrier_timeout=10.0)
+
+    with pytest.raises(OverflowError):
+        simulation.run(30.0)
+
+    assert simulation.processes == []
+    assert simulation.buffers is None
+
+def test_sharded_run_reports_statistics():
+    simulation = ShardedSimulation(2, 4, shards=2, seed=1)
+    try:
+        simulation.run(10.0)
+        statistics = simulation.get_statistics()
+    finally:
+        simulation.close()
+
+    assert statistics['ticks'] == 600
+    assert statistics['vehicles_spawned'] > 0
+
+def test_sharded_statistics_match_single_process():
+    engine = SimulationEngine(seed=1, grid=(2, 4))
+    engine.run(120.0)
+    expected = engine.get_statistics()
+
+    simulation = ShardedSimulation(2, 4, shards=2, seed=1)
+    try:
+        simulation.run(120.0)
+        statistics = simulation.get_statistics()
+    finally:
+        simulation.close()
+
+    # La frontera va un paso atrasada: los agregados coinciden con tolerancia
+    assert statistics['phase_changes'] == expected['phase_changes']
+    assert statistics['throughput_per_hour'] == pytest.approx(expected['throughput_per_hour'], rel=0.05)
+    assert statistics['mean_queued_vehicles'] == pytest.approx(expected['mean_queued_vehicles'], rel=0.05)
+    assert statistics['stopped_time_per_vehicle'] == pytest.approx(expected['stopped_time_per_vehicle'], rel=0.1)
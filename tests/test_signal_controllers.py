@@ -0,0 +1,29 @@
+import pytest
+from simulation_engine import SimulationEngine
+from signal_controllers import WebsterController, FixedTimeController
+
+def build_engine(controller):
+    engine = SimulationEngine(seed=4)
+    engine.set_signal_controller(controller)
+    return engine
+
+def test_restore_keeps_webster_window():
+    original = build_engine(WebsterController(window=60))
+    original.run(200.0)
+    snapshot = original.snapshot()
+
+    restored = build_engine(WebsterController(window=60))
+    restored.restore(snapshot)
+
+    original.run(300.0)
+    restored.run(300.0)
+
+    assert restored.get_statistics() == original.get_statistics()
+
+def test_restore_rejects_other_controller():
+    engine = build_engine(WebsterController(window=60))
+    engine.run(30.0)
+    snapshot = engine.snapshot()
+
+    with pytest.raises(ValueError):
+        build_engine(FixedTimeController()).restore(snapshot)
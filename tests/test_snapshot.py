@@ -0,0 +1,30 @@
+from simulation_engine import SimulationEngine
+
+def build_engine(vector_store=False, grid=None):
+    engine = SimulationEngine(seed=3, vector_store=vector_store, grid=grid)
+    if vector_store:
+        # Reglas por lotes aun con pocos vehiculos
+        engine.vehicle_manager.vector_min_vehicles = 0
+    return engine
+
+def check_round_trip(vector_store=False, grid=None):
+    original = build_engine(vector_store, grid)
+    original.run(90.0)
+    data = original.snapshot()
+
+    restored = build_engine(vector_store, grid)
+    restored.restore(data)
+    assert restored.snapshot() == data
+
+    original.run(60.0)
+    restored.run(60.0)
+    assert restored.get_statistics() == original.get_statistics()
+
+def test_round_trip_scalar_intersection():
+    check_round_trip()
+
+def test_round_trip_vehicle_store():
+    check_round_trip(vector_store=True)
+
+def test_round_trip_network():
+    check_round_trip(grid=(3, 3))
@@ -0,0 +1,93 @@
+import pytest
+from simulation_engine import SimulationEngine
+from trajectory_log import (
+    TrajectoryPlayer, write_varint, write_signed, read_varint, read_signed,
+    VEHICLE_ID, X, Y
+)
+
+def record_run(path, ticks, keyframe_interval):
+    """Graba ticks pasos y devuelve (id, x, y) de cada vehiculo por tick"""
+    engine = SimulationEngine(seed=2)
+    engine.run(30.0)
+    engine.start_recording(path, keyframe_interval)
+
+    expected = {}
+    for _ in range(ticks):
+        engine.step()
+        expected[engine.tick_count] = [(vehicle.vehicle_id, vehicle.x, vehicle.y)
+                                       for vehicle in engine.get_vehicles()]
+    engine.stop_recording()
+    return expected
+
+def test_varint_and_zigzag_round_trip():
+    unsigned = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 35, 2 ** 63]
+    signed = [0, -1, 1, -64, 63, 64, -65, -(2 ** 40), 2 ** 40]
+
+    data = bytearray()
+    for value in unsigned:
+        write_varint(data, value)
+    for value in signed:
+        write_signed(data, value)
+
+    offset = 0
+    for value in unsigned:
+        decoded, offset = read_varint(data, offset)
+        assert decoded == value
+    for value in signed:
+        decoded, offset = read_signed(data, offset)
+        assert decoded == value
+    assert offset == len(data)
+
+def test_get_frame_across_keyframes(tmp_path):
+    path = tmp_path / "run.simt"
+    expected = record_run(path, 40, keyframe_interval=7)
+    first_tick = min(expected)
+
+    player = TrajectoryPlayer(path)
+    try:
+        assert player.get_chunk_count() == 6
+        assert player.get_first_tick() == first_tick
+        assert player.get_last_tick() == max(expected)
+
+        # Ultimo cuadro de un bloque, primero del siguiente y saltos hacia atras
+        offsets = [6, 7, 8, 13, 14, 0, 39, 20, 21, 6]
+        for offset in offsets:
+            tick = first_tick + offset
+            frame = player.get_frame(tick)
+            assert frame.tick == tick
+            assert [vehicle[VEHICLE_ID] for vehicle in frame.vehicles] == [row[0] for row in expected[tick]]
+            for vehicle, (_, x, y) in zip(frame.vehicles, expected[tick]):
+                assert vehicle[X] == pytest.approx(x, abs=0.05)
+                assert vehicle[Y] == pytest.approx(y, abs=0.05)
+
+        with pytest.raises(IndexError):
+            player.get_frame(first_tick + 40)
+    finally:
+        player.close()
+
+def test_log_without_index_reads_complete_chunks(tmp_path):
+    path = tmp_path / "run.simt"
+    expected = record_run(path, 40, keyframe_interval=7)
+    first_tick = min(expected)
+
+    player = TrajectoryPlayer(path)
+    try:
+        index_ticks = list(player.index_ticks)
+        last_offset = player.index_offsets[-1]
+    finally:
+        player.close()
+
+    # Corrida cortada: sin indice y con el ultimo bloque a medias
+    cut_path = tmp_path / "cut.simt"
+    cut_path.write_bytes(path.read_bytes()[:last_offset + 10])
+
+    player = TrajectoryPlayer(cut_path)
+    try:
+        assert list(player.index_ticks) == index_ticks[:-1]
+        assert player.get_last_tick() == first_tick + 34
+        assert player.find_chunk(first_tick + 35) is None
+
+        ticks = [frame.tick for frame in player.frames(first_tick + 12)]
+        assert ticks == list(range(first_tick + 12, first_tick + 35))
+    finally:
+        player.close()
@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from simulation_engine import SimulationEngine
+from simulation_vehicles import SimulationVehicle, StoredSimulationVehicle
+
+SEEDS = (1, 2, 3)
+
+def build_pair(seed):
+    scalar = SimulationEngine(seed=seed)
+    vector = SimulationEngine(seed=seed, vector_store=True)
+    # Forzar el kernel aun con pocos vehiculos
+    vector.vehicle_manager.vector_min_vehicles = 0
+    scalar.start()
+    vector.start()
+    return scalar, vector
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_vector_path_tracks_scalar_positions(seed):
+    # Mientras ambas rutas tienen los mismos vehiculos, las posiciones solo
+    # difieren por evaluar las reglas por lotes y por los vehiculos dormidos
+    scalar, vector = build_pair(seed)
+
+    for _ in range(900):
+        scalar.step()
+        vector.step()
+
+        scalar_vehicles = {vehicle.vehicle_id: vehicle for vehicle in scalar.get_vehicles()}
+        vector_vehicles = {vehicle.vehicle_id: vehicle for vehicle in vector.get_vehicles()}
+        assert scalar_vehicles.keys() == vector_vehicles.keys()
+
+        for vehicle_id, vehicle in scalar_vehicles.items():
+            other = vector_vehicles[vehicle_id]
+            assert abs(vehicle.x - other.x) + abs(vehicle.y - other.y) < 5.0
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_vector_path_matches_scalar_statistics(seed):
+    scalar, vector = build_pair(seed)
+    scalar.run(120.0)
+    vector.run(120.0)
+
+    scalar_stats = scalar.get_statistics()
+    vector_stats = vector.get_statistics()
+
+    for key in ('vehicles_spawned', 'vehicles_exited'):
+        assert vector_stats[key] == pytest.approx(scalar_stats[key], rel=0.05, abs=2)
+    assert vector_stats['phase_changes'] == scalar_stats['phase_changes']
+
+def test_small_networks_fall_back_to_scalar_rules():
+    # Por debajo de vector_min_vehicles los vehiculos siguen siendo objetos
+    # de Python en la ruta escalar, asi que la corrida es identica
+    scalar = SimulationEngine(seed=1)
+    vector = SimulationEngine(seed=1, vector_store=True)
+    scalar.run(60.0)
+    vector.run(60.0)
+
+    assert vector.get_statistics() == scalar.get_statistics()
+
+def test_vehicles_move_in_and_out_of_the_store_in_place():
+    engine = SimulationEngine(seed=2, vector_store=True)
+    engine.run(30.0)
+    manager = engine.vehicle_manager
+    assert manager.vehicle_store is None
+
+    vehicles = list(manager.get_vehicles())
+    before = [[getattr(vehicle, name) for name in StoredSimulationVehicle.STORE_ATTRIBUTES] for vehicle in vehicles]
+
+    manager.vector_min_vehicles = len(vehicles)
+    manager.update_vector_store()
+    assert manager.vehicle_store is not None
+    assert all(type(vehicle) is StoredSimulationVehicle for vehicle in vehicles)
+    assert manager.get_vehicles() == vehicles
+
+    manager.vector_min_vehicles = 2 * len(vehicles) + 2
+    manager.update_vector_store()
+    assert manager.vehicle_store is None
+    assert all(type(vehicle) is SimulationVehicle for vehicle in vehicles)
+
+    after = [[getattr(vehicle, name) for name in StoredSimulationVehicle.STORE_ATTRIBUTES] for vehicle in vehicles]
+    assert after == before
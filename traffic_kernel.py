@@ -0,0 +1,296 @@
+from collections import namedtuple
+from vehicle_store import (
+    np, NUMPY_AVAILABLE,
+    FLAG_EMERGENCY_BRAKE, FLAG_CROSSED_INTERSECTION, FLAG_COLLISION_LOCK
+)
+
+GRID_SIZE = 50
+ABSOLUTE_STOP_DISTANCE = 1.0
+STOPPING_DISTANCE_THRESHOLD = GRID_SIZE * 3.0
+EMERGENCY_BRAKE_DISTANCE = GRID_SIZE * 1.5
+CRITICAL_DISTANCE = GRID_SIZE / 5.0
+EMERGENCY_FOLLOW_DISTANCE = 0.2
+SAFETY_MARGIN = 0.5
+PROJECTION_TOLERANCE = 1e-9
+
+# Filas de todos los carriles concatenadas (cabeza primero), con la geometria
+# fija de cada fila. El lider de una fila es siempre la fila anterior salvo
+# en la cabeza de cada carril (has_leader False), asi que los valores del
+# lider se leen desplazando el arreglo en uno. lanes es el carril de cada
+# fila, slots su posicion en la cola y heads el indice de la cabeza de su
+# carril, para las operaciones que se reinician en cada carril. A lo largo
+# del carril se mide el progreso = sentido * coordenada, como en
+# SimulationVehicle, y stop_progress es el progreso de la linea de detencion
+# (None sin caja).
+LaneOrder = namedtuple('LaneOrder', (
+    'order', 'has_leader', 'lanes', 'slots', 'heads',
+    'horizontal', 'sign', 'length', 'front_offset', 'stop_progress'
+))
+
+def build_lane_order(store, lane_rows):
+    """Orden por carriles de lane_rows (un arreglo de filas por carril)"""
+    lengths = np.fromiter(map(len, lane_rows), dtype=np.intp, count=len(lane_rows))
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return LaneOrder(empty, empty.astype(bool), empty, empty, empty, empty.astype(bool),
+                         empty.astype(np.float64), empty.astype(np.float64), empty.astype(np.float64), None)
+
+    order = np.concatenate(lane_rows).astype(np.intp, copy=False)
+    lanes = np.repeat(np.arange(len(lane_rows)), lengths)
+    heads = (np.cumsum(lengths) - lengths)[lanes]
+    slots = np.arange(total) - heads
+
+    horizontal = store.axis[order] == 0
+    sign = store.sign[order].astype(np.float64)
+    forward = sign > 0
+    length = np.where(horizontal, store.width[order], store.height[order])
+    front_offset = np.where(forward, length, 0.0)
+
+    stop_progress = None
+    bounds = store.intersection_bounds
+    if bounds is not None:
+        # Progreso del borde de entrada por 2 * vertical + hacia adelante
+        entry_progress = np.array([-bounds['right'], bounds['left'], -bounds['bottom'], bounds['top']])
+        stop_progress = entry_progress[2 * ~horizontal + forward]
+
+    return LaneOrder(order, slots > 0, lanes, slots, heads,
+                     horizontal, sign, length, front_offset, stop_progress)
+
+def lane_cumsum(values, lane_order):
+    """Suma acumulada de values reiniciada en cada carril"""
+    total = np.cumsum(values)
+    return total - (total - values)[lane_order.heads]
+
+def lane_cummin(values, lane_order):
+    """Minimo acumulado de values reiniciado en cada carril. Bajar cada
+    carril un escalon mayor que el rango de values hace que el minimo de
+    todo el arreglo se reinicie en la cabeza de cada carril; el escalon
+    agrega un error de redondeo muy por debajo de PROJECTION_TOLERANCE"""
+    if len(values) == 0:
+        return values
+    shift = lane_order.lanes * (values.max() - values.min() + 1.0)
+    return np.minimum.accumulate(values - shift) + shift
+
+def shift_to_followers(values):
+    """Valor del lider de cada fila (sin sentido en las cabezas de carril)"""
+    shifted = np.empty_like(values)
+    shifted[0] = values[0]
+    shifted[1:] = values[:-1]
+    return shifted
+
+def get_front_progress(store, lane_order):
+    order = lane_order.order
+    position = np.where(lane_order.horizontal, store.x[order], store.y[order])
+    return lane_order.sign * position + lane_order.front_offset
+
+def write_position(store, order, horizontal, position, mask):
+    rows = order[mask]
+    store.x[rows[horizontal[mask]]] = position[mask & horizontal]
+    store.y[rows[~horizontal[mask]]] = position[mask & ~horizontal]
+
+def stop_rows(store, rows):
+    store.current_speed[rows] = 0.0
+    store.target_speed[rows] = 0.0
+    store.velocity_x[rows] = 0.0
+    store.velocity_y[rows] = 0.0
+
+def apply_traffic_rules(store, lane_order, traffic_light_state):
+    """Version por lotes de SimulationVehicle.adjust_speed_for_traffic_light
+    y adjust_speed_for_traffic para todos los vehiculos del store.
+
+    Todas las filas se evaluan con el estado al inicio del paso, en lugar de
+    ir actualizando vehiculo por vehiculo, por lo que el resultado coincide
+    con la ruta escalar dentro de una tolerancia.
+    """
+    order = lane_order.order
+    if len(order) == 0 or lane_order.stop_progress is None:
+        return
+
+    horizontal = lane_order.horizontal
+    has_leader = lane_order.has_leader
+
+    front = get_front_progress(store, lane_order)
+    gap = shift_to_followers(front - lane_order.length) - front
+
+    # --- Respuesta al semaforo ---
+    base_speed = store.base_speed[order]
+
+    distance_to_intersection = lane_order.stop_progress - front
+    crossed_border = distance_to_intersection < 0
+
+    if traffic_light_state == 'off':
+        can_go = np.ones(len(order), dtype=bool)
+    elif traffic_light_state == 'left_go':
+        can_go = horizontal
+    elif traffic_light_state == 'right_go':
+        can_go = ~horizontal
+    else:
+        can_go = np.zeros(len(order), dtype=bool)
+
+    # Cabeza de la cola: el primer vehiculo de cada carril que no cruzo
+    is_lead = np.zeros(len(order), dtype=bool)
+    waiting = np.flatnonzero(~crossed_border)
+    if len(waiting):
+        waiting_lanes = lane_order.lanes[waiting]
+        is_lead[waiting[np.concatenate(([True], waiting_lanes[1:] != waiting_lanes[:-1]))]] = True
+
+    stopping = ~crossed_border & ~can_go & is_lead
+    braking = stopping & (distance_to_intersection <= STOPPING_DISTANCE_THRESHOLD)
+    emergency = braking & (distance_to_intersection <= EMERGENCY_BRAKE_DISTANCE)
+    gradual = braking & ~emergency
+
+    store.traffic_light_target_speed[order] = np.select(
+        [crossed_border, emergency, gradual],
+        [base_speed * 1.3, 0.0, np.maximum(20, base_speed * distance_to_intersection / STOPPING_DISTANCE_THRESHOLD)],
+        np.nan
+    )
+
+    flags = store.flags[order]
+    flags = np.where(crossed_border, flags | FLAG_CROSSED_INTERSECTION, flags)
+    flags = np.where(emergency, flags | FLAG_EMERGENCY_BRAKE, flags & ~FLAG_EMERGENCY_BRAKE)
+
+    # --- Seguimiento del vehiculo de adelante ---
+    leader_speed = shift_to_followers(store.current_speed[order])
+
+    distance_increasing = gap > store.last_distance_to_ahead[order]
+    store.last_distance_to_ahead[order] = np.where(has_leader, gap, np.nan)
+
+    collision = has_leader & (gap < CRITICAL_DISTANCE)
+    locked = (flags & FLAG_COLLISION_LOCK) != 0
+    release = has_leader & ~collision & locked & distance_increasing
+    still_locked = has_leader & ~collision & locked & ~release
+
+    following = has_leader & ~collision & ~still_locked
+    emergency_follow = following & emergency
+    close_emergency = emergency_follow & (gap < EMERGENCY_FOLLOW_DISTANCE)
+    normal = following & ~emergency
+
+    width = store.width[order]
+    safe_distance = width * 2.0
+    deceleration_distance = width * 5.0
+    acceleration_distance = width * 7.0
+
+    ratio = gap / deceleration_distance
+    decelerating_target = np.minimum(base_speed, np.maximum(leader_speed + (base_speed - leader_speed) * ratio, 50))
+    ratio = (gap - deceleration_distance) / (acceleration_distance - deceleration_distance)
+    accelerating_target = leader_speed + (base_speed - leader_speed) * ratio
+
+    # Las condiciones se toman en orden, como los if de la ruta escalar
+    store.target_speed[order] = np.select(
+        [
+            collision | still_locked | close_emergency,
+            emergency_follow,
+            normal & (gap < safe_distance),
+            normal & (gap < deceleration_distance),
+            normal & (gap < acceleration_distance)
+        ],
+        [0.0, np.minimum(leader_speed, 15), np.maximum(leader_speed * 0.85, 40), decelerating_target, accelerating_target],
+        base_speed
+    )
+
+    flags = np.where(collision, flags | FLAG_COLLISION_LOCK, flags)
+    flags = np.where(~has_leader | release, flags & ~FLAG_COLLISION_LOCK, flags)
+    store.flags[order] = flags
+
+    if collision.any():
+        stop_rows(store, order[collision])
+
+def project_lanes(store, lane_order):
+    """Version por lotes de simulation_vehicles.project_lane, despues de
+    integrar. Con el progreso del frente p (sentido * coordenada), cada fila
+    cumple p'[i] = min(a[i], p'[i-1] - d[i]), donde a[i] es su propio limite
+    (frente actual o linea de detencion) y d[i] el largo del lider mas la
+    distancia minima. Sumando S[i] = d[1] + ... + d[i], p'[i] + S[i] es el
+    minimo acumulado de a + S a lo largo del carril."""
+    order = lane_order.order
+    if len(order) == 0:
+        return
+
+    front = get_front_progress(store, lane_order)
+    limit = front.copy()
+
+    flags = store.flags[order]
+    emergency = (flags & FLAG_EMERGENCY_BRAKE) != 0
+    locked = (flags & FLAG_COLLISION_LOCK) != 0
+
+    stop_progress = lane_order.stop_progress
+    if stop_progress is not None:
+        at_stop_line = emergency & (front <= stop_progress)
+        limit[at_stop_line] = np.minimum(limit, stop_progress - SAFETY_MARGIN)[at_stop_line]
+
+    min_distance = np.where(locked, CRITICAL_DISTANCE, np.where(emergency, EMERGENCY_FOLLOW_DISTANCE, 0.0))
+    spacing = np.where(lane_order.has_leader, shift_to_followers(lane_order.length) + min_distance, 0.0)
+
+    offset = lane_cumsum(spacing, lane_order)
+    limit = lane_cummin(limit + offset, lane_order) - offset
+
+    # Sumar y restar offset deja un error de redondeo: solo cuenta como
+    # corregida la fila cuya restriccion es realmente mas estricta
+    moved = limit < front - PROJECTION_TOLERANCE
+    if moved.any():
+        position = lane_order.sign * (limit - lane_order.front_offset)
+        write_position(store, order, lane_order.horizontal, position, moved)
+        stop_rows(store, order[moved])
+
+def lane_change_candidates(store, lane_order, lane_count, min_distance, advantage, elapsed):
+    """Descartes por lotes de SimulationVehicleManager.try_lane_change para
+    los lane_count carriles de un acceso. Descuenta la espera de los
+    vehiculos que acaban de cambiar y devuelve el progreso del frente y de la
+    cola de cada fila, y los indices de las filas que aceptarian la brecha de
+    algun carril vecino con el estado al inicio de la pasada. La ruta escalar
+    repite la prueba solo con esas filas, en orden, porque cada cambio
+    modifica las brechas de los siguientes."""
+    order = lane_order.order
+    front = get_front_progress(store, lane_order)
+    rear = front - lane_order.length
+
+    cooldown = store.lane_change_cooldown[order]
+    cooling = cooldown > 0
+    store.lane_change_cooldown[order[cooling]] = cooldown[cooling] - elapsed
+
+    width = store.width[order]
+    gap = shift_to_followers(rear) - front
+    candidate = ~cooling & lane_order.has_leader & (gap < width * 7.0)
+
+    stop_progress = lane_order.stop_progress
+    if stop_progress is not None:
+        candidate &= (front <= stop_progress) & (stop_progress - front >= min_distance)
+
+    rows = np.flatnonzero(candidate)
+    if len(rows) == 0:
+        return front, rear, rows
+
+    # Clave creciente en todo el orden: carril * escalon - frente, como las
+    # claves por carril de change_lanes pero en un solo arreglo ordenado
+    lanes = lane_order.lanes
+    step = front.max() - front.min() + 1.0
+    keys = lanes * step - front
+
+    accepted = np.zeros(len(rows), dtype=bool)
+    last = len(order) - 1
+    for side in (-1, 1):
+        target = lanes[rows] + side
+        start = np.searchsorted(lanes, target, 'left')
+        end = np.searchsorted(lanes, target, 'right')
+        index = np.clip(np.searchsorted(keys, target * step - front[rows], 'left'), start, end)
+
+        has_lead = index > start
+        lead_gap = np.where(has_lead, rear[np.maximum(index - 1, 0)] - front[rows], np.inf)
+
+        lag = np.minimum(index, last)
+        lag_clear = (index >= end) | (rear[rows] - front[lag] >= width[lag] * 2.0)
+
+        accepted |= (
+            (target >= 0) & (target < lane_count) & lag_clear
+            & (lead_gap >= width[rows] * 2.0) & (lead_gap >= gap[rows] + advantage)
+        )
+
+    return front, rear, rows[accepted]
+
+def step_vehicles(store, lane_rows, traffic_light_state, delta_time):
+    """Paso completo por lotes: reglas de trafico, integracion y proyeccion"""
+    lane_order = build_lane_order(store, lane_rows)
+    apply_traffic_rules(store, lane_order, traffic_light_state)
+    store.integrate(delta_time)
+    project_lanes(store, lane_order)
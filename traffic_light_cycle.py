@@ -0,0 +1,158 @@
+class TrafficLightCycle:
+    """Maquina de estados del semaforo, independiente de tkinter.
+
+    Sin controlador, la duracion de cada verde la calcula el contador al
+    terminar la transicion (calculate_next_duration). Con un controlador
+    (ver signal_controllers), al vencer el verde el controlador decide si se
+    extiende o si se pasa a la otra fase, y con que duracion.
+    """
+
+    def __init__(self, traffic_counter=None, initial_duration=10.0, transition_duration=3.0):
+        self.traffic_counter = traffic_counter
+
+        self.initial_duration = initial_duration
+        self.transition_duration = transition_duration
+
+        self.state = "left_go"
+        self.previous_green_state = "left_go"
+        self.timer = 0
+        self.duration = initial_duration
+        self.is_transitioning = False
+        self.transition_timer = 0
+
+        # Segundos desde el ultimo reinicio, para que los controladores midan flujos
+        self.time = 0.0
+
+        self.controller = None
+        self.next_duration = initial_duration
+
+        self.state_listeners = []
+
+        self.debug_enabled = False
+
+    def add_state_listener(self, callback):
+        if callback not in self.state_listeners:
+            self.state_listeners.append(callback)
+
+    def remove_state_listener(self, callback):
+        if callback in self.state_listeners:
+            self.state_listeners.remove(callback)
+
+    def notify_state_listeners(self):
+        for callback in self.state_listeners:
+            callback(self.state)
+
+    def set_controller(self, controller):
+        """controller: objeto con decide(phase, elapsed, stats), o None para
+        volver a la regla de congestion del contador"""
+        self.controller = controller
+
+    def get_signal_stats(self):
+        if self.traffic_counter is None:
+            return None
+        return self.traffic_counter.get_signal_stats(self.time)
+
+    def reset(self, notify=True):
+        self.state = "left_go"
+        self.previous_green_state = "left_go"
+        self.timer = 0
+        self.duration = self.initial_duration
+        self.is_transitioning = False
+        self.transition_timer = 0
+        self.time = 0.0
+
+        if notify:
+            self.notify_state_listeners()
+
+    def update(self, delta_time):
+        self.time += delta_time
+
+        if self.is_transitioning:
+            self.transition_timer += delta_time
+
+            if self.transition_timer >= self.transition_duration:
+                self.complete_transition()
+        else:
+            self.timer += delta_time
+
+            if self.timer >= self.duration:
+                if self.controller is not None:
+                    self.apply_controller_decision()
+                else:
+                    self.start_transition()
+
+    def apply_controller_decision(self):
+        phase, duration = self.controller.decide(self.state, self.timer, self.get_signal_stats())
+
+        if phase == self.state:
+            self.duration = self.timer + duration
+            if self.debug_enabled:
+                print(f"DEBUG: Verde de {self.state} extendido {duration}s")
+            return
+
+        self.next_duration = duration
+        self.start_transition()
+
+    def start_transition(self):
+        if self.debug_enabled:
+            print("DEBUG: Iniciando transicion de semaforo")
+
+        self.is_transitioning = True
+        self.transition_timer = 0
+
+        self.previous_green_state = self.state
+        self.state = "caution"
+
+        self.notify_state_listeners()
+
+    def complete_transition(self):
+        if self.debug_enabled:
+            print("DEBUG: Completando transicion de semaforo")
+
+        self.is_transitioning = False
+        self.transition_timer = 0
+
+        if self.previous_green_state == 'left_go':
+            self.state = 'right_go'
+        else:
+            self.state = 'left_go'
+
+        if self.debug_enabled:
+            print(f"DEBUG: Cambio de {self.previous_green_state} -> {self.state}")
+
+        if self.controller is not None:
+            self.duration = self.next_duration
+            if self.debug_enabled:
+                print(f"DEBUG: Duracion del controlador para {self.state}: {self.duration}s")
+        elif self.traffic_counter:
+            self.duration = self.traffic_counter.calculate_next_duration(
+                self.previous_green_state,
+                self.state
+            )
+            if self.debug_enabled:
+                print(f"DEBUG: Duracion calculada para {self.state}: {self.duration}s")
+
+        self.timer = 0
+
+        self.notify_state_listeners()
+
+    def get_state(self):
+        return self.state
+
+    def get_duration(self):
+        return self.duration
+
+    def get_remaining_time(self):
+        return max(0.0, self.duration - self.timer)
+
+    def get_time_to_next_change(self):
+        """Segundos hasta el proximo cambio de estado si no cambian las duraciones"""
+        if self.is_transitioning:
+            return max(0.0, self.transition_duration - self.transition_timer)
+        return max(0.0, self.duration - self.timer)
+
+    def get_transition_second(self):
+        return int(self.transition_timer) + 1
+
+    def enable_debug(self, enabled=True):
+        self.debug_enabled = enabled
@@ -0,0 +1,453 @@
+import copy
+import random
+from collections import deque
+from simulation_vehicles import (
+    SimulationVehiclePool, LANE_NAMES, LANE_INDEX, LANE_AXIS, build_lane_geometry, project_lane
+)
+from simulation_counter import SimulationCounter
+from traffic_light_cycle import TrafficLightCycle
+from demand_scheduler import DemandScheduler, HeadwayProfile
+from occupancy_grid import OccupancyGrid
+
+class Junction:
+    """Interseccion de la red con su propio semaforo y contador"""
+
+    def __init__(self, row, col, center_x, center_y, road_width=100, debug=False):
+        self.row = row
+        self.col = col
+        self.center_x = center_x
+        self.center_y = center_y
+        self.road_width = road_width
+
+        self.intersection_bounds = {
+            'left': center_x - road_width // 2,
+            'right': center_x + road_width // 2,
+            'top': center_y - road_width // 2,
+            'bottom': center_y + road_width // 2
+        }
+
+        # El contador usa un area centrada en la interseccion
+        self.traffic_counter = SimulationCounter(
+            center_x - road_width, center_y - road_width, road_width * 2, road_width * 2
+        )
+        self.traffic_counter.enable_debug(debug)
+
+        # Vehiculos de los tramos que llegan a esta interseccion que ocupan la caja
+        self.occupancy = OccupancyGrid(self.intersection_bounds, lane_count=len(LANE_NAMES))
+        self.traffic_counter.set_occupancy(self.occupancy)
+
+        # El semaforo consulta a la interseccion, que actualiza el contador
+        # solo cuando hace falta calcular la siguiente duracion
+        self.traffic_lights = TrafficLightCycle(self)
+        self.traffic_lights.enable_debug(debug)
+        self.traffic_lights.add_state_listener(self.set_traffic_light_state)
+
+        self.traffic_light_state = self.traffic_lights.get_state()
+        self.approach_queues = []
+
+        # Tramo de salida de cada acceso (por lane_index) hacia la siguiente
+        # interseccion; None si el acceso no pasa por aqui o sale del area
+        self.exit_queues = [None] * len(LANE_NAMES)
+
+    def set_traffic_light_state(self, state):
+        self.traffic_light_state = state
+
+    def get_approach_vehicles(self):
+        return [vehicle for queue in self.approach_queues for vehicle in queue]
+
+    def is_clear(self):
+        return self.occupancy.is_clear()
+
+    def get_blocked_approaches(self):
+        return [LANE_NAMES[lane_index] for lane_index in self.occupancy.get_blocked_approaches()]
+
+    def calculate_next_duration(self, current_state, next_state):
+        self.traffic_counter.update(self.get_approach_vehicles())
+        return self.traffic_counter.calculate_next_duration(current_state, next_state)
+
+    def get_signal_stats(self, time):
+        self.traffic_counter.update(self.get_approach_vehicles())
+        downstream = tuple(len(queue) if queue is not None else 0 for queue in self.exit_queues)
+        return self.traffic_counter.get_signal_stats(time, downstream)
+
+
+class Corridor:
+    """Carril recto que atraviesa una fila o columna completa de la red.
+
+    queues[k] contiene, en orden de avance, los vehiculos cuya siguiente
+    interseccion es junctions[k]; el ultimo elemento es el tramo de salida.
+    """
+
+    def __init__(self, lane, direction, lane_position, junctions):
+        self.lane = lane
+        self.direction = direction
+        self.lane_position = lane_position
+        self.junctions = junctions
+
+        self.queues = [deque() for _ in range(len(junctions) + 1)]
+        lane_index = LANE_INDEX[lane]
+        for segment, junction in enumerate(junctions):
+            junction.approach_queues.append(self.queues[segment])
+            if segment + 1 < len(junctions):
+                junction.exit_queues[lane_index] = self.queues[segment + 1]
+            junction.occupancy.set_approach_path(
+                lane_index, LANE_AXIS[lane_index],
+                lane_position - junction.road_width // 4, lane_position + junction.road_width // 4
+            )
+
+    def get_bounds(self, segment):
+        if segment < len(self.junctions):
+            return self.junctions[segment].intersection_bounds
+        return None
+
+    def get_tail_vehicle(self):
+        for queue in self.queues:
+            if queue:
+                return queue[-1]
+        return None
+
+    def count(self):
+        return sum(len(queue) for queue in self.queues)
+
+
+class TrafficNetwork:
+    """Red de N x M intersecciones unidas por tramos de calle.
+
+    Cada fila tiene un carril hacia la derecha y otro hacia la izquierda, y
+    cada columna uno hacia abajo y otro hacia arriba, igual que la
+    interseccion unica. Los vehiculos siguen recto y pasan de un tramo al
+    siguiente cuando dejan atras una interseccion; cada interseccion tiene
+    su propio TrafficLightCycle. La actualizacion recorre cada vehiculo una
+    vez por paso, asi que el costo crece linealmente con los vehiculos.
+
+    Expone la misma interfaz de vehiculos que SimulationVehicleManager
+    (update, integrate, get_vehicles, count_stopped_vehicles, clear_all).
+    """
+
+    def __init__(self, rows, cols, sim_area_x=0, sim_area_y=0, block_length=300,
+                 road_width=100, debug=False):
+        self.rows = rows
+        self.cols = cols
+        self.block_length = block_length
+        self.road_width = road_width
+
+        margin = block_length // 2
+        self.sim_area_x = sim_area_x
+        self.sim_area_y = sim_area_y
+        self.sim_area_width = (cols - 1) * block_length + 2 * margin
+        self.sim_area_height = (rows - 1) * block_length + 2 * margin
+
+        self.junctions = []
+        self.junction_grid = []
+        for row in range(rows):
+            grid_row = []
+            for col in range(cols):
+                junction = Junction(
+                    row, col,
+                    sim_area_x + margin + col * block_length,
+                    sim_area_y + margin + row * block_length,
+                    road_width, debug
+                )
+                grid_row.append(junction)
+                self.junctions.append(junction)
+            self.junction_grid.append(grid_row)
+
+        self.corridors = []
+        for row in range(rows):
+            junctions = self.junction_grid[row]
+            center_y = junctions[0].center_y
+            self.corridors.append(Corridor('horizontal_bottom', 1, center_y + road_width // 4, junctions))
+            self.corridors.append(Corridor('horizontal_top', -1, center_y - road_width // 4, junctions[::-1]))
+
+        for col in range(cols):
+            junctions = [self.junction_grid[row][col] for row in range(rows)]
+            center_x = junctions[0].center_x
+            self.corridors.append(Corridor('vertical_left', 1, center_x - road_width // 4, junctions))
+            self.corridors.append(Corridor('vertical_right', -1, center_x + road_width // 4, junctions[::-1]))
+
+        self.clip_bounds = {
+            'left': sim_area_x,
+            'right': sim_area_x + self.sim_area_width,
+            'top': sim_area_y,
+            'bottom': sim_area_y + self.sim_area_height
+        }
+
+        # (progreso de aparicion, progreso de salida del area) por lane_index
+        self.lane_geometry = build_lane_geometry(self.clip_bounds)
+
+        self.vehicle_types = [
+            'compact', 'sedan', 'suv', 'coupe', 'van',
+            'pickup', 'bus', 'truck', 'semi', 'motorcycle'
+        ]
+
+        self.spawn_interval = 2.0
+        self.spawn_retry_delay = 0.25
+        self.min_spawn_gap = 250
+        self.max_vehicles_per_segment = 5
+
+        self.vehicle_pool = SimulationVehiclePool()
+
+        self.spawn_rng = random
+        self.vehicle_rng = random
+        self.demand_rng = random
+
+        self.demand_time = 0.0
+        self.demand_scheduler = None
+        self.set_spawn_interval(self.spawn_interval)
+
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        self.lane_changes = 0
+        self.queued_vehicles = 0
+        self.stopped_vehicles = 0
+        self.stopped_speed_threshold = 1.0
+
+    def set_random_streams(self, random_streams):
+        if random_streams is None:
+            self.spawn_rng = random
+            self.vehicle_rng = random
+            self.demand_rng = random
+        else:
+            self.spawn_rng = random_streams.spawn
+            self.vehicle_rng = random_streams.vehicle
+            self.demand_rng = random_streams.demand
+
+        self.demand_scheduler.rng = self.demand_rng
+        self.demand_scheduler.reset(self.demand_time)
+
+    def set_spawn_interval(self, spawn_interval):
+        self.spawn_interval = spawn_interval
+        self.set_demand_profiles(
+            {index: HeadwayProfile(spawn_interval) for index in range(len(self.corridors))},
+            max_backlog=1
+        )
+
+    def set_demand_profiles(self, profiles, max_backlog=None):
+        """profiles: perfil de llegadas por indice de corredor en self.corridors"""
+        self.demand_scheduler = DemandScheduler(profiles, rng=self.demand_rng, max_backlog=max_backlog,
+                                               time=self.demand_time)
+
+    def process_demand(self):
+        scheduler = self.demand_scheduler
+
+        for index in scheduler.pop_due(self.demand_time):
+            if not scheduler.has_backlog(index):
+                continue
+
+            corridor = self.corridors[index]
+            if corridor.count() < self.max_vehicles_per_segment * len(corridor.queues):
+                if self.spawn_vehicle(corridor):
+                    scheduler.consume(index)
+                    if not scheduler.has_backlog(index):
+                        continue
+
+            scheduler.retry(index, self.demand_time + self.spawn_retry_delay)
+
+    def get_junction(self, row, col):
+        return self.junction_grid[row][col]
+
+    def add_state_listener(self, callback):
+        for junction in self.junctions:
+            junction.traffic_lights.add_state_listener(callback)
+
+    def reset_traffic_lights(self, notify=True):
+        for junction in self.junctions:
+            junction.traffic_lights.reset(notify)
+            junction.set_traffic_light_state(junction.traffic_lights.get_state())
+
+    def set_traffic_light_duration(self, duration, running=False):
+        for junction in self.junctions:
+            junction.traffic_lights.initial_duration = duration
+            if not running:
+                junction.traffic_lights.duration = duration
+
+    def set_duration_range(self, min_duration, max_duration):
+        for junction in self.junctions:
+            junction.traffic_counter.set_duration_range(min_duration, max_duration)
+
+    def set_congestion_thresholds(self, count_threshold, length_threshold):
+        for junction in self.junctions:
+            junction.traffic_counter.set_congestion_thresholds(count_threshold, length_threshold)
+
+    def set_signal_controller(self, controller):
+        """Una copia del controlador por interseccion, ya que algunos guardan estado"""
+        for junction in self.junctions:
+            junction.traffic_lights.set_controller(copy.deepcopy(controller))
+
+    def get_traffic_light_states(self):
+        return [[junction.traffic_light_state for junction in grid_row] for grid_row in self.junction_grid]
+
+    def update_traffic_lights(self, delta_time):
+        for junction in self.junctions:
+            junction.traffic_lights.update(delta_time)
+
+    def update(self, delta_time):
+        self.queued_vehicles = 0
+
+        if self.demand_scheduler.get_next_time() <= self.demand_time:
+            self.process_demand()
+        self.demand_time += delta_time
+
+        for corridor in self.corridors:
+            self.hand_over_vehicles(corridor)
+            self.update_corridor(corridor)
+
+    def hand_over_vehicles(self, corridor):
+        """Pasar al tramo siguiente los vehiculos que dejaron atras su interseccion"""
+        queues = corridor.queues
+        last = len(queues) - 1
+
+        exit_queue = queues[last]
+        while exit_queue and self.is_vehicle_completely_out_of_bounds(exit_queue[0]):
+            self.remove_vehicle(exit_queue.popleft())
+            self.vehicles_exited += 1
+
+        # De adelante hacia atras, para que un vehiculo avance a lo sumo un tramo por paso
+        for segment in range(last - 1, -1, -1):
+            queue = queues[segment]
+            while queue and queue[0].is_completely_past_intersection():
+                vehicle = queue.popleft()
+                corridor.junctions[segment].occupancy.remove(vehicle)
+                vehicle.set_intersection_bounds(corridor.get_bounds(segment + 1))
+                vehicle.has_crossed_intersection = False
+                queues[segment + 1].append(vehicle)
+                if segment + 1 < last:
+                    corridor.junctions[segment + 1].traffic_counter.record_arrival(vehicle.lane_index)
+
+    def update_corridor(self, corridor, vehicle_ahead=None):
+        """Misma logica que SimulationVehicleManager.update_lane, encadenando el
+        vehiculo de adelante a traves de los tramos del corredor. vehicle_ahead
+        es el lider que esta mas alla del ultimo tramo (si lo simula otro proceso)"""
+        queues = corridor.queues
+
+        for segment in range(len(queues) - 1, -1, -1):
+            queue = queues[segment]
+            if not queue:
+                continue
+
+            if segment < len(corridor.junctions):
+                traffic_light_state = corridor.junctions[segment].traffic_light_state
+            else:
+                traffic_light_state = 'off'
+
+            lead_vehicle = None
+            for vehicle in queue:
+                if vehicle.has_crossed_any_border():
+                    continue
+                distance = vehicle.get_distance_to_intersection()
+                if distance is not None and distance >= 0:
+                    lead_vehicle = vehicle
+                break
+
+            for vehicle in queue:
+                vehicle.leader = vehicle_ahead
+                vehicle.follower = None
+                if vehicle_ahead is not None:
+                    vehicle_ahead.follower = vehicle
+
+                distance_ahead = vehicle.get_gap_to(vehicle_ahead) if vehicle_ahead else None
+
+                vehicle.adjust_speed_for_traffic_light(
+                    traffic_light_state,
+                    is_lead_vehicle=(vehicle is lead_vehicle),
+                    vehicle_ahead=vehicle_ahead
+                )
+
+                vehicle.adjust_speed_for_traffic(distance_ahead, vehicle_ahead)
+
+                if vehicle.intersection_bounds and not vehicle.has_crossed_intersection:
+                    self.queued_vehicles += 1
+
+                vehicle_ahead = vehicle
+
+    def integrate(self, delta_time):
+        stopped = 0
+        threshold = self.stopped_speed_threshold
+
+        for index, corridor in enumerate(self.corridors):
+            self.project_corridor(corridor, self.get_corridor_leader(index), delta_time)
+
+            for junction, queue in zip(corridor.junctions, corridor.queues):
+                junction.occupancy.update_lane(queue)
+
+            for queue in corridor.queues:
+                for vehicle in queue:
+                    if vehicle.current_speed < threshold:
+                        stopped += 1
+
+        self.stopped_vehicles = stopped
+
+    def get_corridor_leader(self, index):
+        """Lider que esta mas alla del ultimo tramo del corredor (ninguno en una red completa)"""
+        return None
+
+    def project_corridor(self, corridor, vehicle_ahead=None, delta_time=None):
+        """project_lane encadenado a traves de los tramos del corredor"""
+        for queue in reversed(corridor.queues):
+            vehicle_ahead = project_lane(queue, vehicle_ahead, delta_time)
+
+    def count_stopped_vehicles(self, speed_threshold):
+        if speed_threshold == self.stopped_speed_threshold:
+            return self.stopped_vehicles
+
+        return sum(1 for vehicle in self.get_vehicles() if vehicle.current_speed < speed_threshold)
+
+    def count_queued_vehicles(self):
+        return self.queued_vehicles
+
+    def is_vehicle_completely_out_of_bounds(self, vehicle):
+        return vehicle.get_rear_progress() > self.lane_geometry[vehicle.lane_index][1]
+
+    def spawn_vehicle(self, corridor):
+        vehicle_type = self.spawn_rng.choice(self.vehicle_types)
+        lane = corridor.lane
+
+        vehicle = self.vehicle_pool.acquire(vehicle_type, lane, corridor.direction, rng=self.vehicle_rng)
+        vehicle.set_intersection_bounds(corridor.get_bounds(0))
+        vehicle.place_on_lane(self.lane_geometry[vehicle.lane_index][0], corridor.lane_position)
+
+        # El vehiculo nuevo entra detras del ultimo del corredor
+        tail_vehicle = corridor.get_tail_vehicle()
+        if tail_vehicle is not None and vehicle.get_gap_to(tail_vehicle) < self.min_spawn_gap:
+            self.vehicle_pool.release(vehicle)
+            return None
+
+        vehicle.original_x = vehicle.x
+        vehicle.original_y = vehicle.y
+        vehicle.activate()
+        vehicle.show()
+        vehicle.set_clip_bounds(self.clip_bounds)
+
+        corridor.queues[0].append(vehicle)
+        corridor.junctions[0].traffic_counter.record_arrival(vehicle.lane_index)
+        vehicle.vehicle_id = self.vehicles_spawned
+        self.vehicles_spawned += 1
+
+        return vehicle
+
+    def remove_vehicle(self, vehicle):
+        self.vehicle_pool.release(vehicle)
+
+    def get_vehicles(self):
+        return [vehicle for corridor in self.corridors for queue in corridor.queues for vehicle in queue]
+
+    def clear_all(self):
+        for corridor in self.corridors:
+            for queue in corridor.queues:
+                for vehicle in queue:
+                    vehicle.deactivate()
+                queue.clear()
+
+        for junction in self.junctions:
+            junction.occupancy.clear()
+            junction.traffic_counter.clear()
+
+        self.vehicle_pool.clear()
+
+        self.demand_time = 0.0
+        self.demand_scheduler.reset(self.demand_time)
+
+        self.vehicles_spawned = 0
+        self.vehicles_exited = 0
+        self.queued_vehicles = 0
+        self.stopped_vehicles = 0
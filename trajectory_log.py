@@ -0,0 +1,495 @@
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from operator import attrgetter
+from simulation_vehicles import SimulationVehicle
+from simulation_snapshot import (
+    VEHICLE_TYPE_INDEX, PALETTE_INDEX, BODY_COLOR_INDEX,
+    LIGHT_STATES, LIGHT_STATE_INDEX, KIND_INTERSECTION, KIND_NETWORK,
+    get_traffic_light_cycles
+)
+from vehicle_store import (
+    FLAG_ACTIVE, FLAG_VISIBLE, FLAG_EMERGENCY_BRAKE,
+    FLAG_CROSSED_INTERSECTION, FLAG_COLLISION_LOCK
+)
+
+MAGIC = b'SIMT'
+VERSION = 2
+INDEX_MAGIC = b'SIDX'
+
+# Posiciones y velocidades se guardan como enteros en decimas de pixel
+POSITION_SCALE = 10.0
+
+HEADER = struct.Struct('<4sBBBHdI')
+CHUNK = struct.Struct('<IQI')
+INDEX_FOOTER = struct.Struct('<QQ4s')
+
+# Campos de cada vehiculo en un cuadro decodificado
+VEHICLE_ID, LANE_INDEX, SUB_LANE, DIRECTION, TYPE_INDEX, PALETTE, BODY_COLOR, X, Y, SPEED, FLAGS = range(11)
+
+
+# Lo que se copia de cada vehiculo en cada paso; la conversion a enteros
+# y la codificacion se hacen en el hilo de escritura
+get_record_fields = attrgetter(
+    'vehicle_id', 'lane_index', 'sub_lane', 'x', 'y', 'current_speed',
+    'active', 'visible', 'emergency_brake_active', 'has_crossed_intersection', 'collision_lock_active',
+    'direction_num', 'vehicle_type', 'vehicle_colors', 'vehicle_color'
+)
+
+
+def write_varint(out, value):
+    """Entero sin signo en grupos de 7 bits (LEB128)"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_signed(out, value):
+    # Zigzag: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...
+    write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+def read_varint(data, offset):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def read_signed(data, offset):
+    value, offset = read_varint(data, offset)
+    return (value >> 1) ^ -(value & 1), offset
+
+
+def get_light_states(engine):
+    return tuple(LIGHT_STATE_INDEX[cycle.state] for cycle in get_traffic_light_cycles(engine))
+
+
+def encode_chunk(frames):
+    """Codificar una lista de cuadros (luces, filas de get_record_fields).
+
+    Cada bloque es independiente: el primer cuadro trae todas las luces y
+    todos los vehiculos con sus valores absolutos, y los siguientes solo
+    los cambios de luces y las diferencias contra el cuadro anterior.
+    """
+    out = bytearray()
+    previous_rows = {}
+    previous_lights = None
+
+    for lights, rows in frames:
+        changes = [
+            (index, state) for index, state in enumerate(lights)
+            if previous_lights is None or previous_lights[index] != state
+        ]
+        write_varint(out, len(changes))
+        for index, state in changes:
+            write_varint(out, index)
+            write_varint(out, state)
+        previous_lights = lights
+
+        write_varint(out, len(rows))
+        last_id = 0
+        current_rows = {}
+        for (vehicle_id, lane_index, sub_lane, x, y, speed, active, visible, braking, crossed, locked,
+             direction, vehicle_type, vehicle_colors, vehicle_color) in rows:
+            lane_code = lane_index << 2 | sub_lane
+            x = int(round(x * POSITION_SCALE))
+            y = int(round(y * POSITION_SCALE))
+            speed = int(round(speed * POSITION_SCALE))
+
+            write_signed(out, vehicle_id - last_id)
+            last_id = vehicle_id
+
+            previous = previous_rows.get(vehicle_id)
+            if previous is None:
+                # Vehiculo nuevo en el bloque: atributos fijos y valores absolutos
+                write_signed(out, direction)
+                write_varint(out, VEHICLE_TYPE_INDEX[vehicle_type])
+                write_varint(out, PALETTE_INDEX[id(vehicle_colors)])
+                write_varint(out, BODY_COLOR_INDEX[vehicle_color])
+                write_varint(out, lane_code)
+                write_signed(out, x)
+                write_signed(out, y)
+                write_signed(out, speed)
+            else:
+                write_signed(out, lane_code - previous[0])
+                write_signed(out, x - previous[1])
+                write_signed(out, y - previous[2])
+                write_signed(out, speed - previous[3])
+            write_varint(out, (active and FLAG_ACTIVE) | (visible and FLAG_VISIBLE)
+                         | (braking and FLAG_EMERGENCY_BRAKE) | (crossed and FLAG_CROSSED_INTERSECTION)
+                         | (locked and FLAG_COLLISION_LOCK))
+
+            current_rows[vehicle_id] = (lane_code, x, y, speed)
+        previous_rows = current_rows
+
+    return zlib.compress(bytes(out), 6)
+
+
+def decode_chunk(payload, light_count):
+    """Generador de (luces, filas) con los valores de un bloque ya escalados"""
+    data = zlib.decompress(payload)
+    offset = 0
+    end = len(data)
+
+    lights = ['off'] * light_count
+    previous_rows = {}
+
+    while offset < end:
+        change_count, offset = read_varint(data, offset)
+        for _ in range(change_count):
+            index, offset = read_varint(data, offset)
+            state, offset = read_varint(data, offset)
+            lights[index] = LIGHT_STATES[state]
+
+        vehicle_count, offset = read_varint(data, offset)
+        vehicle_id = 0
+        current_rows = {}
+        for _ in range(vehicle_count):
+            id_delta, offset = read_signed(data, offset)
+            vehicle_id += id_delta
+
+            previous = previous_rows.get(vehicle_id)
+            if previous is None:
+                direction, offset = read_signed(data, offset)
+                type_index, offset = read_varint(data, offset)
+                palette, offset = read_varint(data, offset)
+                body_color, offset = read_varint(data, offset)
+                lane_code, offset = read_varint(data, offset)
+                x, offset = read_signed(data, offset)
+                y, offset = read_signed(data, offset)
+                speed, offset = read_signed(data, offset)
+                static = (direction, type_index, palette, body_color)
+            else:
+                static, lane_code, x, y, speed, _ = previous
+                delta, offset = read_signed(data, offset)
+                lane_code += delta
+                delta, offset = read_signed(data, offset)
+                x += delta
+                delta, offset = read_signed(data, offset)
+                y += delta
+                delta, offset = read_signed(data, offset)
+                speed += delta
+            flags, offset = read_varint(data, offset)
+
+            current_rows[vehicle_id] = (static, lane_code, x, y, speed, flags)
+        previous_rows = current_rows
+
+        yield tuple(lights), [
+            (vehicle_id, lane_code >> 2, lane_code & 3, static[0], static[1], static[2], static[3],
+             x / POSITION_SCALE, y / POSITION_SCALE, speed / POSITION_SCALE, flags)
+            for vehicle_id, (static, lane_code, x, y, speed, flags) in current_rows.items()
+        ]
+
+
+class TrajectoryRecorder:
+    """Registro de trayectorias de solo agregado.
+
+    record(engine) se llama despues de cada paso y solo copia el estado de
+    los vehiculos (id, carril, x, y, velocidad, banderas) y de los
+    semaforos. Cada keyframe_interval pasos el bloque se entrega a un hilo
+    que lo codifica por diferencias con varints, lo comprime y lo agrega
+    al archivo.
+
+    Formato: HEADER, bloques [CHUNK][datos zlib] y, al cerrar, un indice
+    disperso (primer tick y offset de cada bloque) con INDEX_FOOTER al
+    final. Cada bloque empieza con un cuadro clave, asi que se decodifica
+    sin leer los anteriores. Un archivo sin indice (corrida cortada) se
+    lee hasta el ultimo bloque completo.
+    """
+
+    def __init__(self, path, engine, keyframe_interval=600, max_pending_chunks=8):
+        self.path = path
+        self.keyframe_interval = max(1, keyframe_interval)
+
+        kind = KIND_NETWORK if engine.network is not None else KIND_INTERSECTION
+        lanes_per_approach = getattr(engine.vehicle_manager, 'lanes_per_approach', 1)
+        self.light_count = len(get_traffic_light_cycles(engine))
+
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, kind, lanes_per_approach, self.light_count,
+                                    engine.clock.step, self.keyframe_interval))
+
+        self.frames = []
+        self.first_tick = None
+
+        self.ticks_recorded = 0
+        self.chunks_written = 0
+        self.bytes_written = HEADER.size
+
+        self.index_ticks = array('Q')
+        self.index_offsets = array('Q')
+
+        self.error = None
+        self.pending = queue.Queue(max_pending_chunks)
+        self.writer_thread = threading.Thread(target=self.write_chunks, name="trajectory-writer", daemon=True)
+        self.writer_thread.start()
+
+    def record(self, engine):
+        if self.first_tick is None:
+            self.first_tick = engine.tick_count
+
+        self.frames.append((get_light_states(engine), list(map(get_record_fields, engine.get_vehicles()))))
+        self.ticks_recorded += 1
+
+        if len(self.frames) >= self.keyframe_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.frames:
+            return
+
+        self.pending.put((self.first_tick, self.frames))
+        self.frames = []
+        self.first_tick = None
+
+    def write_chunks(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+
+            first_tick, frames = item
+            try:
+                payload = encode_chunk(frames)
+                self.file.write(CHUNK.pack(len(payload), first_tick, len(frames)))
+                self.file.write(payload)
+                self.file.flush()
+            except Exception as error:
+                self.error = error
+                continue
+
+            self.index_ticks.append(first_tick)
+            self.index_offsets.append(self.bytes_written)
+
+            self.chunks_written += 1
+            self.bytes_written += CHUNK.size + len(payload)
+
+    def write_index(self):
+        self.file.write(self.index_ticks.tobytes())
+        self.file.write(self.index_offsets.tobytes())
+        self.file.write(INDEX_FOOTER.pack(self.bytes_written, len(self.index_ticks), INDEX_MAGIC))
+
+    def close(self):
+        if self.file is None:
+            return
+
+        self.flush()
+        self.pending.put(None)
+        self.writer_thread.join()
+
+        if self.error is None:
+            self.write_index()
+
+        self.file.close()
+        self.file = None
+
+        if self.error is not None:
+            raise IOError(f"No se pudo escribir el registro de trayectorias: {self.error}")
+
+
+class TrajectoryFrame:
+    __slots__ = ('tick', 'light_states', 'vehicles')
+
+    def __init__(self, tick, light_states, vehicles):
+        self.tick = tick
+        self.light_states = light_states
+        self.vehicles = vehicles
+
+
+class TrajectoryPlayer:
+    """Lectura de un registro de TrajectoryRecorder sin volver a simular.
+
+    El archivo se mapea en memoria y solo se descomprimen los bloques que
+    se leen. get_frame(tick) busca el bloque en el indice disperso en
+    O(log n) y decodifica desde su cuadro clave; los ultimos bloques
+    decodificados se guardan (cache_chunks) para recorrer hacia atras sin
+    repetir el trabajo. Cada cuadro trae el estado de los semaforos y una
+    tupla por vehiculo con los campos VEHICLE_ID ... FLAGS.
+    """
+
+    def __init__(self, path, cache_chunks=2):
+        self.path = path
+        self.cache_chunks = max(1, cache_chunks)
+        self.decoded_chunks = OrderedDict()
+
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError("Registro de trayectorias invalido")
+
+        if len(self.data) < HEADER.size:
+            self.close()
+            raise ValueError("Registro de trayectorias invalido")
+
+        (magic, version, self.kind, self.lanes_per_approach, self.light_count,
+         self.fixed_step, self.keyframe_interval) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Registro de trayectorias invalido o de otra version")
+
+        self.index_ticks, self.index_offsets = self.read_index()
+
+    def read_index(self):
+        data = self.data
+        size = len(data)
+
+        if size >= HEADER.size + INDEX_FOOTER.size:
+            index_offset, count, magic = INDEX_FOOTER.unpack_from(data, size - INDEX_FOOTER.size)
+            if magic == INDEX_MAGIC and index_offset + 16 * count + INDEX_FOOTER.size == size:
+                ticks = array('Q')
+                ticks.frombytes(data[index_offset:index_offset + 8 * count])
+                offsets = array('Q')
+                offsets.frombytes(data[index_offset + 8 * count:index_offset + 16 * count])
+                return ticks, offsets
+
+        # Sin indice: recorrer las cabeceras de los bloques completos
+        ticks = array('Q')
+        offsets = array('Q')
+        offset = HEADER.size
+        while offset + CHUNK.size <= size:
+            payload_size, first_tick, _ = CHUNK.unpack_from(data, offset)
+            if offset + CHUNK.size + payload_size > size:
+                break
+            ticks.append(first_tick)
+            offsets.append(offset)
+            offset += CHUNK.size + payload_size
+        return ticks, offsets
+
+    def close(self):
+        self.decoded_chunks.clear()
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def get_chunk_count(self):
+        return len(self.index_ticks)
+
+    def get_chunk(self, chunk_index):
+        """(primer tick, ticks, datos comprimidos) de un bloque"""
+        offset = self.index_offsets[chunk_index]
+        payload_size, first_tick, tick_count = CHUNK.unpack_from(self.data, offset)
+        start = offset + CHUNK.size
+        # Copia solo el bloque comprimido; el resto del archivo sigue en disco
+        return first_tick, tick_count, self.data[start:start + payload_size]
+
+    def chunks(self):
+        for chunk_index in range(len(self.index_ticks)):
+            yield self.get_chunk(chunk_index)
+
+    def get_first_tick(self):
+        return self.index_ticks[0] if self.index_ticks else None
+
+    def get_last_tick(self):
+        if not self.index_ticks:
+            return None
+        first_tick, tick_count, _ = self.get_chunk(len(self.index_ticks) - 1)
+        return first_tick + tick_count - 1
+
+    def get_tick_count(self):
+        return sum(tick_count for _, tick_count, _ in self.chunks())
+
+    def find_chunk(self, tick):
+        """Indice del bloque que contiene tick, o None si queda fuera del registro"""
+        chunk_index = bisect_right(self.index_ticks, tick) - 1
+        if chunk_index < 0:
+            return None
+
+        first_tick, tick_count, _ = self.get_chunk(chunk_index)
+        if tick >= first_tick + tick_count:
+            return None
+        return chunk_index
+
+    def decode_frames(self, chunk_index):
+        first_tick, _, payload = self.get_chunk(chunk_index)
+        tick = first_tick
+        for light_states, vehicles in decode_chunk(payload, self.light_count):
+            yield TrajectoryFrame(tick, light_states, vehicles)
+            tick += 1
+
+    def get_frame(self, tick):
+        chunk_index = self.find_chunk(tick)
+        if chunk_index is None:
+            raise IndexError(f"El tick {tick} no esta en el registro")
+
+        frames = self.decoded_chunks.get(chunk_index)
+        if frames is None:
+            frames = list(self.decode_frames(chunk_index))
+            self.decoded_chunks[chunk_index] = frames
+            if len(self.decoded_chunks) > self.cache_chunks:
+                self.decoded_chunks.popitem(last=False)
+        else:
+            self.decoded_chunks.move_to_end(chunk_index)
+
+        return frames[tick - frames[0].tick]
+
+    def frames(self, start_tick=None):
+        """Generador de cuadros desde start_tick (o desde el principio)"""
+        first_chunk = 0
+        if start_tick is not None:
+            first_chunk = self.find_chunk(start_tick)
+            if first_chunk is None:
+                if self.index_ticks and start_tick < self.index_ticks[0]:
+                    first_chunk = 0
+                else:
+                    return
+
+        for chunk_index in range(first_chunk, len(self.index_ticks)):
+            for frame in self.decode_frames(chunk_index):
+                if start_tick is None or frame.tick >= start_tick:
+                    yield frame
+
+
+def get_vehicle_colors(frame_vehicle):
+    """Paleta y color de carroceria de un vehiculo de un cuadro"""
+    return (SimulationVehicle.COLOR_PALETTES[frame_vehicle[PALETTE]],
+            SimulationVehicle.BODY_COLORS[frame_vehicle[BODY_COLOR]])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumen de un registro de trayectorias")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    player = TrajectoryPlayer(args.path)
+    chunk_count = player.get_chunk_count()
+
+    frames = 0
+    rows = 0
+    max_vehicles = 0
+    first_tick = None
+    last_tick = None
+    for frame in player.frames():
+        if first_tick is None:
+            first_tick = frame.tick
+        last_tick = frame.tick
+        frames += 1
+        rows += len(frame.vehicles)
+        max_vehicles = max(max_vehicles, len(frame.vehicles))
+
+    player.close()
+
+    size = os.path.getsize(args.path)
+    print(f"Cuadros: {frames} (ticks {first_tick} a {last_tick}), paso {player.fixed_step:.4f}s")
+    print(f"Bloques: {chunk_count}, cuadro clave cada {player.keyframe_interval} ticks")
+    print(f"Semaforos: {player.light_count}, vehiculos maximos por cuadro: {max_vehicles}")
+    print(f"Tamano: {size} bytes ({size / max(rows, 1):.2f} bytes por vehiculo y tick)")
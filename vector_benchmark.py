@@ -0,0 +1,78 @@
+import argparse
+import random
+import time
+from simulation_vehicles import SimulationVehicleManager, LANE_NAMES, LANE_INDEX
+
+SPACING = 120
+
+def build_manager(vehicle_count, lanes_per_approach, vector, seed):
+    """Manejador con vehicle_count vehiculos repartidos en colas separadas
+    SPACING px, en un area lo bastante grande para que ninguno salga"""
+    lane_count = len(LANE_NAMES) * lanes_per_approach
+    per_lane = -(-vehicle_count // lane_count)
+    size = 2 * per_lane * SPACING + 1000
+
+    manager = SimulationVehicleManager(0, 0, size, size, lanes_per_approach)
+    manager.max_vehicles_per_lane = per_lane
+    # Cada vehiculo se reubica al aparecer, asi que no hace falta la brecha
+    manager.check_spawn_collision = lambda *args: True
+    if vector:
+        manager.enable_vector_store(vehicle_count)
+        manager.vector_min_vehicles = 0
+
+    rng = random.Random(seed)
+    manager.spawn_rng = rng
+    manager.vehicle_rng = rng
+
+    spawned = 0
+    for slot in range(per_lane):
+        for lane in LANE_NAMES:
+            for sub_lane in range(lanes_per_approach):
+                if spawned >= vehicle_count:
+                    break
+                vehicle = manager.spawn_vehicle(lane, sub_lane)
+                entry_progress = manager.lane_geometry[LANE_INDEX[lane]][0]
+                vehicle.place_on_lane(entry_progress + (per_lane - slot) * SPACING,
+                                      manager.sub_lane_positions[lane][sub_lane])
+                spawned += 1
+
+    # Mover la flota al store antes de medir
+    manager.update_vector_store()
+    manager.set_traffic_light_state('left_go')
+    return manager
+
+def time_steps(manager, steps, delta_time):
+    # Sin demanda nueva: solo se mide el paso de los vehiculos existentes
+    manager.demand_time = float('-inf')
+    start = time.perf_counter()
+    for _ in range(steps):
+        manager.update(delta_time)
+        manager.integrate(delta_time)
+    return (time.perf_counter() - start) / steps
+
+def run_benchmark(vehicle_count, lanes_per_approach=4, steps=200, delta_time=1.0 / 60.0, seed=1):
+    scalar = build_manager(vehicle_count, lanes_per_approach, False, seed)
+    vector = build_manager(vehicle_count, lanes_per_approach, True, seed)
+
+    scalar_time = time_steps(scalar, steps, delta_time)
+    vector_time = time_steps(vector, steps, delta_time)
+
+    return {
+        'vehicles': len(scalar.get_vehicles()),
+        'scalar_ms': scalar_time * 1000.0,
+        'vector_ms': vector_time * 1000.0,
+        'speedup': scalar_time / vector_time
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costo por paso de la ruta escalar y del VehicleStore")
+    parser.add_argument("--vehicles", type=int, nargs="+", default=[20, 50, 100, 200, 500, 1000, 2400])
+    parser.add_argument("--lanes", type=int, default=4, help="carriles por acceso (1 a 4)")
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'vehiculos':>10} {'escalar ms':>11} {'vector ms':>10} {'aceleracion':>12}")
+    for vehicle_count in args.vehicles:
+        result = run_benchmark(vehicle_count, args.lanes, args.steps)
+        print(f"{result['vehicles']:>10} {result['scalar_ms']:>11.3f} {result['vector_ms']:>10.3f} "
+              f"{result['speedup']:>11.1f}x")
@@ -3,7 +3,14 @@ import math
 from background_element import BackgroundElement
 
 class VehicleElement(BackgroundElement):
-    def __init__(self, vehicle_type, lane, direction):
+    __slots__ = (
+        'rng', 'vehicle_type', 'lane', 'direction', 'base_speed', 'current_speed', 'target_speed',
+        'vehicle_color', 'canvas_items', 'clip_bounds', 'safe_distance', 'deceleration_distance'
+    )
+    
+    def __init__(self, vehicle_type, lane, direction, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.vehicle_type = vehicle_type
         self.lane = lane
         self.direction = direction
@@ -54,7 +61,7 @@ class VehicleElement(BackgroundElement):
     
     def get_random_speed(self):
         speeds = [80, 100, 120, 140, 160]
-        return random.choice(speeds)
+        return self.rng.choice(speeds)
     
     def get_random_vehicle_color(self):
         colors = [
@@ -64,7 +71,7 @@ class VehicleElement(BackgroundElement):
             '#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8',
             '#F7DC6F', '#BB8FCE', '#85C1E2', '#F8B739', '#52B788'
         ]
-        return random.choice(colors)
+        return self.rng.choice(colors)
     
     def custom_update(self, delta_time):
         if self.current_speed != self.target_speed:
@@ -146,7 +153,7 @@ class VehicleElement(BackgroundElement):
     
     def draw(self, canvas):
         if not self.visible or self.opacity <= 0.01:
-            if hasattr(self, 'canvas_items') and self.canvas_items:
+            if self.canvas_items:
                 for item_id in self.canvas_items:
                     try:
                         canvas.itemconfig(item_id, state='hidden')
@@ -162,13 +169,13 @@ class VehicleElement(BackgroundElement):
         # Los vehiculos del fondo deben ser visibles en toda la pantalla
         
         # Crear o actualizar vehiculo
-        if not hasattr(self, 'canvas_items') or not self.canvas_items:
+        if not self.canvas_items:
             self.canvas_items = self.create_vehicle_visual(canvas, final_x, final_y)
         else:
             self.update_vehicle_position(canvas, final_x, final_y)
         
         # Asegurar que todos los items esten visibles
-        if hasattr(self, 'canvas_items') and self.canvas_items:
+        if self.canvas_items:
             for item_id in self.canvas_items:
                 try:
                     canvas.itemconfig(item_id, state='normal')
@@ -545,8 +552,8 @@ class VehicleElement(BackgroundElement):
         if not self.canvas_items:
             return
         
-        dx = x - (self.original_x if hasattr(self, 'original_x') else self.x)
-        dy = y - (self.original_y if hasattr(self, 'original_y') else self.y)
+        dx = x - self.original_x
+        dy = y - self.original_y
         
         for item_id in self.canvas_items:
             try:
@@ -559,7 +566,9 @@ class VehicleElement(BackgroundElement):
 
 
 class VehicleSpawnManager:
-    def __init__(self, screen_width, screen_height):
+    def __init__(self, screen_width, screen_height, rng=None):
+        self.rng = rng if rng is not None else random
+        
         self.screen_width = screen_width
         self.screen_height = screen_height
         
@@ -606,7 +615,7 @@ class VehicleSpawnManager:
         self.active_vehicles = [v for v in background_elements if v.element_type == 'vehicle' and v.is_active()]
     
         for lane in ['upper', 'lower']:
-            if current_time - self.spawn_cooldown[lane] < random.uniform(self.min_spawn_interval, self.max_spawn_interval):
+            if current_time - self.spawn_cooldown[lane] < self.rng.uniform(self.min_spawn_interval, self.max_spawn_interval):
                 continue
         
             if self.can_spawn_vehicle(lane):
@@ -639,12 +648,12 @@ class VehicleSpawnManager:
         return True
     
     def spawn_vehicle(self, lane):
-        vehicle_type = random.choices(self.vehicle_types, weights=self.vehicle_weights)[0]
+        vehicle_type = self.rng.choices(self.vehicle_types, weights=self.vehicle_weights)[0]
     
         direction = self.lane_directions[lane]
         y_position = self.lane_positions[lane]
     
-        vehicle = VehicleElement(vehicle_type, lane, direction)
+        vehicle = VehicleElement(vehicle_type, lane, direction, rng=self.rng)
     
         if direction > 0:
             spawn_x = -vehicle.width - 50
@@ -0,0 +1,181 @@
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError as e:
+    print(f"Warning: No se pudo importar numpy: {e}")
+    np = None
+    NUMPY_AVAILABLE = False
+
+FLAG_IN_USE = 1
+FLAG_ACTIVE = 2
+FLAG_VISIBLE = 4
+FLAG_EMERGENCY_BRAKE = 8
+FLAG_CROSSED_INTERSECTION = 16
+FLAG_COLLISION_LOCK = 32
+
+class VehicleStore:
+    """Estado de los vehiculos en arreglos contiguos (estructura de arreglos).
+
+    Cada vehiculo ocupa una fila. Los valores opcionales (None en la ruta
+    escalar) se guardan como NaN.
+    """
+
+    FLOAT_FIELDS = (
+        'x', 'y', 'width', 'height',
+        'velocity_x', 'velocity_y',
+        'current_speed', 'target_speed', 'base_speed',
+        'traffic_light_target_speed', 'last_distance_to_ahead', 'lane_change_cooldown'
+    )
+
+    def __init__(self, capacity=64):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("VehicleStore requiere numpy")
+
+        self.capacity = 0
+        self.free_rows = []
+        self.high_water = 0
+
+        for name in self.FLOAT_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=np.float64))
+        self.flags = np.zeros(0, dtype=np.int32)
+        self.lane_id = np.zeros(0, dtype=np.int16)
+        self.axis = np.zeros(0, dtype=np.int8)
+        self.sign = np.zeros(0, dtype=np.int8)
+
+        self.intersection_bounds = None
+
+        self.grow(max(1, capacity))
+
+    def grow(self, new_capacity):
+        if new_capacity <= self.capacity:
+            return
+
+        extra = new_capacity - self.capacity
+        for name in self.FLOAT_FIELDS:
+            old = getattr(self, name)
+            setattr(self, name, np.concatenate((old, np.zeros(extra, dtype=np.float64))))
+        self.flags = np.concatenate((self.flags, np.zeros(extra, dtype=np.int32)))
+        self.lane_id = np.concatenate((self.lane_id, np.full(extra, -1, dtype=np.int16)))
+        self.axis = np.concatenate((self.axis, np.zeros(extra, dtype=np.int8)))
+        self.sign = np.concatenate((self.sign, np.ones(extra, dtype=np.int8)))
+
+        self.capacity = new_capacity
+
+    def allocate(self):
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.high_water >= self.capacity:
+                self.grow(self.capacity * 2)
+            row = self.high_water
+            self.high_water += 1
+
+        for name in self.FLOAT_FIELDS:
+            getattr(self, name)[row] = 0.0
+        self.traffic_light_target_speed[row] = np.nan
+        self.last_distance_to_ahead[row] = np.nan
+        self.flags[row] = FLAG_IN_USE
+        self.lane_id[row] = -1
+
+        return row
+
+    def release(self, row):
+        self.flags[row] = 0
+        self.lane_id[row] = -1
+        self.free_rows.append(row)
+
+    def clear(self):
+        self.flags[:] = 0
+        self.lane_id[:] = -1
+        self.free_rows = []
+        self.high_water = 0
+
+    def bind_lane(self, row, lane_id, axis, sign):
+        self.lane_id[row] = lane_id
+        self.axis[row] = axis
+        self.sign[row] = sign
+
+    def set_intersection_bounds(self, bounds):
+        self.intersection_bounds = bounds
+
+    def get_flag(self, row, flag):
+        return bool(self.flags.item(row) & flag)
+
+    def set_flag(self, row, flag, value):
+        if value:
+            self.flags[row] |= flag
+        else:
+            self.flags[row] &= ~flag
+
+    def count(self):
+        return self.high_water - len(self.free_rows)
+
+    def count_below_speed(self, speed_threshold):
+        n = self.high_water
+        in_use = (self.flags[:n] & FLAG_IN_USE) != 0
+        return int(np.count_nonzero(in_use & (self.current_speed[:n] < speed_threshold)))
+
+    def integrate(self, delta_time):
+        """Equivalente vectorizado de BackgroundElement.update seguido de
+        SimulationVehicle.custom_update para todas las filas activas. Las
+        posiciones se corrigen despues con traffic_kernel.project_lanes."""
+        n = self.high_water
+        if n == 0:
+            return
+
+        flags = self.flags[:n]
+        live = (flags & (FLAG_IN_USE | FLAG_ACTIVE)) == (FLAG_IN_USE | FLAG_ACTIVE)
+        if not live.any():
+            return
+
+        x = self.x[:n]
+        y = self.y[:n]
+        velocity_x = self.velocity_x[:n]
+        velocity_y = self.velocity_y[:n]
+
+        x += np.where(live, velocity_x * delta_time, 0.0)
+        y += np.where(live, velocity_y * delta_time, 0.0)
+
+        current = self.current_speed[:n]
+        target = self.target_speed[:n]
+        light_target = self.traffic_light_target_speed[:n]
+
+        has_light_target = ~np.isnan(light_target)
+        crossed = (flags & FLAG_CROSSED_INTERSECTION) != 0
+        emergency = (flags & FLAG_EMERGENCY_BRAKE) != 0
+
+        final_target = np.where(has_light_target, np.fmin(target, light_target), target)
+        crossed_with_target = crossed & has_light_target
+        final_target = np.where(crossed_with_target, np.fmax(final_target, light_target), final_target)
+
+        speed_diff = final_target - current
+        # Mismo orden de prioridad que custom_update: la ultima escritura gana
+        acceleration_rate = np.where(speed_diff > 0, 3.0, 4.0)
+        acceleration_rate[crossed_with_target] = 5.0
+        acceleration_rate[emergency] = 10.0
+        adjustment = speed_diff * delta_time * acceleration_rate
+        new_speed = np.where(np.abs(adjustment) > np.abs(speed_diff), final_target, current + adjustment)
+
+        changing = live & (current != final_target)
+        current[changing] = new_speed[changing]
+
+        horizontal = self.axis[:n] == 0
+        signed_speed = current * self.sign[:n]
+        velocity_x[changing] = np.where(horizontal, signed_speed, 0.0)[changing]
+        velocity_y[changing] = np.where(horizontal, 0.0, signed_speed)[changing]
+
+        if self.intersection_bounds is None:
+            return
+
+        bounds = self.intersection_bounds
+        forward = self.sign[:n] > 0
+        position = np.where(horizontal, x, y)
+        length = np.where(horizontal, self.width[:n], self.height[:n])
+        far_edge = np.where(
+            horizontal,
+            np.where(forward, bounds['right'], bounds['left']),
+            np.where(forward, bounds['bottom'], bounds['top'])
+        )
+
+        completely_past = np.where(forward, position > far_edge, position + length < far_edge)
+        flags[live & completely_past] &= ~FLAG_CROSSED_INTERSECTION